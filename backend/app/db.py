@@ -1,20 +1,92 @@
 from __future__ import annotations
 
 from contextlib import contextmanager
-from typing import Iterator
+from typing import Any, Dict, Iterator, Tuple
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine, make_url
 from sqlmodel import SQLModel, Session, create_engine
 
+from .core.config import settings
+from .services.papers import create_search_index
 
-engine = create_engine("sqlite:///./metascribe.db", echo=False)
+
+def _sqlite_pragmas(dbapi_connection: Any, _: Any) -> None:
+    # WAL lets readers proceed while a write is in progress; busy_timeout makes a
+    # writer wait for the lock instead of failing with "database is locked"
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.close()
+
+
+def make_engine(url: str) -> Engine:
+    """Engine for ``url``: SQLite gets WAL and a busy timeout, server databases a sized pool."""
+    parsed = make_url(url)
+    kwargs: Dict[str, Any] = {"echo": False}
+    if parsed.get_backend_name() == "sqlite":
+        # Sessions are opened in worker threads; each connection is used by one at a time
+        kwargs["connect_args"] = {"check_same_thread": False}
+        memory = parsed.database in (None, "", ":memory:")
+    else:
+        memory = False
+        kwargs["pool_pre_ping"] = True
+    if not memory:
+        kwargs.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+        )
+    new_engine = create_engine(url, **kwargs)
+    if parsed.get_backend_name() == "sqlite":
+        event.listen(new_engine, "connect", _sqlite_pragmas)
+    return new_engine
+
+
+engine = make_engine(settings.database_url)
+
+# Indexes that earlier versions of the models created and that newer ones replaced
+# (the composite run indexes lead with the same columns)
+_DROPPED_INDEXES: Dict[str, Tuple[str, ...]] = {
+    "run": ("ix_run_doc_id", "ix_run_created_at"),
+}
+
+
+def _add_missing_columns() -> None:
+    """Add nullable columns (and indexes) that models gained after their table was
+    created, and drop indexes the models no longer have.
+
+    ``create_all`` only creates missing tables; this covers the changes made so far
+    without a migration tool.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+            present = {index["name"] for index in inspector.get_indexes(table.name)}
+            for name in _DROPPED_INDEXES.get(table.name, ()):
+                if name in present:
+                    conn.execute(text(f'DROP INDEX "{name}"'))
 
 
 def init_db() -> None:
     SQLModel.metadata.create_all(engine)
+    _add_missing_columns()
+    with Session(engine) as session:
+        create_search_index(session)
 
 
 @contextmanager
 def get_session() -> Iterator[Session]:
+    """Blocking: from async code, run the function that uses it via ``asyncio.to_thread``."""
     with Session(engine) as session:
         yield session
-
-
@@ -1,3 +1,7 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -8,6 +12,35 @@ from .routers.experiment import router as experiment_router
 from .routers.eval import router as eval_router
 from .core.config import settings
 from .db import init_db
+from .services.pdf.cache import parse_cache
+from .services.pdf.engine import parse_pool
+from .services.metrics import metric_pool
+from .services.llm.cache import llm_cache
+from .services.llm.factory import registry_stats
+from .services.llm.singleflight import llm_flights
+from .services.http import start_http_client, close_http_client
+from .services.sandbox.factory import docker_pool, local_pool
+from .services.jobs import job_scheduler
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    await parse_pool.start()
+    await metric_pool.start()
+    await start_http_client()
+    local_pool.start()
+    if settings.sandbox_mode == "docker":
+        await asyncio.to_thread(docker_pool.start)
+    await job_scheduler.start()
+    try:
+        yield
+    finally:
+        await job_scheduler.close()
+        local_pool.close()
+        await asyncio.to_thread(docker_pool.close)
+        await close_http_client()
+        await metric_pool.close()
+        await parse_pool.close()
 
 
 def create_app() -> FastAPI:
@@ -15,6 +48,7 @@ def create_app() -> FastAPI:
         title="METASCRIBE API",
         version="0.1.0",
         description="Backend API for METASCRIBE: AI Agent for Research Paper Implementation",
+        lifespan=lifespan,
     )
 
     # CORS
@@ -24,6 +58,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
     # Routers
@@ -37,6 +72,20 @@ def create_app() -> FastAPI:
     def health() -> dict:
         return {"status": "ok"}
 
+    @application.get("/metrics")
+    def metrics() -> dict:
+        return {
+            "parse_cache": parse_cache.stats(),
+            "parse_pool": parse_pool.stats(),
+            "metric_pool": metric_pool.stats(),
+            "llm_cache": llm_cache.stats(),
+            "llm_clients": registry_stats(),
+            "llm_singleflight": llm_flights.stats(),
+            "local_pool": local_pool.stats(),
+            "docker_pool": docker_pool.stats(),
+            "jobs": job_scheduler.stats(),
+        }
+
     return application
 
 
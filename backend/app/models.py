@@ -1,26 +1,61 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
+from sqlalchemy import JSON, Column, Index, LargeBinary
 from sqlmodel import SQLModel, Field, Relationship
 
 
 class Paper(SQLModel, table=True):
+    """A parsed paper, stored once per PDF content; full-text indexed in ``paper_fts`` (see services/papers.py)."""
+
     id: Optional[int] = Field(default=None, primary_key=True)
     doc_id: str = Field(index=True)
     title: Optional[str] = None
     abstract: Optional[str] = None
+    content_hash: Optional[str] = Field(default=None, index=True, unique=True)  # SHA-256 of the PDF bytes
+    arxiv_id: Optional[str] = Field(default=None, index=True)
+    methodology: Optional[str] = None
+    sections: Optional[Dict[str, str]] = Field(default=None, sa_column=Column(JSON))  # heading key -> text
+    datasets: Optional[List[str]] = Field(default=None, sa_column=Column(JSON))
+    dataset_mentions: Optional[List[Dict[str, Any]]] = Field(default=None, sa_column=Column(JSON))
+    equations: Optional[List[str]] = Field(default=None, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
+
+
+class Blob(SQLModel, table=True):
+    """zlib-compressed text addressed by the SHA-256 of its content, so identical text is stored once."""
+
+    hash: str = Field(primary_key=True)
+    data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    size: int  # uncompressed bytes
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class Run(SQLModel, table=True):
+    # Run history pages are keyset scans over these, optionally narrowed by doc or exit code
+    __table_args__ = (
+        Index("ix_run_created_id", "created_at", "id"),
+        Index("ix_run_doc_created_id", "doc_id", "created_at", "id"),
+        Index("ix_run_returncode_created_id", "returncode", "created_at", "id"),
+        Index("ix_run_exec_key_created", "exec_key", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    doc_id: Optional[str] = Field(default=None, index=True)
-    code: str
-    stdout: str
+    doc_id: Optional[str] = None
+    # Legacy inline copy; runs keep code and output in the blob store (see services/runs.py)
+    code: str = ""
+    stdout: str  # listing preview (first characters); full head+tail preview is in stdout_hash
     stderr: str
     returncode: int
-    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    code_hash: Optional[str] = Field(default=None, foreign_key="blob.hash", index=True)
+    stdout_hash: Optional[str] = Field(default=None, foreign_key="blob.hash")
+    stderr_hash: Optional[str] = Field(default=None, foreign_key="blob.hash")
+    log_path: Optional[str] = None  # complete output as gzip NDJSON
+    # Hash of the code and executor config, set on runs that completed; see services/jobs.py
+    exec_key: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class Evaluation(SQLModel, table=True):
@@ -28,11 +63,28 @@ class Evaluation(SQLModel, table=True):
     run_id: int = Field(index=True, foreign_key="run.id")
     metric_name: str
     reported: float
-    measured: float
+    measured: float  # 0.0 when the pattern did not match (found is False)
     direction: str  # 'higher' or 'lower'
     delta: float
+    found: Optional[bool] = None  # None for rows written before misses were recorded
     threshold: float
     pattern: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class Job(SQLModel, table=True):
+    """A submitted experiment; ``run_id`` points at its ``Run`` once it has executed."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    status: str = Field(default="queued", index=True)  # queued | running | done | failed | timeout
+    user_id: str = Field(default="anonymous", index=True)
+    priority: int = 0  # higher runs first
+    doc_id: Optional[str] = None
+    code: str = ""  # legacy inline copy; see code_hash
+    code_hash: Optional[str] = Field(default=None, foreign_key="blob.hash")
+    run_id: Optional[int] = Field(default=None, foreign_key="run.id")
+    cached: Optional[bool] = None  # True when run_id is an earlier run replayed instead of executing
+    error: Optional[str] = None
+    queued_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
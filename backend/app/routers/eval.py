@@ -1,88 +1,318 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import List
+import asyncio
+import os
 import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from pydantic import BaseModel, Field
+from sqlalchemy import insert
+from sqlmodel import select
+
+from ..core.config import settings
 from ..db import get_session
 from ..models import Evaluation, Run
+from ..services import runs
+from ..services.metrics import (
+    MAX_PATTERN_CHARS,
+    MetricQuery,
+    compile_pattern,
+    distribution,
+    evaluate_metrics,
+    metric_pool,
+    passes,
+)
+from ..services.errors import PoolBusyError
+from ..services.workers import JobTimeoutError
 
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 500
+
+
+class MetricSpec(BaseModel):
+    name: str
+    # Regex over stdout; its first group (or the whole match) is the number
+    pattern: Optional[str] = Field(default=None, max_length=MAX_PATTERN_CHARS)
+    reported: float
+    direction: Literal["higher", "lower"] = "higher"
+    threshold: float = 0.0
+    # first/last match, or all matches as a series (e.g. a loss curve) with min/max/mean/final
+    mode: Literal["first", "last", "all"] = "first"
+
 
 class EvalRequest(BaseModel):
     run_id: int
-    # Metric instructions: regex to capture a float from stdout and compare with reported
-    metrics: List[dict]
-    # Each metric dict: { name, pattern, reported, direction ('higher'|'lower'), threshold }
+    metrics: List[MetricSpec]
 
 
 class EvalResponse(BaseModel):
     results: List[dict]
+    scanned_chars: int = 0
+    truncated: bool = False  # only the end of a very long stdout was scanned
 
 
-@router.post("/evaluate", response_model=EvalResponse)
-async def evaluate_run(req: EvalRequest) -> EvalResponse:
+def _queries(specs: List[MetricSpec]) -> List[MetricQuery]:
+    queries = []
+    for spec in specs:
+        if not spec.pattern:
+            continue
+        try:
+            compile_pattern(spec.pattern)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid pattern for metric {spec.name!r}: {e}")
+        queries.append(MetricQuery(name=spec.name, pattern=spec.pattern, mode=spec.mode))
+    return queries
+
+
+def _judge(run_id: int, spec: MetricSpec, metric: Optional[dict]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """The ``Evaluation`` row and the result entry for one metric of one run."""
+    found = bool(metric and metric["found"])
+    measured = metric["value"] if found else None
+    delta = measured - spec.reported if found else None
+    row = {
+        "run_id": run_id,
+        "metric_name": spec.name,
+        "reported": spec.reported,
+        # The columns are not nullable; found tells a miss from a real 0.0
+        "measured": measured if found else 0.0,
+        "direction": spec.direction,
+        "delta": delta if found else 0.0,
+        "threshold": spec.threshold,
+        "pattern": spec.pattern,
+        "found": found,
+    }
+    result = {
+        "name": spec.name,
+        "mode": spec.mode,
+        "found": found,
+        "reported": spec.reported,
+        "measured": measured,
+        "delta": delta,
+        "direction": spec.direction,
+        "threshold": spec.threshold,
+        "pass": passes(measured, spec.reported, spec.direction, spec.threshold),
+        "series": metric["series"] if metric else None,
+        "stats": metric["stats"] if metric else None,
+    }
+    return row, result
+
+
+def _judge_all(run_id: int, specs: List[MetricSpec], extracted: dict) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    # Extracted metrics are in the order of the specs that have a pattern
+    extracted_by_spec = iter(extracted["metrics"])
+    return [_judge(run_id, spec, next(extracted_by_spec) if spec.pattern else None) for spec in specs]
+
+
+def _source(run: Run, stdout: Callable[[], str]) -> Tuple[Optional[str], str]:
+    # The full log has everything the run printed; the stored output is the fallback
+    if run.log_path and os.path.exists(run.log_path):
+        return run.log_path, ""
+    return None, stdout()
+
+
+def _load_source(run_id: int) -> Optional[Tuple[Optional[str], str]]:
     with get_session() as session:
-        run = session.get(Run, req.run_id)
+        run = session.get(Run, run_id)
         if not run:
-            return EvalResponse(results=[])
-
-        results = []
-        for cfg in req.metrics:
-            name = cfg.get("name")
-            pattern = cfg.get("pattern")
-            reported = float(cfg.get("reported"))
-            direction = cfg.get("direction", "higher")
-            threshold = float(cfg.get("threshold", 0.0))
-            measured_val = None
-            if pattern:
-                m = re.search(pattern, run.stdout)
-                if m:
-                    try:
-                        measured_val = float(m.group(1))
-                    except Exception:
-                        measured_val = None
-            if measured_val is None:
-                measured_val = 0.0
-            delta = measured_val - reported
-            ev = Evaluation(
-                run_id=run.id,
-                metric_name=name,
-                reported=reported,
-                measured=measured_val,
-                direction=direction,
-                delta=delta,
-                threshold=threshold,
-                pattern=pattern,
-            )
-            session.add(ev)
-            results.append({
-                "name": name,
-                "reported": reported,
-                "measured": measured_val,
-                "delta": delta,
-                "direction": direction,
-                "threshold": threshold,
-                "pass": (measured_val >= reported - threshold) if direction == "higher" else (measured_val <= reported + threshold),
-            })
+            return None
+        return _source(run, lambda: runs.load_run_output(session, run)[0])
+
+
+def _save_evaluations(rows: List[Dict[str, Any]]) -> None:
+    """Insert evaluation rows in one transaction."""
+    if not rows:
+        return
+    # A Core insert skips model defaults
+    now = datetime.utcnow()
+    with get_session() as session:
+        session.execute(insert(Evaluation), [{**row, "created_at": now} for row in rows])
         session.commit()
-    return EvalResponse(results=results)
 
 
-@router.get("/runs")
-async def list_runs() -> list[dict]:
+@router.post("/evaluate", response_model=EvalResponse)
+async def evaluate_run(req: EvalRequest) -> EvalResponse:
+    queries = _queries(req.metrics)
+    source = await asyncio.to_thread(_load_source, req.run_id)
+    if source is None:
+        return EvalResponse(results=[])
+    log_path, stdout = source
+
+    try:
+        extracted = await evaluate_metrics(log_path, stdout, queries) if queries else {"metrics": []}
+    except PoolBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except JobTimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"Metric extraction took too long: {e}")
+
+    judged = _judge_all(req.run_id, req.metrics, extracted)
+    await asyncio.to_thread(_save_evaluations, [row for row, _ in judged])
+    return EvalResponse(
+        results=[result for _, result in judged],
+        scanned_chars=extracted.get("scanned_chars", 0),
+        truncated=extracted.get("truncated", False),
+    )
+
+
+class RunFilter(BaseModel):
+    doc_id: Optional[str] = None
+    returncode: Optional[int] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    limit: int = Field(default=100, ge=1)  # latest matching runs
+
+
+class BatchEvalRequest(BaseModel):
+    # Either explicit run ids or a filter over runs
+    run_ids: Optional[List[int]] = None
+    filter: Optional[RunFilter] = None
+    metrics: List[MetricSpec]
+
+
+def _select_runs(req: BatchEvalRequest, *columns: Any) -> Any:
+    if req.run_ids is not None:
+        return select(*columns).where(Run.id.in_(req.run_ids)).order_by(Run.id)
+    flt = req.filter or RunFilter()
+    stmt = select(*columns)
+    if flt.doc_id is not None:
+        stmt = stmt.where(Run.doc_id == flt.doc_id)
+    if flt.returncode is not None:
+        stmt = stmt.where(Run.returncode == flt.returncode)
+    if flt.created_after is not None:
+        stmt = stmt.where(Run.created_at >= flt.created_after)
+    if flt.created_before is not None:
+        stmt = stmt.where(Run.created_at < flt.created_before)
+    return stmt.order_by(Run.created_at.desc(), Run.id.desc()).limit(flt.limit)
+
+
+def _load_sources(req: BatchEvalRequest) -> Dict[int, Tuple[Optional[str], str]]:
     with get_session() as session:
-        runs = session.query(Run).order_by(Run.created_at.desc()).limit(50).all()
-        return [
+        selected = session.execute(_select_runs(req, Run.id, Run.log_path, Run.stdout_hash, Run.stdout)).all()
+        logged = {r.id for r in selected if r.log_path and os.path.exists(r.log_path)}
+        # One query for the stored output of the runs without a log; the others are read from it
+        outputs = runs.get_blobs(session, [r.stdout_hash for r in selected if r.id not in logged and r.stdout_hash])
+        return {
+            r.id: (r.log_path, "") if r.id in logged else (None, outputs.get(r.stdout_hash, r.stdout or ""))
+            for r in selected
+        }
+
+
+@router.post("/evaluate/batch")
+async def evaluate_batch(req: BatchEvalRequest) -> dict:
+    """Apply one metric spec to many runs.
+
+    Extraction for each run is a separate job in the metric pool, at most one per
+    worker in flight, so a run whose scan fails (a timeout, a crashed worker, an
+    unreadable log) is reported with its error without failing the batch. When the pool's queue is full the batch waits for room
+    rather than failing runs. All ``Evaluation`` rows are inserted in one transaction.
+    """
+    limit = settings.eval_batch_max_runs
+    if req.run_ids is not None and len(req.run_ids) > limit:
+        raise HTTPException(status_code=400, detail=f"At most {limit} runs per batch")
+    if req.filter is not None and req.filter.limit > limit:
+        raise HTTPException(status_code=400, detail=f"At most {limit} runs per batch")
+    if len({spec.name for spec in req.metrics}) != len(req.metrics):
+        raise HTTPException(status_code=400, detail="Metric names must be unique in a batch")
+    queries = _queries(req.metrics)
+
+    sources = await asyncio.to_thread(_load_sources, req)
+    in_flight = asyncio.Semaphore(max(1, metric_pool.workers))
+
+    async def extract(run_id: int) -> Tuple[int, Optional[dict], Optional[str]]:
+        if not queries:
+            return run_id, {"metrics": []}, None
+        async with in_flight:
+            try:
+                return run_id, await evaluate_metrics(*sources[run_id], queries, wait=True), None
+            except Exception as e:  # noqa: BLE001 - a timeout, crashed worker or unreadable log fails this run only
+                return run_id, None, f"{type(e).__name__}: {e}"
+
+    extracted = await asyncio.gather(*(extract(run_id) for run_id in sources))
+
+    rows: List[Dict[str, Any]] = []
+    table: List[Dict[str, Any]] = []
+    measured: Dict[str, List[float]] = {spec.name: [] for spec in req.metrics}
+    passed: Dict[str, int] = dict.fromkeys(measured, 0)
+    found: Dict[str, int] = dict.fromkeys(measured, 0)
+    for run_id, result, error in extracted:
+        if result is None:
+            table.append({"run_id": run_id, "error": error, "pass": False, "metrics": {}})
+            continue
+        judged = _judge_all(run_id, req.metrics, result)
+        cells = {}
+        for row, entry in judged:
+            rows.append(row)
+            cells[entry["name"]] = {"measured": entry["measured"], "pass": entry["pass"]}
+            if entry["found"]:
+                found[entry["name"]] += 1
+                measured[entry["name"]].append(entry["measured"])
+            passed[entry["name"]] += entry["pass"]
+        table.append({
+            "run_id": run_id,
+            "error": None,
+            "pass": all(cell["pass"] for cell in cells.values()),
+            "metrics": cells,
+        })
+
+    await asyncio.to_thread(_save_evaluations, rows)
+
+    evaluated = sum(1 for row in table if row["error"] is None)
+    return {
+        "runs": len(table),
+        "evaluated": evaluated,
+        "errors": len(table) - evaluated,
+        "passed": sum(1 for row in table if row["pass"]),
+        "table": table,
+        "metrics": [
             {
-                "id": r.id,
-                "created_at": r.created_at.isoformat(),
-                "returncode": r.returncode,
-                "stdout": r.stdout[:1000],
+                "name": spec.name,
+                "reported": spec.reported,
+                "direction": spec.direction,
+                "found": found[spec.name],
+                "passed": passed[spec.name],
+                "pass_rate": passed[spec.name] / evaluated if evaluated else None,
+                "distribution": distribution(measured[spec.name]),
             }
-            for r in runs
-        ]
+            for spec in req.metrics
+        ],
+    }
+
+
+@router.get("/runs")
+async def list_runs(
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    doc_id: Optional[str] = None,
+    status: Optional[Literal["ok", "failed", "timeout"]] = None,
+    returncode: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+) -> list[dict]:
+    """Runs, newest first. Pass the ``X-Next-Cursor`` response header as ``cursor`` for the next page."""
+
+    def page() -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        with get_session() as session:
+            return runs.list_runs(
+                session,
+                limit=limit,
+                cursor=cursor,
+                doc_id=doc_id,
+                status=status,
+                returncode=returncode,
+                created_after=created_after,
+                created_before=created_before,
+            )
+
+    try:
+        items, next_cursor = await asyncio.to_thread(page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 
@@ -1,45 +1,160 @@
-from fastapi import APIRouter
+import asyncio
+import os
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict, Iterator, Literal
 from ..core.config import settings
-from ..services.sandbox import LocalExecutor, DockerExecutor
-from ..db import get_session
-from ..models import Run
+from ..models import Job
+from ..services.jobs import ANONYMOUS, job_scheduler
+from ..services.sandbox.output import read_log
+from ..services.sse import SSE_HEADERS, sse_event
+from ..services.errors import PoolBusyError
 
 
 router = APIRouter()
 
+# Upper bound for ?wait= on the job status endpoint
+MAX_WAIT_SECONDS = 60
+# How long a job stream waits for the final status after the job's output has ended
+FINISH_GRACE_SECONDS = 5.0
+
 
 class RunRequest(BaseModel):
     code: str
+    user_id: str = ANONYMOUS  # concurrency is limited per user; anonymous jobs only by the global limit
+    priority: int = 0  # higher runs first
+    doc_id: str | None = None
+    # Replay a recent run of the same code and executor config instead of executing
+    use_cache: bool = False
+    force_rerun: bool = False  # execute even if a cached run exists, and cache the new one
 
 
 class RunResponse(BaseModel):
     stdout: str
     stderr: str
     returncode: int
+    job_id: int | None = None
+    run_id: int | None = None
+    cached: bool = False  # replayed from an earlier run, not executed for this request
+    cached_at: str | None = None  # when the replayed run executed
 
 
-@router.post("/run", response_model=RunResponse)
-async def run_code(req: RunRequest) -> Dict[str, Any]:
-    if settings.sandbox_mode == "docker":
-        executor = DockerExecutor(
-            image=settings.docker_image,
-            memory=settings.docker_memory,
-            cpus=settings.docker_cpus,
+class SubmitResponse(BaseModel):
+    job_id: int
+    status: str
+    cached: bool = False
+
+
+async def _submit(req: RunRequest) -> Job:
+    try:
+        job = await job_scheduler.submit(
+            req.code,
+            user_id=req.user_id,
+            priority=req.priority,
+            doc_id=req.doc_id,
+            use_cache=req.use_cache,
+            force_rerun=req.force_rerun,
+        )
+    except PoolBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    assert job.id is not None
+    return job
+
+
+@router.post("/submit", response_model=SubmitResponse)
+async def submit_run(req: RunRequest) -> SubmitResponse:
+    """Queue a run and return immediately; poll ``/jobs/{job_id}`` for the result."""
+    job = await _submit(req)
+    return SubmitResponse(job_id=job.id, status=job.status, cached=bool(job.cached))
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: int, wait: float = 0) -> Dict[str, Any]:
+    """Job status; with ``wait`` > 0, hold the request up to that many seconds until it finishes."""
+    job = await job_scheduler.wait(job_id, timeout=min(max(wait, 0), MAX_WAIT_SECONDS))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: int) -> StreamingResponse:
+    """Server-sent events of the job's output: ``data: {stream, text}`` per chunk, then ``event: done``.
+
+    Subscribing mid-run first replays what the server retains (head and tail of each
+    stream); a finished job is replayed from its full log. A job that has not started
+    within ``JOB_WAIT_SECONDS`` gets ``done`` with its current status.
+    """
+    if await job_scheduler.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events() -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.job_wait_seconds
+        started = await job_scheduler.wait_started(job_id, timeout=settings.job_wait_seconds)
+        capture = job_scheduler.capture(job_id) if started else None
+        if capture is not None:
+            snapshot, queue = capture.subscribe()
+            for event in snapshot:
+                yield sse_event(event)
+            if queue is not None:
+                try:
+                    while (event := await queue.get()) is not None:
+                        yield sse_event(event)
+                finally:
+                    capture.unsubscribe(queue)
+        elif started:
+            log_path = await job_scheduler.log_path(job_id)
+            if log_path and os.path.exists(log_path):
+                for event in read_log(log_path):
+                    yield sse_event(event)
+        # Once its output has ended a job is only recording its result, so allow that a moment
+        job = await job_scheduler.wait(job_id, timeout=max(deadline - loop.time(), FINISH_GRACE_SECONDS)) or {}
+        yield sse_event(
+            {"status": job.get("status"), "returncode": job.get("returncode"), "error": job.get("error")},
+            event="done",
         )
-    else:
-        executor = LocalExecutor()
 
-    result = executor.run_code(req.code, timeout_seconds=60)
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
-    # persist run
-    with get_session() as session:
-        run = Run(code=req.code, stdout=result.stdout, stderr=result.stderr, returncode=result.returncode)
-        session.add(run)
-        session.commit()
 
-    return RunResponse(stdout=result.stdout, stderr=result.stderr, returncode=result.returncode)
+@router.get("/jobs/{job_id}/log")
+async def get_job_log(job_id: int, stream: Literal["all", "stdout", "stderr"] = "all") -> StreamingResponse:
+    """Complete output of a finished job as plain text (streams interleaved unless one is selected)."""
+    log_path = await job_scheduler.log_path(job_id)
+    if not log_path or not os.path.exists(log_path):
+        raise HTTPException(status_code=404, detail="No log for this job")
 
+    def lines() -> Iterator[str]:
+        for record in read_log(log_path):
+            if stream == "all" or record["stream"] == stream:
+                yield record["text"]
 
+    return StreamingResponse(lines(), media_type="text/plain; charset=utf-8")
 
+
+@router.post("/run", response_model=RunResponse)
+async def run_code(req: RunRequest) -> Dict[str, Any]:
+    """Submit a run and wait for it to finish (at most ``JOB_WAIT_SECONDS``)."""
+    job = await job_scheduler.wait((await _submit(req)).id, timeout=settings.job_wait_seconds)
+    assert job is not None
+    if job["status"] in ("queued", "running"):
+        raise HTTPException(
+            status_code=504,
+            detail=f"Job {job['id']} still {job['status']} after {settings.job_wait_seconds}s; "
+            f"poll /experiment/jobs/{job['id']} for its result",
+        )
+    if job["status"] == "timeout":
+        raise HTTPException(status_code=504, detail=job["error"])
+    if job["status"] != "done":
+        raise HTTPException(status_code=500, detail=job["error"] or "Run failed")
+    return RunResponse(
+        stdout=job["stdout"],
+        stderr=job["stderr"],
+        returncode=job["returncode"],
+        job_id=job["id"],
+        run_id=job["run_id"],
+        cached=job["cached"],
+        cached_at=job["cached_at"],
+    )
@@ -1,20 +1,44 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from pydantic import BaseModel
-import uuid
-from typing import Any, Dict
-from ..services.pdf.parser import (
-    extract_text_from_pdf_bytes,
-    split_into_sections,
-    detect_datasets,
-    extract_equations,
-    guess_abstract,
-    guess_methodology,
+import asyncio
+import json
+from datetime import datetime
+import httpx
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from ..core.config import settings
+from ..db import get_session
+from ..services import papers
+from ..services.pdf.engine import parse_pdf
+from ..services.pdf.spool import (
+    MULTIPART_OVERHEAD_BYTES,
+    InvalidUploadError,
+    SpooledPDF,
+    UploadTooLargeError,
+    spool_multipart,
 )
-from ..services.arxiv import fetch_arxiv_pdf_and_meta
+from ..services.pdf.cache import (
+    parse_cache,
+    pdf_cache_key,
+    arxiv_cache_key,
+    doc_id_from_digest,
+)
+from ..services.arxiv import (
+    arxiv_cache,
+    cached_metadata,
+    fetch_arxiv_document,
+    fetch_arxiv_metadata_batch,
+    parse_arxiv_id,
+)
+from ..services.http import Throttle
+from ..services.errors import PoolBusyError
+from ..services.workers import JobTimeoutError
 
 
 router = APIRouter()
 
+MAX_SEARCH_RESULTS = 100
+
 
 class ParseResponse(BaseModel):
     doc_id: str
@@ -23,57 +47,247 @@ class ParseResponse(BaseModel):
     methodology: str | None = None
     equations: list[str] = []
     datasets: list[str] = []
+    # { name, count, first_offset } per canonical dataset name
+    dataset_mentions: list[dict] = []
+
+
+def _store_paper(
+    content_hash: str,
+    result: Dict[str, Any],
+    sections: Optional[Dict[str, str]] = None,
+    arxiv_id: Optional[str] = None,
+) -> None:
+    with get_session() as session:
+        papers.save_paper(session, content_hash, result, sections=sections, arxiv_id=arxiv_id)
+
+
+async def _parse_pdf(pdf: SpooledPDF, wait: bool = False) -> Tuple[Dict[str, Any], Optional[Dict[str, str]], bool]:
+    """Parse a spooled PDF, reusing a previous result for identical content.
+
+    Returns the result, its sections and whether it was parsed now; sections are
+    close to the full text, so they are kept in the database and not in the parse
+    cache (None on a cache hit).
+    """
+    key = pdf_cache_key(pdf.sha256)
+    cached = await parse_cache.aget(key)
+    if cached is not None:
+        return cached, None, False
+    try:
+        parsed = await parse_pdf(pdf.path, wait=wait)
+    except PoolBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except JobTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    sections = parsed.pop("sections", None)
+    result = {"doc_id": doc_id_from_digest(pdf.sha256), **parsed}
+    await parse_cache.aset(key, result)
+    return result, sections, True
+
 
+async def _parse_pdf_cached(pdf: SpooledPDF, wait: bool = False) -> Dict[str, Any]:
+    """``_parse_pdf``, storing a newly parsed result as a ``Paper`` for search.
 
-@router.post("/parse", response_model=ParseResponse)
-async def parse_paper(file: UploadFile = File(...)) -> Any:
-    if not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported in MVP")
+    A cached result was stored when it was parsed, so a hit costs no database work.
+    """
+    result, sections, parsed = await _parse_pdf(pdf, wait=wait)
+    if parsed:
+        await asyncio.to_thread(_store_paper, pdf.sha256, result, sections)
+    return result
 
-    pdf_bytes = await file.read()
+
+# The body is read as a raw stream (see spool_multipart), so the form is described by hand
+_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
+@router.post("/parse", response_model=ParseResponse, openapi_extra=_UPLOAD_OPENAPI)
+async def parse_paper(request: Request) -> Any:
+    """Parse an uploaded PDF (multipart field ``file``), streamed to disk as it arrives."""
+    max_bytes = settings.max_upload_mb * 1024 * 1024
+    # Reject oversized uploads from the header before reading anything
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {settings.max_upload_mb} MB")
+
+    try:
+        _, pdf = await spool_multipart(
+            request.headers.get("content-type", ""), request.stream(), max_bytes, settings.upload_spool_dir
+        )
+    except UploadTooLargeError:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {settings.max_upload_mb} MB")
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
-        full_text = extract_text_from_pdf_bytes(pdf_bytes)
+        result = await _parse_pdf_cached(pdf)
     except RuntimeError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        pdf.remove()
 
-    sections = split_into_sections(full_text)
-    abstract = guess_abstract(sections, full_text)
-    methodology = guess_methodology(sections, full_text) or ""
-    datasets = detect_datasets(full_text)
-    equations = extract_equations(full_text, max_equations=5)
-
-    return ParseResponse(
-        doc_id=str(uuid.uuid4()),
-        title=None,
-        abstract=abstract,
-        methodology=methodology,
-        equations=equations,
-        datasets=datasets,
-    )
+    return ParseResponse(title=None, **result)
 
 
 class ArxivRequest(BaseModel):
     url: str
 
 
+async def _parse_arxiv_cached(
+    id_or_url: str,
+    meta: Optional[Dict[str, Any]] = None,
+    throttle: Optional[Throttle] = None,
+    wait: bool = False,
+) -> Dict[str, Any]:
+    arxiv_id, version = parse_arxiv_id(id_or_url)
+    key = arxiv_cache_key(arxiv_id, version) if arxiv_id else None
+    if key:
+        cached = await parse_cache.aget(key)
+        if cached is not None:
+            return cached
+
+    doc = await fetch_arxiv_document(id_or_url, meta=meta, throttle=throttle)
+    # The PDF lives in the arXiv disk cache, so it is parsed in place and not removed;
+    # pinned until parsed, however long it waits for a parse worker
+    with arxiv_cache.pin(doc.pdf_path):
+        pdf = SpooledPDF(path=doc.pdf_path, sha256=doc.sha256, size=doc.size)
+        parsed, sections, _ = await _parse_pdf(pdf, wait=wait)
+    result = dict(parsed)
+    result["title"] = doc.meta.get("title")
+    result["abstract"] = doc.meta.get("abstract") or result.get("abstract")
+    # One save with the arXiv title and id (and the sections if the PDF was parsed now)
+    await asyncio.to_thread(_store_paper, doc.sha256, result, sections, arxiv_id)
+    if key:
+        await parse_cache.aset(key, result)
+    return result
+
+
 @router.post("/parse-arxiv", response_model=ParseResponse)
 async def parse_arxiv(req: ArxivRequest) -> Dict[str, Any]:
-    pdf_bytes, meta = await fetch_arxiv_pdf_and_meta(req.url)
-    full_text = extract_text_from_pdf_bytes(pdf_bytes)
-    sections = split_into_sections(full_text)
-    abstract = meta.get("abstract") or guess_abstract(sections, full_text)
-    methodology = guess_methodology(sections, full_text) or ""
-    datasets = detect_datasets(full_text)
-    equations = extract_equations(full_text, max_equations=5)
+    try:
+        result = await _parse_arxiv_cached(req.url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"arXiv fetch failed: {e}")
+    return ParseResponse(**result)
+
+
+class ArxivBatchRequest(BaseModel):
+    ids: list[str]
+    # Defaults to settings.arxiv_batch_concurrency, capped at arxiv_batch_max_concurrency
+    concurrency: int | None = Field(default=None, ge=1)
+
+
+def _ndjson(item: Dict[str, Any]) -> bytes:
+    return (json.dumps(item) + "\n").encode("utf-8")
+
+
+@router.post("/parse-arxiv/batch")
+async def parse_arxiv_batch(req: ArxivBatchRequest) -> StreamingResponse:
+    """Parse many arXiv papers, streaming one NDJSON line per paper as each completes.
+
+    Lines are ``{"id", "ok": true, "result"}`` or ``{"id", "ok": false, "error"}``.
+    """
+    if len(req.ids) > settings.arxiv_batch_max_ids:
+        raise HTTPException(status_code=400, detail=f"At most {settings.arxiv_batch_max_ids} ids per batch")
+
+    valid: list[str] = []
+    invalid: list[str] = []
+    for id_or_url in dict.fromkeys(req.ids):
+        (valid if parse_arxiv_id(id_or_url)[0] else invalid).append(id_or_url)
+
+    # One id_list query for everything not already fresh in the disk cache
+    metas: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for id_or_url in valid:
+        cached = cached_metadata(id_or_url)
+        if cached is not None:
+            metas[id_or_url] = cached
+        else:
+            missing.append(id_or_url)
+    # Metadata queries and PDF downloads share one politeness delay
+    throttle = Throttle(settings.arxiv_batch_delay_seconds)
+    if missing:
+        try:
+            metas.update(await fetch_arxiv_metadata_batch(missing, throttle=throttle))
+        except httpx.HTTPError:
+            # Fall back to per-paper metadata requests
+            pass
+
+    concurrency = min(req.concurrency or settings.arxiv_batch_concurrency, settings.arxiv_batch_max_concurrency)
+    download_slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def ingest(id_or_url: str) -> Dict[str, Any]:
+        try:
+            async with download_slots:
+                # A full parse queue delays the paper rather than failing it
+                result = await _parse_arxiv_cached(
+                    id_or_url, meta=metas.get(id_or_url), throttle=throttle, wait=True
+                )
+            return {"id": id_or_url, "ok": True, "result": ParseResponse(**result).model_dump()}
+        except HTTPException as e:
+            return {"id": id_or_url, "ok": False, "error": e.detail}
+        except Exception as e:
+            return {"id": id_or_url, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    async def stream() -> AsyncIterator[bytes]:
+        for id_or_url in invalid:
+            yield _ndjson({"id": id_or_url, "ok": False, "error": "Invalid arXiv id or URL"})
+        tasks = [asyncio.ensure_future(ingest(i)) for i in valid]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield _ndjson(await next_done)
+        finally:
+            # Client went away: stop the remaining downloads and parses
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+class PaperResponse(ParseResponse):
+    arxiv_id: str | None = None
+    sections: dict[str, str] = {}
+    created_at: datetime
+
+
+@router.get("/search")
+async def search_papers(
+    q: Optional[str] = Query(default=None, max_length=500),
+    dataset: Optional[str] = Query(default=None, max_length=200),
+    limit: int = Query(default=20, ge=1, le=MAX_SEARCH_RESULTS),
+) -> list[dict]:
+    """Stored papers matching every word of ``q`` (title, abstract, methodology,
+    datasets, equations, sections) and ``dataset``, best match first."""
+    if not (q and q.strip()) and not (dataset and dataset.strip()):
+        raise HTTPException(status_code=400, detail="Pass q and/or dataset")
+
+    def search() -> list[dict]:
+        with get_session() as session:
+            return papers.search_papers(session, q, dataset=dataset, limit=limit)
 
-    return ParseResponse(
-        doc_id=str(uuid.uuid4()),
-        title=meta.get("title"),
-        abstract=abstract,
-        methodology=methodology,
-        equations=equations,
-        datasets=datasets,
-    )
+    return await asyncio.to_thread(search)
 
 
+@router.get("/{doc_id}", response_model=PaperResponse)
+async def get_paper(doc_id: str) -> Any:
+    def load() -> Optional[Dict[str, Any]]:
+        with get_session() as session:
+            paper = papers.get_paper(session, doc_id)
+            return paper.model_dump() if paper else None
 
+    paper = await asyncio.to_thread(load)
+    if paper is None:
+        raise HTTPException(status_code=404, detail="Paper not found")
+    return PaperResponse(**{k: v for k, v in paper.items() if v is not None})
@@ -1,7 +1,13 @@
+from typing import Any, Callable, Dict, List, Literal
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from ..core.config import settings
+from ..services.llm.base import LLMClient
+from ..services.llm.chunking import estimate_tokens, split_by_token_budget
 from ..services.llm.factory import create_llm_client
+from ..services.llm.mapreduce import map_reduce_generate
+from ..services.sse import SSE_HEADERS, sse_text_events
 
 
 router = APIRouter()
@@ -11,30 +17,149 @@ class PseudocodeRequest(BaseModel):
     methodology: str
     provider: str | None = None
     api_key: str | None = None
+    bypass_cache: bool = False  # force a fresh generation (the result is still cached)
+    # "chunked" splits the methodology and merges per-chunk pseudocode; "auto" does so only when it is long
+    mode: Literal["auto", "single", "chunked"] = "auto"
+    # Default settings.pseudocode_chunk_tokens / pseudocode_parallelism; clamped to the settings' bounds
+    max_chunk_tokens: int | None = Field(default=None, ge=1, le=100_000)
+    parallelism: int | None = Field(default=None, ge=1, le=64)
+
+
+class ChunkReport(BaseModel):
+    index: int
+    chars: int
+    latency_ms: float
 
 
 class PseudocodeResponse(BaseModel):
     pseudocode: str
+    mode: str = "single"
+    chunks: list[ChunkReport] = []
+    reduce_latency_ms: float | None = None
+    reduce_rounds: int = 0
 
 
-@router.post("/generate", response_model=PseudocodeResponse)
-async def generate_pseudocode(req: PseudocodeRequest) -> PseudocodeResponse:
+_SYSTEM_PROMPT = (
+    "You are an expert ML research engineer. Convert the provided methodology into precise,\n"
+    "stepwise pseudocode suitable for implementing in PyTorch or TensorFlow. Keep it concise and executable."
+)
+
+
+def _client(req: PseudocodeRequest) -> LLMClient:
     provider = req.provider or settings.llm_provider
     api_key = req.api_key or settings.gemini_api_key
     if not api_key:
         raise HTTPException(status_code=400, detail="Missing API key for LLM provider")
-    client = create_llm_client(provider, gemini_api_key=api_key)
-    system = (
-        "You are an expert ML research engineer. Convert the provided methodology into precise,\n"
-        "stepwise pseudocode suitable for implementing in PyTorch or TensorFlow. Keep it concise and executable."
-    )
-    text = client.generate_text(
+    return create_llm_client(provider, gemini_api_key=api_key)
+
+
+def _prompt(req: PseudocodeRequest) -> Dict[str, Any]:
+    return dict(
         prompt=f"Methodology:\n{req.methodology}\n\nReturn only pseudocode.",
-        system_prompt=system,
+        system_prompt=_SYSTEM_PROMPT,
         temperature=0.2,
+        bypass_cache=req.bypass_cache,
         max_tokens=1024,
     )
-    return PseudocodeResponse(pseudocode=text.strip())
 
 
+def _map_prompt(req: PseudocodeRequest) -> Callable[[int, int, str], Dict[str, Any]]:
+    def build(index: int, total: int, chunk: str) -> Dict[str, Any]:
+        return dict(
+            prompt=(
+                f"Methodology (part {index + 1} of {total}):\n{chunk}\n\n"
+                "Return only pseudocode for the steps described in this part; other parts are handled separately."
+            ),
+            system_prompt=_SYSTEM_PROMPT,
+            temperature=0.2,
+            bypass_cache=req.bypass_cache,
+            max_tokens=1024,
+        )
+
+    return build
+
+
+def _reduce_prompt(req: PseudocodeRequest) -> Callable[[List[str]], Dict[str, Any]]:
+    def build(partials: List[str]) -> Dict[str, Any]:
+        parts = "\n\n".join(f"--- Part {i + 1} ---\n{text}" for i, text in enumerate(partials))
+        return dict(
+            prompt=(
+                "The following pseudocode fragments were written for consecutive parts of one methodology.\n"
+                f"{parts}\n\n"
+                "Merge them into a single coherent pseudocode in the same order: unify names, drop duplicated "
+                "steps and keep every distinct step. Return only pseudocode."
+            ),
+            system_prompt=_SYSTEM_PROMPT,
+            temperature=0.2,
+            bypass_cache=req.bypass_cache,
+            max_tokens=2048,
+        )
+
+    return build
+
 
+def _chunks(methodology: str, max_chunk_tokens: int) -> List[str]:
+    """Split for the map calls into at most ``settings.pseudocode_max_chunks`` chunks,
+    growing the chunk size as needed; 413 if that needs chunks above the maximum size."""
+    max_chunks = max(1, settings.pseudocode_max_chunks)
+    largest = max(1, settings.pseudocode_max_chunk_tokens)
+    if estimate_tokens(methodology) > max_chunks * largest:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Methodology too long: at most about {max_chunks * largest} tokens can be chunked",
+        )
+    size = max(max_chunk_tokens, -(-estimate_tokens(methodology) // max_chunks))
+    chunks = split_by_token_budget(methodology, size) or [methodology]
+    while len(chunks) > max_chunks and size < largest:
+        size = min(largest, size + size // 4 + 1)
+        chunks = split_by_token_budget(methodology, size)
+    if len(chunks) > max_chunks:
+        # Greedy packing can overshoot by a chunk or two even at the largest size; keep all text
+        chunks = chunks[:max_chunks - 1] + ["\n".join(chunks[max_chunks - 1:])]
+    return chunks
+
+
+@router.post("/generate", response_model=PseudocodeResponse)
+async def generate_pseudocode(req: PseudocodeRequest) -> PseudocodeResponse:
+    client = _client(req)
+    max_chunk_tokens = min(
+        max(req.max_chunk_tokens or settings.pseudocode_chunk_tokens, settings.pseudocode_min_chunk_tokens),
+        settings.pseudocode_max_chunk_tokens,
+    )
+    parallelism = max(1, min(req.parallelism or settings.pseudocode_parallelism, settings.pseudocode_max_parallelism))
+    chunked = req.mode == "chunked" or (
+        req.mode == "auto" and estimate_tokens(req.methodology) > max_chunk_tokens
+    )
+    if not chunked:
+        text = await client.agenerate_text(**_prompt(req))
+        return PseudocodeResponse(pseudocode=text.strip())
+
+    result = await map_reduce_generate(
+        client,
+        _chunks(req.methodology, max_chunk_tokens),
+        _map_prompt(req),
+        _reduce_prompt(req),
+        parallelism=parallelism,
+        reduce_budget_tokens=settings.pseudocode_reduce_tokens,
+    )
+    return PseudocodeResponse(
+        pseudocode=result.text,
+        mode="chunked",
+        chunks=[ChunkReport(index=c.index, chars=c.chars, latency_ms=c.latency_ms) for c in result.chunks],
+        reduce_latency_ms=result.reduce_latency_ms,
+        reduce_rounds=result.reduce_rounds,
+    )
+
+
+@router.post("/generate/stream")
+async def stream_pseudocode(req: PseudocodeRequest) -> StreamingResponse:
+    """Same as ``/generate`` but sends the pseudocode as server-sent events while it is generated.
+
+    Always a single generation call; ``mode`` and the chunking options are ignored.
+    """
+    client = _client(req)
+    return StreamingResponse(
+        sse_text_events(client.astream_text(**_prompt(req))),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
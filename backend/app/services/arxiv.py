@@ -1,51 +1,391 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
+import os
 import re
-from typing import Any, Dict, Tuple
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
 import httpx
 import xml.etree.ElementTree as ET
 
+from ..core.config import settings
+from .http import Throttle, get_http_client
+
 
 _ARXIV_ID_RE = re.compile(r"(\d{4}\.\d{4,5})(v\d+)?")
+_ATOM_NS = {"a": "http://www.w3.org/2005/Atom"}
+# Ids per export-API request; keeps query URLs well under server limits
+_ID_LIST_CHUNK = 100
+# Downloaded bytes gathered before each disk write
+_WRITE_BATCH_BYTES = 1024 * 1024
 
 
-def _extract_arxiv_id(id_or_url: str) -> str | None:
+def parse_arxiv_id(id_or_url: str) -> Tuple[str | None, str | None]:
+    """Return (arxiv_id, version) where version is e.g. 'v2' or None if unversioned."""
     m = _ARXIV_ID_RE.search(id_or_url)
     if m:
-        return m.group(1)
-    return None
+        return m.group(1), m.group(2)
+    return None, None
+
+
+def _version_number(version: Optional[str]) -> int:
+    return int(version[1:]) if version else 0
+
+
+def parse_atom_feed(xml_text: str) -> Dict[str, Dict[str, Any]]:
+    """Map ids to ``{title, abstract, version}`` for each entry.
+
+    Each entry is keyed by its versioned id (``2101.00001v2``), so v1 and v2 of one
+    paper in the same feed stay apart, and by its bare id (``2101.00001``) for the
+    latest version in the feed.
+    """
+    entries: Dict[str, Dict[str, Any]] = {}
+    try:
+        root = ET.fromstring(xml_text)
+    except ET.ParseError:
+        return entries
+    for entry in root.findall("a:entry", _ATOM_NS):
+        id_node = entry.find("a:id", _ATOM_NS)
+        arxiv_id, version = parse_arxiv_id((id_node.text or "") if id_node is not None else "")
+        if not arxiv_id:
+            continue
+        title_node = entry.find("a:title", _ATOM_NS)
+        summary_node = entry.find("a:summary", _ATOM_NS)
+        item = {
+            "title": (title_node.text or "").strip() if title_node is not None else None,
+            "abstract": (summary_node.text or "").strip() if summary_node is not None else None,
+            "version": version,
+        }
+        if version:
+            entries[f"{arxiv_id}{version}"] = item
+        latest = entries.get(arxiv_id)
+        if latest is None or _version_number(version) >= _version_number(latest["version"]):
+            entries[arxiv_id] = item
+    return entries
+
+
+@dataclass
+class ArxivDocument:
+    arxiv_id: str
+    version: Optional[str]
+    pdf_path: str
+    sha256: str
+    size: int
+    meta: Dict[str, Any]
+
+
+class ArxivDiskCache:
+    """Downloaded PDFs and Atom metadata on disk, keyed by arXiv id (+ version).
+
+    Versioned ids are immutable and never re-fetched. Unversioned ids are served
+    from disk for ``revalidate_seconds`` and then revalidated with a conditional GET
+    (ETag / Last-Modified), so an unchanged paper costs a 304 rather than a download.
+
+    PDFs are stored by content (``pdf/<sha256>.pdf``): a new version of a paper is a
+    new file, so a parse still reading the previous one never sees it change. Once
+    the PDFs pass ``max_bytes`` the least recently used are deleted, except those
+    pinned by a parse in progress and those used in the last ``grace_seconds``.
+    """
+
+    def __init__(self, directory: str, revalidate_seconds: int, max_bytes: int = 0, grace_seconds: float = 600) -> None:
+        self.directory = directory
+        self.revalidate_seconds = revalidate_seconds
+        self.max_bytes = max_bytes  # 0: no limit
+        self.grace_seconds = grace_seconds
+        # Per-key download locks with their number of holders and waiters
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        # PDF paths in use, with their number of users; eviction skips them
+        self._pinned: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[None]:
+        """Serialize downloads of one key; the lock is dropped when nobody holds or awaits it."""
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users <= 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    def path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    def pdf_path(self, sha256: str) -> str:
+        return os.path.join(self.directory, "pdf", f"{sha256}.pdf")
+
+    def has_pdf(self, entry: Optional[Dict[str, Any]]) -> bool:
+        return bool(entry and entry.get("sha256")) and os.path.exists(self.pdf_path(entry["sha256"]))
+
+    def touch(self, sha256: str) -> None:
+        # The modification time is the LRU clock
+        try:
+            os.utime(self.pdf_path(sha256))
+        except OSError:
+            pass
+
+    @contextmanager
+    def pin(self, path: str) -> Iterator[str]:
+        """Keep ``path`` from being evicted while in use (e.g. waiting in the parse queue)."""
+        self._pinned[path] = self._pinned.get(path, 0) + 1
+        try:
+            yield path
+        finally:
+            if self._pinned[path] <= 1:
+                del self._pinned[path]
+            else:
+                self._pinned[path] -= 1
+
+    def store_pdf(self, tmp: str, sha256: str) -> str:
+        """Move a finished download to its content path (or drop it if that content is stored)."""
+        path = self.pdf_path(sha256)
+        if os.path.exists(path):
+            os.unlink(tmp)
+            self.touch(sha256)
+        else:
+            os.replace(tmp, path)
+        return path
+
+    def evict(self) -> int:
+        """Delete least recently used PDFs until they fit in ``max_bytes``; returns how many."""
+        if self.max_bytes <= 0:
+            return 0
+        files = []
+        try:
+            with os.scandir(os.path.join(self.directory, "pdf")) as entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path, entry.name.endswith(".tmp")))
+        except OSError:
+            return 0
+        now = time.time()
+        total = sum(size for _, size, _, _ in files)
+        removed = 0
+        for mtime, size, path, partial in sorted(files):
+            if now - mtime < self.grace_seconds:
+                break
+            if (total <= self.max_bytes and not partial) or path in self._pinned:
+                continue
+            # Past the limit, or a download left behind by a crash
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def load_info(self, key: str) -> Dict[str, Any]:
+        try:
+            with open(self.path(key, ".json"), encoding="utf-8") as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return {}
 
+    def save_info(self, key: str, info: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.path(key, ".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as fp:
+            json.dump(info, fp)
+        os.replace(tmp, self.path(key, ".json"))
 
-async def fetch_arxiv_pdf_and_meta(id_or_url: str, timeout_seconds: int = 30) -> Tuple[bytes, Dict[str, Any]]:
-    arxiv_id = _extract_arxiv_id(id_or_url)
+    def is_fresh(self, key: str, info: Dict[str, Any], versioned: bool) -> bool:
+        complete = all(k in info for k in ("pdf", "meta")) and self.has_pdf(info["pdf"])
+        if not complete:
+            return False
+        if versioned:
+            return True
+        oldest = min(info["pdf"].get("checked_at", 0), info["meta"].get("checked_at", 0))
+        return time.time() - oldest < self.revalidate_seconds
+
+
+arxiv_cache = ArxivDiskCache(
+    os.path.join(settings.cache_dir, "arxiv"),
+    revalidate_seconds=settings.arxiv_revalidate_seconds,
+    max_bytes=settings.arxiv_cache_max_mb * 1024 * 1024,
+    grace_seconds=settings.parse_timeout_seconds * 2,
+)
+
+
+def _conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def _validators(resp: httpx.Response, **extra: Any) -> Dict[str, Any]:
+    return {
+        "etag": resp.headers.get("etag"),
+        "last_modified": resp.headers.get("last-modified"),
+        "checked_at": time.time(),
+        **extra,
+    }
+
+
+def _write_chunks(fp: BinaryIO, digest: Any, chunks: List[bytes]) -> None:
+    for chunk in chunks:
+        digest.update(chunk)
+    fp.writelines(chunks)
+
+
+async def _download_pdf(client: httpx.AsyncClient, url: str, key: str, cached: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Stream the PDF to the cache directory, hashing as it arrives. Returns its cache entry."""
+    headers = _conditional_headers(cached) if arxiv_cache.has_pdf(cached) else {}
+    async with client.stream("GET", url, headers=headers) as resp:
+        if resp.status_code == 304 and cached:
+            arxiv_cache.touch(cached["sha256"])
+            return {**cached, "checked_at": time.time()}
+        resp.raise_for_status()
+        os.makedirs(os.path.join(arxiv_cache.directory, "pdf"), exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        tmp = arxiv_cache.pdf_path(f"{key}-{uuid.uuid4().hex}") + ".tmp"
+        try:
+            with open(tmp, "wb") as fp:
+                # Chunks are hashed and written in batches in a thread, off the event loop
+                pending: List[bytes] = []
+                pending_bytes = 0
+                async for chunk in resp.aiter_bytes():
+                    pending.append(chunk)
+                    pending_bytes += len(chunk)
+                    size += len(chunk)
+                    if pending_bytes >= _WRITE_BATCH_BYTES:
+                        await asyncio.to_thread(_write_chunks, fp, digest, pending)
+                        pending, pending_bytes = [], 0
+                await asyncio.to_thread(_write_chunks, fp, digest, pending)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        arxiv_cache.store_pdf(tmp, digest.hexdigest())
+        return _validators(resp, sha256=digest.hexdigest(), size=size)
+
+
+async def _download_atom(client: httpx.AsyncClient, url: str, key: str, cached: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    path = arxiv_cache.path(key, ".atom.xml")
+    headers = _conditional_headers(cached) if cached and os.path.exists(path) else {}
+    resp = await client.get(url, headers=headers)
+    if resp.status_code == 304 and cached:
+        return {**cached, "checked_at": time.time()}
+    resp.raise_for_status()
+    os.makedirs(arxiv_cache.directory, exist_ok=True)
+    tmp = arxiv_cache.path(key, ".atom.xml.tmp")
+    with open(tmp, "w", encoding="utf-8") as fp:
+        fp.write(resp.text)
+    os.replace(tmp, path)
+    return _validators(resp)
+
+
+def _meta_from_atom(key: str, arxiv_id: str) -> Dict[str, Any]:
+    try:
+        with open(arxiv_cache.path(key, ".atom.xml"), encoding="utf-8") as fp:
+            entries = parse_atom_feed(fp.read())
+    except OSError:
+        entries = {}
+    entry = entries.get(key) or entries.get(arxiv_id) or next(iter(entries.values()), {})
+    return {"title": entry.get("title"), "abstract": entry.get("abstract"), "checked_at": time.time()}
+
+
+def _cache_key(id_or_url: str) -> Tuple[str, Optional[str], str]:
+    arxiv_id, version = parse_arxiv_id(id_or_url)
     if not arxiv_id:
         raise ValueError("Invalid arXiv id or URL")
+    return arxiv_id, version, f"{arxiv_id}{version or ''}"
+
 
-    pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-    meta_url = f"http://export.arxiv.org/api/query?search_query=id:{arxiv_id}"
+def cached_metadata(id_or_url: str) -> Optional[Dict[str, Any]]:
+    """Metadata from the disk cache if it is still fresh, else None (no network)."""
+    arxiv_id, version, key = _cache_key(id_or_url)
+    info = arxiv_cache.load_info(key)
+    if arxiv_cache.is_fresh(key, info, versioned=bool(version)):
+        return info["meta"]
+    return None
 
-    async with httpx.AsyncClient(timeout=timeout_seconds) as client:
-        pdf_resp = await client.get(pdf_url)
-        pdf_resp.raise_for_status()
-        meta_resp = await client.get(meta_url)
-        meta_resp.raise_for_status()
 
-    meta: Dict[str, Any] = {"title": None, "abstract": None}
-    try:
-        root = ET.fromstring(meta_resp.text)
-        # Atom namespace handling
-        ns = {"a": "http://www.w3.org/2005/Atom"}
-        entry = root.find("a:entry", ns)
-        if entry is not None:
-            title_node = entry.find("a:title", ns)
-            summary_node = entry.find("a:summary", ns)
-            if title_node is not None:
-                meta["title"] = (title_node.text or "").strip()
-            if summary_node is not None:
-                meta["abstract"] = (summary_node.text or "").strip()
-    except Exception:
-        pass
-
-    return pdf_resp.content, meta
+async def fetch_arxiv_metadata_batch(ids: List[str], throttle: Optional[Throttle] = None) -> Dict[str, Dict[str, Any]]:
+    """Title/abstract for many papers with one export-API ``id_list`` query per chunk.
+
+    Keys of the result are the ids exactly as given; ids missing from the feed are
+    omitted. ``throttle`` is awaited before each query.
+    """
+    keys = [_cache_key(i)[2] for i in ids]
+    found: Dict[str, Dict[str, Any]] = {}
+    client = get_http_client()
+    for offset in range(0, len(keys), _ID_LIST_CHUNK):
+        chunk = keys[offset:offset + _ID_LIST_CHUNK]
+        if throttle is not None:
+            await throttle.wait()
+        resp = await client.get(
+            settings.arxiv_api_url,
+            params={"id_list": ",".join(chunk), "max_results": len(chunk)},
+        )
+        resp.raise_for_status()
+        entries = parse_atom_feed(resp.text)
+        for original, key in zip(ids[offset:offset + _ID_LIST_CHUNK], chunk):
+            entry = entries.get(key)
+            if entry is not None:
+                found[original] = {"title": entry["title"], "abstract": entry["abstract"], "checked_at": time.time()}
+    return found
+
+
+async def fetch_arxiv_document(
+    id_or_url: str,
+    meta: Optional[Dict[str, Any]] = None,
+    throttle: Optional[Throttle] = None,
+) -> ArxivDocument:
+    """Fetch (or reuse from disk) the PDF and Atom metadata of one arXiv paper.
+
+    The PDF and the metadata are requested concurrently over the shared HTTP pool.
+    Pass ``meta`` when it was already fetched (e.g. by ``fetch_arxiv_metadata_batch``)
+    to download only the PDF. ``throttle`` is awaited only if the network is used.
+    """
+    arxiv_id, version, key = _cache_key(id_or_url)
+    # Honour an explicit version so cached results keyed on it stay correct
+    pdf_url = settings.arxiv_pdf_url.format(id=key)
+    meta_url = f"{settings.arxiv_api_url}?id_list={key}"
 
+    async with arxiv_cache.lock(key):
+        info = arxiv_cache.load_info(key)
+        if not arxiv_cache.is_fresh(key, info, versioned=bool(version)):
+            if throttle is not None:
+                await throttle.wait()
+            client = get_http_client()
+            pdf_job = _download_pdf(client, pdf_url, key, info.get("pdf"))
+            if meta is None:
+                pdf_info, atom_info = await asyncio.gather(
+                    pdf_job,
+                    _download_atom(client, meta_url, key, info.get("atom")),
+                )
+                info = {"pdf": pdf_info, "atom": atom_info, "meta": _meta_from_atom(key, arxiv_id)}
+            else:
+                info = {**info, "pdf": await pdf_job, "meta": meta}
+            arxiv_cache.save_info(key, info)
+            await asyncio.to_thread(arxiv_cache.evict)
+        else:
+            arxiv_cache.touch(info["pdf"]["sha256"])
 
+    return ArxivDocument(
+        arxiv_id=arxiv_id,
+        version=version,
+        pdf_path=arxiv_cache.pdf_path(info["pdf"]["sha256"]),
+        sha256=info["pdf"]["sha256"],
+        size=info["pdf"]["size"],
+        meta={"title": info["meta"].get("title"), "abstract": info["meta"].get("abstract")},
+    )
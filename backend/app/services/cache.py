@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+# Check the disk tier's size once per this many writes rather than on every insert
+_EVICT_EVERY = 64
+# Write pending access times from a read once this many have built up without a write
+_TOUCH_FLUSH_EVERY = 256
+_MISS = object()
+
+
+class TieredCache:
+    """Bounded in-memory LRU in front of a persistent SQLite table of JSON values.
+
+    Entries older than ``ttl_seconds`` are treated as misses, and the disk tier is
+    trimmed to ``max_disk_entries`` by dropping the least recently used rows. The
+    disk tier is opened lazily; if it cannot be used (read-only filesystem, corrupt
+    file) the cache keeps working from memory only.
+
+    Async callers use ``aget``/``aset``, which keep SQLite off the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_memory_entries: int = 256,
+        ttl_seconds: Optional[float] = None,
+        max_disk_entries: Optional[int] = None,
+    ) -> None:
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # Memory tier and stats; the disk tier has its own lock so memory hits never wait on SQLite
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        # Keys read since the last disk write, with when; their accessed_at is written in a batch
+        self._touched: Dict[str, float] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_failed = False
+        self._writes_since_evict = 0
+        self._stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "writes": 0,
+            "evictions": 0,
+            "disk_errors": 0,
+        }
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None or self._disk_failed:
+            return self._conn
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL stays consistent on crash and skips an fsync per commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "accessed_at" not in columns:
+                conn.execute("ALTER TABLE entries ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_accessed_at ON entries (accessed_at)")
+            conn.commit()
+            self._conn = conn
+        except (OSError, sqlite3.Error):
+            self._disk_failed = True
+            self._count("disk_errors")
+        return self._conn
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _count(self, stat: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[stat] += n
+
+    def _remember(self, key: str, value: Any, created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _memory_get(self, key: str, now: float) -> Any:
+        with self._lock:
+            if key in self._memory:
+                value, created_at = self._memory[key]
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._touched[key] = now
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+            return _MISS
+
+    def _flush_touched(self, conn: sqlite3.Connection) -> None:
+        # Access times are written in batches (with the next write) rather than per hit
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            conn.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", [(at, key) for key, at in touched.items()]
+            )
+
+    def _disk_get(self, key: str, now: float) -> Optional[Any]:
+        row = None
+        with self._disk_lock:
+            conn = self._connect()
+            if conn is not None:
+                try:
+                    row = conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row is not None and self._expired(row[1], now):
+                        conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                        conn.commit()
+                        self._count("expired")
+                        row = None
+                    elif len(self._touched) >= _TOUCH_FLUSH_EVERY:
+                        self._flush_touched(conn)
+                        conn.commit()
+                except sqlite3.Error:
+                    self._count("disk_errors")
+                    row = None
+        if row is None:
+            self._count("misses")
+            return None
+        value = json.loads(row[0])
+        with self._lock:
+            self._remember(key, value, row[1])
+            self._touched[key] = now
+            self._stats["disk_hits"] += 1
+        return value
+
+    def _disk_set(self, key: str, value: Any, now: float) -> None:
+        with self._disk_lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                self._flush_touched(conn)
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                self._writes_since_evict += 1
+                if self.max_disk_entries is not None and self._writes_since_evict >= _EVICT_EVERY:
+                    self._writes_since_evict = 0
+                    self._evict(conn, now)
+                conn.commit()
+            except sqlite3.Error:
+                self._count("disk_errors")
+
+    def _store(self, key: str, value: Any, now: float) -> None:
+        with self._lock:
+            self._remember(key, value, now)
+            self._stats["writes"] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        value = self._memory_get(key, now)
+        return self._disk_get(key, now) if value is _MISS else value
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        self._store(key, value, now)
+        self._disk_set(key, value, now)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """``get`` for event-loop callers: memory hits are served inline, the disk tier in a thread."""
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not _MISS:
+            return value
+        if self._disk_failed:
+            self._count("misses")
+            return None
+        return await asyncio.to_thread(self._disk_get, key, now)
+
+    async def aset(self, key: str, value: Any) -> None:
+        """``set`` for event-loop callers; the disk write runs in a thread."""
+        now = time.time()
+        self._store(key, value, now)
+        if not self._disk_failed:
+            await asyncio.to_thread(self._disk_set, key, value, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds is not None:
+            cur = conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._count("evictions", max(cur.rowcount, 0))
+        (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        excess = count - (self.max_disk_entries or count)
+        if excess > 0:
+            cur = conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                (excess,),
+            )
+            self._count("evictions", max(cur.rowcount, 0))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            return {
+                **self._stats,
+                "hits": hits,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self) -> None:
+        with self._disk_lock:
+            if self._conn is not None:
+                try:
+                    self._flush_touched(self._conn)
+                    self._conn.commit()
+                except sqlite3.Error:
+                    self._count("disk_errors")
+                self._conn.close()
+                self._conn = None
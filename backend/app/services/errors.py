@@ -0,0 +1,5 @@
+from __future__ import annotations
+
+
+class PoolBusyError(RuntimeError):
+    """Raised when a bounded pool or queue has no room for more work."""
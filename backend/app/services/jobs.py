@@ -0,0 +1,473 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import heapq
+import itertools
+import os
+import subprocess
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlmodel import select
+
+from ..core.config import settings
+from ..db import get_session
+from ..models import Job, Run
+from .sandbox.factory import create_executor, executor_config
+from .runs import (
+    TIMEOUT_RETURNCODE,
+    execution_key,
+    find_cached_run,
+    load_job_code,
+    load_run_output,
+    new_run,
+    prune_run_logs,
+    put_blob,
+)
+from .sandbox.output import OutputCapture
+from .errors import PoolBusyError
+
+
+# Recent queue waits kept for the wait-time percentiles on /metrics
+_WAIT_SAMPLES = 200
+# Job logs are checked against the retention limits at most this often
+_LOG_PRUNE_INTERVAL_SECONDS = 60
+# Submissions without a user id; limited only by the global concurrency limit
+ANONYMOUS = "anonymous"
+
+
+def job_view(job: Job, run: Optional[Run] = None, output: Optional[Tuple[str, str]] = None) -> Dict[str, Any]:
+    view: Dict[str, Any] = {
+        "id": job.id,
+        "status": job.status,
+        "user_id": job.user_id,
+        "priority": job.priority,
+        "run_id": job.run_id,
+        "cached": bool(job.cached),
+        "error": job.error,
+        "queued_at": job.queued_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if run is not None:
+        stdout, stderr = output if output is not None else (run.stdout, run.stderr)
+        view.update(stdout=stdout, stderr=stderr, returncode=run.returncode, has_log=bool(run.log_path))
+        # A replayed job reports when the run it replays actually executed
+        view["cached_at"] = run.created_at.isoformat() if job.cached else None
+    return view
+
+
+# Blocking database work of the scheduler; called through asyncio.to_thread
+
+
+def _recover_jobs() -> List[Job]:
+    with get_session() as session:
+        for job in session.exec(select(Job).where(Job.status == "running")).all():
+            job.status = "failed"
+            job.error = "Interrupted by a server restart"
+            job.finished_at = datetime.utcnow()
+            session.add(job)
+        session.commit()
+        return list(session.exec(select(Job).where(Job.status == "queued").order_by(Job.queued_at)).all())
+
+
+def _insert_job(code: str, user_id: str, priority: int, doc_id: Optional[str]) -> Job:
+    with get_session() as session:
+        job = Job(code_hash=put_blob(session, code), user_id=user_id, priority=priority, doc_id=doc_id)
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return job
+
+
+def _insert_cached_job(
+    code: str, user_id: str, priority: int, doc_id: Optional[str], exec_key: str, max_age_seconds: float
+) -> Optional[Job]:
+    """A finished job replaying the latest run of ``exec_key``, or None if there is none recent enough."""
+    with get_session() as session:
+        run = find_cached_run(session, exec_key, max_age_seconds)
+        if run is None:
+            return None
+        now = datetime.utcnow()
+        job = Job(
+            status="done",
+            code_hash=run.code_hash or put_blob(session, code),
+            user_id=user_id,
+            priority=priority,
+            doc_id=doc_id,
+            run_id=run.id,
+            cached=True,
+            queued_at=now,
+            started_at=now,
+            finished_at=now,
+        )
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return job
+
+
+def _mark_running(job_id: int) -> Optional[Tuple[str, Optional[str], float]]:
+    """Code, doc id and queue wait of a job that is starting, or None if it is gone."""
+    with get_session() as session:
+        job = session.get(Job, job_id)
+        if job is None:
+            return None
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return load_job_code(session, job), job.doc_id, (job.started_at - job.queued_at).total_seconds()
+
+
+def _mark_queued(job_id: int) -> None:
+    with get_session() as session:
+        job = session.get(Job, job_id)
+        if job is not None:
+            job.status = "queued"
+            job.started_at = None
+            session.add(job)
+            session.commit()
+
+
+def _finish_job(
+    job_id: int,
+    status: str,
+    error: Optional[str],
+    returncode: Optional[int],
+    code: str,
+    doc_id: Optional[str],
+    capture: OutputCapture,
+    exec_key: Optional[str],
+) -> None:
+    with get_session() as session:
+        job = session.get(Job, job_id)
+        if returncode is not None:
+            run = new_run(
+                session,
+                code=code,
+                stdout=capture.preview("stdout"),
+                stderr=capture.preview("stderr"),
+                returncode=returncode,
+                doc_id=doc_id,
+                log_path=capture.log_path,
+                # Only completed runs can be replayed
+                exec_key=exec_key if status == "done" else None,
+            )
+            session.flush()
+            job.run_id = run.id
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+
+
+def _prune_logs(keep: List[str]) -> int:
+    with get_session() as session:
+        return prune_run_logs(
+            session,
+            settings.run_log_dir,
+            settings.run_log_retention_days * 86400,
+            settings.run_log_max_mb * 1024 * 1024,
+            keep,
+        )
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _load_job(job_id: int) -> Optional[Dict[str, Any]]:
+    with get_session() as session:
+        job = session.get(Job, job_id)
+        if job is None:
+            return None
+        run = session.get(Run, job.run_id) if job.run_id is not None else None
+        return job_view(job, run, load_run_output(session, run) if run is not None else None)
+
+
+def _load_log_path(job_id: int) -> Optional[str]:
+    with get_session() as session:
+        job = session.get(Job, job_id)
+        run = session.get(Run, job.run_id) if job is not None and job.run_id is not None else None
+        return run.log_path if run is not None else None
+
+
+class JobScheduler:
+    """Runs experiment jobs in priority order under global and per-user concurrency limits.
+
+    Jobs are persisted as ``Job`` rows, so a restart re-queues what was waiting and
+    marks what was running as failed. Each job runs its executor in a thread, so
+    the event loop keeps serving requests while experiments run. A running job's
+    output is available live through ``capture``. Anonymous jobs are limited only
+    by ``max_concurrent``. A job whose sandbox is at capacity (PoolBusyError) goes
+    back to its place in the queue, and dispatching pauses for ``busy_retry_seconds``.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 2,
+        max_per_user: int = 1,
+        queue_limit: int = 100,
+        timeout_seconds: int = 60,
+        busy_retry_seconds: float = 1.0,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.queue_limit = queue_limit
+        self.timeout_seconds = timeout_seconds
+        self.busy_retry_seconds = busy_retry_seconds
+        # (-priority, sequence, job_id, user_id); sequence keeps FIFO order within a priority
+        self._queue: List[Tuple[int, int, int, str]] = []
+        self._seq = itertools.count()
+        self._running: Dict[int, asyncio.Task] = {}
+        self._running_per_user: Dict[str, int] = collections.Counter()
+        self._done: Dict[int, asyncio.Event] = {}
+        self._started: Dict[int, asyncio.Event] = {}
+        self._captures: Dict[int, OutputCapture] = {}
+        self._waits: Deque[float] = collections.deque(maxlen=_WAIT_SAMPLES)
+        self._closing = False
+        self._paused_until = 0.0  # loop time; set when a sandbox was full
+        self._pruning: Optional[asyncio.Task] = None
+        self._pruned_at: Optional[float] = None
+        self._inserting = 0  # submissions being written; they count towards queue_limit
+        self._stats: Dict[str, int] = {
+            "submitted": 0, "rejected": 0, "done": 0, "failed": 0, "timeout": 0, "recovered": 0, "cache_hits": 0,
+            "requeued": 0, "logs_pruned": 0,
+        }
+
+    async def start(self) -> None:
+        """Recover persisted jobs: running ones were interrupted, queued ones still wait."""
+        self._closing = False
+        for job in await asyncio.to_thread(_recover_jobs):
+            self._push(job)
+            self._stats["recovered"] += 1
+        self._dispatch()
+        self._prune_logs()
+
+    async def close(self) -> None:
+        # Executor threads cannot be interrupted; their jobs are marked failed on next start
+        self._closing = True
+        for task in list(self._running.values()):
+            task.cancel()
+
+    def _push(self, job: Job) -> None:
+        assert job.id is not None
+        heapq.heappush(self._queue, (-job.priority, next(self._seq), job.id, job.user_id))
+        self._done.setdefault(job.id, asyncio.Event())
+        self._started.setdefault(job.id, asyncio.Event())
+
+    def execution_key(self, code: str) -> str:
+        """Cache key of running ``code`` now: the code, executor config and time limit."""
+        return execution_key(code, {**executor_config(), "timeout_seconds": self.timeout_seconds})
+
+    async def submit(
+        self,
+        code: str,
+        user_id: str = ANONYMOUS,
+        priority: int = 0,
+        doc_id: Optional[str] = None,
+        use_cache: bool = False,
+        force_rerun: bool = False,
+    ) -> Job:
+        """Queue ``code`` as a new job.
+
+        With ``use_cache`` (and not ``force_rerun``), a run of the same code under the
+        same executor config within ``run_cache_ttl_seconds`` is replayed instead: the
+        job is returned already done, with ``cached`` set. A forced re-run executes and
+        becomes the run that later cached requests replay.
+        """
+        if use_cache and not force_rerun:
+            cached = await asyncio.to_thread(
+                _insert_cached_job, code, user_id, priority, doc_id,
+                self.execution_key(code), settings.run_cache_ttl_seconds,
+            )
+            if cached is not None:
+                self._stats["cache_hits"] += 1
+                return cached
+        if len(self._queue) + self._inserting >= self.queue_limit:
+            self._stats["rejected"] += 1
+            raise PoolBusyError(f"job queue is full ({self.queue_limit} waiting)")
+        self._inserting += 1
+        try:
+            job = await asyncio.to_thread(_insert_job, code, user_id, priority, doc_id)
+        finally:
+            self._inserting -= 1
+        self._stats["submitted"] += 1
+        self._push(job)
+        self._dispatch()
+        return job
+
+    def _dispatch(self) -> None:
+        if asyncio.get_running_loop().time() < self._paused_until:
+            return
+        skipped: List[Tuple[int, int, int, str]] = []
+        while not self._closing and self._queue and len(self._running) < self.max_concurrent:
+            entry = heapq.heappop(self._queue)
+            user_id = entry[3]
+            if user_id != ANONYMOUS and self._running_per_user[user_id] >= self.max_per_user:
+                skipped.append(entry)
+                continue
+            job_id = entry[2]
+            self._running_per_user[user_id] += 1
+            self._running[job_id] = asyncio.create_task(self._execute(entry))
+        for entry in skipped:
+            heapq.heappush(self._queue, entry)
+
+    def _pause(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._paused_until = loop.time() + self.busy_retry_seconds
+        loop.call_later(self.busy_retry_seconds, self._dispatch)
+
+    def _prune_logs(self) -> None:
+        """Apply the log retention limits in the background, at most once per interval."""
+        now = asyncio.get_running_loop().time()
+        if self._pruning is not None or (
+            self._pruned_at is not None and now - self._pruned_at < _LOG_PRUNE_INTERVAL_SECONDS
+        ):
+            return
+        self._pruned_at = now
+        keep = [c.log_path for c in self._captures.values() if c.log_path]
+        self._pruning = asyncio.create_task(asyncio.to_thread(_prune_logs, keep))
+        self._pruning.add_done_callback(self._pruned)
+
+    def _pruned(self, task: asyncio.Task) -> None:
+        self._pruning = None
+        if not task.cancelled() and task.exception() is None:
+            self._stats["logs_pruned"] += task.result()
+
+    async def _execute(self, entry: Tuple[int, int, int, str]) -> None:
+        job_id, user_id = entry[2], entry[3]
+        requeue = False
+        try:
+            started_job = await asyncio.to_thread(_mark_running, job_id)
+            if started_job is None:
+                return
+            code, doc_id, waited = started_job
+            self._waits.append(waited)
+            exec_key = self.execution_key(code)
+
+            capture = OutputCapture(
+                log_path=os.path.join(settings.run_log_dir, f"job-{job_id}.ndjson.gz"),
+                head_chars=settings.run_output_preview_chars,
+                tail_chars=settings.run_output_preview_chars,
+            )
+            self._captures[job_id] = capture
+            started = self._started.pop(job_id, None)
+            if started is not None:
+                started.set()
+            status, error, returncode = "done", None, None
+            try:
+                result = await asyncio.to_thread(create_executor().run_code, code, self.timeout_seconds, capture)
+                returncode = result.returncode
+            except subprocess.TimeoutExpired:
+                # Keep what it printed before it was killed
+                status, error, returncode = "timeout", f"Timed out after {self.timeout_seconds}s", TIMEOUT_RETURNCODE
+            except PoolBusyError:
+                # The sandbox is at capacity (e.g. the docker pool's container cap); the job has not run
+                requeue = True
+            except Exception as exc:  # noqa: BLE001 - recorded on the job
+                status, error = "failed", f"{type(exc).__name__}: {exc}"
+            finally:
+                capture.close()
+            if requeue:
+                await asyncio.to_thread(_mark_queued, job_id)
+                if capture.log_path:
+                    await asyncio.to_thread(_remove_file, capture.log_path)
+                self._stats["requeued"] += 1
+                return
+            await asyncio.to_thread(
+                _finish_job, job_id, status, error, returncode, code, doc_id, capture, exec_key
+            )
+            self._stats[status] += 1
+            self._prune_logs()
+        finally:
+            self._running.pop(job_id, None)
+            self._captures.pop(job_id, None)
+            self._running_per_user[user_id] -= 1
+            if self._running_per_user[user_id] <= 0:
+                del self._running_per_user[user_id]
+            if requeue and not self._closing:
+                # Back in its old place; streams opened from now on wait for the next start
+                heapq.heappush(self._queue, entry)
+                self._started.setdefault(job_id, asyncio.Event())
+                self._pause()
+            else:
+                started = self._started.pop(job_id, None)
+                if started is not None:
+                    started.set()
+                event = self._done.pop(job_id, None)
+                if event is not None:
+                    event.set()
+            self._dispatch()
+
+    async def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        view = await asyncio.to_thread(_load_job, job_id)
+        if view is None:
+            return None
+        if view["status"] == "queued":
+            view["queue_position"] = self._position(job_id)
+        return view
+
+    def _position(self, job_id: int) -> Optional[int]:
+        ordered = sorted(self._queue)
+        for position, entry in enumerate(ordered):
+            if entry[2] == job_id:
+                return position
+        return None
+
+    async def wait(self, job_id: int, timeout: Optional[float]) -> Optional[Dict[str, Any]]:
+        """Job status, after waiting up to ``timeout`` seconds (None: no limit) for it to finish."""
+        event = self._done.get(job_id)
+        if event is not None and (timeout is None or timeout > 0):
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return await self.get(job_id)
+
+    async def wait_started(self, job_id: int, timeout: Optional[float] = None) -> bool:
+        """Wait up to ``timeout`` seconds (None: no limit) until the job is running or
+        finished; returns whether it is."""
+        event = self._started.get(job_id)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def log_path(self, job_id: int) -> Optional[str]:
+        return await asyncio.to_thread(_load_log_path, job_id)
+
+    def capture(self, job_id: int) -> Optional[OutputCapture]:
+        """Live output of a running job, or None if it is not running."""
+        return self._captures.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            **self._stats,
+            "queued": len(self._queue),
+            "running": len(self._running),
+            "max_concurrent": self.max_concurrent,
+            "max_per_user": self.max_per_user,
+            "wait_seconds_p50": waits[len(waits) // 2] if waits else None,
+            "wait_seconds_p95": waits[int(len(waits) * 0.95)] if waits else None,
+            "wait_seconds_max": waits[-1] if waits else None,
+        }
+
+
+job_scheduler = JobScheduler(
+    max_concurrent=settings.job_max_concurrent,
+    max_per_user=settings.job_max_per_user,
+    queue_limit=settings.job_queue_limit,
+    timeout_seconds=settings.job_timeout_seconds,
+    busy_retry_seconds=settings.job_busy_retry_seconds,
+)
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from typing import Any, AsyncIterator, Dict, Optional
 
 
 class LLMClient(ABC):
+    # Identify the upstream model, e.g. for cache keys
+    provider: str = ""
+    model_name: str = ""
+
     @abstractmethod
     def generate_text(
         self,
@@ -16,4 +21,44 @@ class LLMClient(ABC):
     ) -> str:
         raise NotImplementedError
 
+    async def agenerate_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        **kwargs: Dict[str, Any],
+    ) -> str:
+        """Async variant; by default runs the blocking ``generate_text`` in a worker thread.
+
+        Providers with a native async SDK should override this.
+        """
+        return await asyncio.to_thread(
+            self.generate_text,
+            prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs,
+        )
+
+    async def astream_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        **kwargs: Dict[str, Any],
+    ) -> AsyncIterator[str]:
+        """Yield the response in pieces as the provider produces them.
 
+        The default yields the whole ``agenerate_text`` result at once; providers
+        that support incremental output should override this.
+        """
+        yield await self.agenerate_text(
+            prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs,
+        )
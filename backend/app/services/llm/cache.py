@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ...core.config import settings
+from ..cache import TieredCache
+from .base import LLMClient
+
+
+llm_cache = TieredCache(
+    os.path.join(settings.cache_dir, "llm.sqlite"),
+    max_memory_entries=settings.llm_cache_memory_entries,
+    ttl_seconds=settings.llm_cache_ttl_seconds,
+    max_disk_entries=settings.llm_cache_max_entries,
+)
+
+
+def llm_cache_key(
+    client: LLMClient,
+    prompt: str,
+    system_prompt: Optional[str],
+    temperature: float,
+    max_tokens: int | None,
+    extra: Dict[str, Any],
+) -> str:
+    payload = json.dumps(
+        {
+            "provider": client.provider,
+            "model": client.model_name,
+            "system_prompt": system_prompt,
+            "prompt": prompt,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "extra": extra,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachingLLMClient(LLMClient):
+    """Wraps an ``LLMClient`` and serves repeated identical requests from ``llm_cache``.
+
+    ``bypass_cache=True`` skips the lookup but still stores the fresh response.
+    """
+
+    def __init__(self, inner: LLMClient, cache: TieredCache = llm_cache) -> None:
+        self.inner = inner
+        self.cache = cache
+        self.provider = inner.provider
+        self.model_name = inner.model_name
+
+    def generate_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        bypass_cache: bool = False,
+        **kwargs: Dict[str, Any],
+    ) -> str:
+        key = llm_cache_key(self.inner, prompt, system_prompt, temperature, max_tokens, kwargs)
+        if not bypass_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        text = self.inner.generate_text(
+            prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs,
+        )
+        # Empty output usually means a blocked or failed generation; do not pin it
+        if text:
+            self.cache.set(key, text)
+        return text
+
+    async def agenerate_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        bypass_cache: bool = False,
+        **kwargs: Dict[str, Any],
+    ) -> str:
+        key = llm_cache_key(self.inner, prompt, system_prompt, temperature, max_tokens, kwargs)
+        if not bypass_cache:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                return cached
+        text = await self.inner.agenerate_text(
+            prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs,
+        )
+        if text:
+            await self.cache.aset(key, text)
+        return text
+
+    async def astream_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        bypass_cache: bool = False,
+        **kwargs: Dict[str, Any],
+    ) -> AsyncIterator[str]:
+        """Stream from the provider, caching the assembled text once the stream completes.
+
+        A cache hit is yielded as a single piece. A stream abandoned part way (client
+        disconnect, provider error) is not cached.
+        """
+        key = llm_cache_key(self.inner, prompt, system_prompt, temperature, max_tokens, kwargs)
+        if not bypass_cache:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                yield cached
+                return
+        parts: List[str] = []
+        async for piece in self.inner.astream_text(
+            prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs,
+        ):
+            parts.append(piece)
+            yield piece
+        text = "".join(parts)
+        if text:
+            await self.cache.aset(key, text)
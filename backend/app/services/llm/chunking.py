@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import re
+from typing import List
+
+
+# Rough English average; close enough to budget prompts without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Coarsest boundary first: numbered/markdown subsection headings, blank lines,
+# single line breaks (PDF text rarely has blank lines), then sentence ends
+_BOUNDARIES = [
+    re.compile(r"\n(?=[ \t]*(?:\d+(?:\.\d+)+\.?[ \t]+[A-Z]|#{1,6}[ \t]))"),
+    re.compile(r"\n[ \t]*\n"),
+    re.compile(r"\n"),
+    re.compile(r"(?<=[.!?])[ \t]+"),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _pieces(text: str, max_chars: int, level: int = 0) -> List[str]:
+    if len(text) <= max_chars:
+        return [text]
+    if level >= len(_BOUNDARIES):
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+    parts = [p for p in _BOUNDARIES[level].split(text) if p.strip()]
+    if len(parts) <= 1:
+        return _pieces(text, max_chars, level + 1)
+    out: List[str] = []
+    for part in parts:
+        out.extend(_pieces(part, max_chars, level + 1))
+    return out
+
+
+def split_by_token_budget(text: str, max_tokens: int) -> List[str]:
+    """Split ``text`` into chunks of at most ``max_tokens`` (estimated), in order.
+
+    Cuts prefer subsection boundaries, then paragraphs, then lines, then sentences;
+    only a single over-long sentence is cut mid-text. Adjacent small pieces are packed
+    together so the number of chunks stays close to the minimum.
+    """
+    max_chars = max(1, max_tokens) * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current = ""
+    for piece in _pieces(text.strip(), max_chars):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
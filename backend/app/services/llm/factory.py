@@ -1,21 +1,73 @@
 from __future__ import annotations
 
-from typing import Optional
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 
+from ...core.config import settings
 from .base import LLMClient
+from .cache import CachingLLMClient
 from .gemini import GeminiClient
+from .singleflight import CoalescingLLMClient
+
+
+_registry: "OrderedDict[Tuple[str, str, str, bool], LLMClient]" = OrderedDict()
+_registry_lock = threading.Lock()
+_registry_stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _key_fingerprint(api_key: str) -> str:
+    # Keys never sit in the registry in plain text
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def _registered(key: Tuple[str, str, str, bool], build) -> LLMClient:
+    with _registry_lock:
+        client = _registry.get(key)
+        if client is not None:
+            _registry.move_to_end(key)
+            _registry_stats["hits"] += 1
+            return client
+        _registry_stats["misses"] += 1
+        client = build()
+        _registry[key] = client
+        while len(_registry) > max(1, settings.llm_client_registry_size):
+            # Dropped clients are closed by garbage collection once in-flight calls finish
+            _registry.popitem(last=False)
+            _registry_stats["evictions"] += 1
+        return client
+
+
+def registry_stats() -> Dict[str, int]:
+    with _registry_lock:
+        return {**_registry_stats, "clients": len(_registry)}
 
 
 def create_llm_client(provider: str, *,
                       gemini_api_key: Optional[str] = None,
                       openai_api_key: Optional[str] = None,
-                      anthropic_api_key: Optional[str] = None) -> LLMClient:
+                      anthropic_api_key: Optional[str] = None,
+                      cache: bool | None = None) -> LLMClient:
+    """Return a client for ``provider``; wrapped in the response cache unless ``cache`` is False
+    (defaults to ``settings.llm_cache_enabled``).
+
+    Clients are shared process-wide per (provider, model, api key), so repeated
+    requests reuse configured SDK clients and their connections. The registry is a
+    bounded LRU, so per-request ``api_key`` overrides cannot grow it without limit.
+    Identical concurrent requests on a cache miss share one upstream call.
+    """
     p = (provider or "").lower()
+    use_cache = settings.llm_cache_enabled if cache is None else cache
     if p in ("gemini", "google", "googleai"):
         if not gemini_api_key:
             raise ValueError("GEMINI_API_KEY missing")
-        return GeminiClient(api_key=gemini_api_key)
-    # Future: implement OpenAI/Anthropic adapters
-    raise ValueError(f"Unsupported provider: {provider}")
+        model = settings.gemini_model
 
+        def build() -> LLMClient:
+            client: LLMClient = CoalescingLLMClient(GeminiClient(api_key=gemini_api_key, model=model))
+            return CachingLLMClient(client) if use_cache else client
 
+        return _registered(("gemini", model, _key_fingerprint(gemini_api_key), use_cache), build)
+    # Future: implement OpenAI/Anthropic adapters
+    raise ValueError(f"Unsupported provider: {provider}")
@@ -1,52 +1,109 @@
 from __future__ import annotations
 
-from typing import Optional, Dict, Any, List
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from .base import LLMClient
 
 
 class GeminiClient(LLMClient):
+    provider = "gemini"
+
     def __init__(self, api_key: str, model: str = "gemini-1.5-flash") -> None:
-        import google.generativeai as genai  # lazy import
+        from google.ai import generativelanguage as glm  # lazy import
 
-        self._genai = genai
-        self._genai.configure(api_key=api_key)
-        self._model_name = model
+        self._glm = glm
+        # Each client owns its service clients, configured with its own key: the
+        # process-wide genai.configure would make clients with different keys wait
+        # on (or race for) one global setting
+        self._client_options = {"api_key": api_key}
+        self.model_name = model
+        self._model_path = model if model.startswith(("models/", "tunedModels/")) else f"models/{model}"
+        self._lock = threading.Lock()
+        self._sync_client: Any = None
+        # The async transport binds to the loop it was created on
+        self._async_client: Optional[Tuple[asyncio.AbstractEventLoop, Any]] = None
 
-    def generate_text(
+    def _client(self) -> Any:
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = self._glm.GenerativeServiceClient(client_options=self._client_options)
+            return self._sync_client
+
+    def _aclient(self) -> Any:
+        loop = asyncio.get_running_loop()
+        current = self._async_client
+        if current is None or current[0] is not loop:
+            current = (loop, self._glm.GenerativeServiceAsyncClient(client_options=self._client_options))
+            self._async_client = current
+        return current[1]
+
+    def _request(
         self,
         prompt: str,
-        system_prompt: Optional[str] = None,
-        temperature: float = 0.2,
-        max_tokens: int | None = None,
-        **kwargs: Dict[str, Any],
-    ) -> str:
-        model = self._genai.GenerativeModel(self._model_name)
-
-        contents: List[str] = []
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int | None,
+    ) -> Any:
+        texts: List[str] = []
         if system_prompt:
-            contents.append(system_prompt)
-        contents.append(prompt)
+            texts.append(system_prompt)
+        texts.append(prompt)
 
-        generation_config = {
+        generation_config: Dict[str, Any] = {
             "temperature": temperature,
         }
         if max_tokens is not None:
             generation_config["max_output_tokens"] = max_tokens
-
-        resp = model.generate_content(
-            contents,
-            generation_config=generation_config,
+        return self._glm.GenerateContentRequest(
+            model=self._model_path,
+            contents=[self._glm.Content(role="user", parts=[self._glm.Part(text=text) for text in texts])],
+            generation_config=self._glm.GenerationConfig(**generation_config),
         )
 
-        try:
-            return resp.text or ""
-        except Exception:
-            # some SDK versions use different structure
-            if hasattr(resp, "candidates") and resp.candidates:
-                parts = getattr(resp.candidates[0], "content", None)
-                if parts and hasattr(parts, "parts") and parts.parts:
-                    return getattr(parts.parts[0], "text", "")
+    @staticmethod
+    def _response_text(resp: Any) -> str:
+        candidates = getattr(resp, "candidates", None)
+        if not candidates:
             return ""
+        content = getattr(candidates[0], "content", None)
+        return "".join(getattr(part, "text", "") for part in getattr(content, "parts", None) or [])
+
+    def generate_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        **kwargs: Dict[str, Any],
+    ) -> str:
+        resp = self._client().generate_content(self._request(prompt, system_prompt, temperature, max_tokens))
+        return self._response_text(resp)
 
+    async def agenerate_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        **kwargs: Dict[str, Any],
+    ) -> str:
+        resp = await self._aclient().generate_content(self._request(prompt, system_prompt, temperature, max_tokens))
+        return self._response_text(resp)
 
+    async def astream_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        **kwargs: Dict[str, Any],
+    ) -> AsyncIterator[str]:
+        stream = await self._aclient().stream_generate_content(
+            self._request(prompt, system_prompt, temperature, max_tokens)
+        )
+        async for chunk in stream:
+            text = self._response_text(chunk)
+            if text:
+                yield text
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .base import LLMClient
+from .chunking import estimate_tokens
+
+
+@dataclass
+class ChunkResult:
+    index: int
+    chars: int
+    latency_ms: float
+    text: str
+
+
+@dataclass
+class MapReduceResult:
+    text: str
+    chunks: List[ChunkResult] = field(default_factory=list)
+    reduce_latency_ms: Optional[float] = None
+    reduce_rounds: int = 0
+
+
+def _reduce_groups(partials: List[str], budget_tokens: int) -> List[List[str]]:
+    """Consecutive runs of ``partials`` whose joined text fits ``budget_tokens``.
+
+    A group holds at least two partials (but for a last leftover), so every round
+    shrinks the list even when single partials are near the budget.
+    """
+    groups: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for text in partials:
+        tokens = estimate_tokens(text)
+        if len(current) >= 2 and size + tokens > budget_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+async def map_reduce_generate(
+    client: LLMClient,
+    chunks: List[str],
+    map_request: Callable[[int, int, str], Dict[str, Any]],
+    reduce_request: Callable[[List[str]], Dict[str, Any]],
+    parallelism: int = 4,
+    reduce_budget_tokens: Optional[int] = None,
+) -> MapReduceResult:
+    """Generate one partial answer per chunk concurrently, then merge them.
+
+    ``map_request(index, total, chunk)`` and ``reduce_request(partials)`` return the
+    keyword arguments for ``client.agenerate_text``. At most ``parallelism`` calls
+    are in flight at once. If any call fails the others are cancelled and the
+    error propagates.
+
+    The partials are merged in one call while their joined size (estimated tokens)
+    fits ``reduce_budget_tokens``; above it, consecutive groups that fit are merged
+    concurrently and the merged texts are reduced again, until one call suffices.
+    """
+    limit = asyncio.Semaphore(max(1, parallelism))
+
+    async def run_map(index: int, chunk: str) -> ChunkResult:
+        async with limit:
+            started = time.perf_counter()
+            text = await client.agenerate_text(**map_request(index, len(chunks), chunk))
+            return ChunkResult(
+                index=index,
+                chars=len(chunk),
+                latency_ms=round((time.perf_counter() - started) * 1000, 1),
+                text=text.strip(),
+            )
+
+    async def run_reduce(partials: List[str]) -> str:
+        if len(partials) == 1:
+            return partials[0]
+        async with limit:
+            text = await client.agenerate_text(**reduce_request(partials))
+            return text.strip()
+
+    results = await _gather_or_cancel([run_map(i, chunk) for i, chunk in enumerate(chunks)])
+    if len(results) == 1:
+        return MapReduceResult(text=results[0].text, chunks=list(results))
+    started = time.perf_counter()
+    partials = [r.text for r in results]
+    rounds = 0
+    while len(partials) > 1:
+        rounds += 1
+        if reduce_budget_tokens is None or sum(estimate_tokens(p) for p in partials) <= reduce_budget_tokens:
+            groups = [partials]
+        else:
+            groups = _reduce_groups(partials, reduce_budget_tokens)
+        partials = await _gather_or_cancel([run_reduce(group) for group in groups])
+    return MapReduceResult(
+        text=partials[0],
+        chunks=list(results),
+        reduce_latency_ms=round((time.perf_counter() - started) * 1000, 1),
+        reduce_rounds=rounds,
+    )
+
+
+async def _gather_or_cancel(coros: List[Awaitable[Any]]) -> List[Any]:
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
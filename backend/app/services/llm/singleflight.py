@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from .base import LLMClient
+from .cache import llm_cache_key
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Future) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent async calls that share a key into one execution.
+
+    The first caller for a key starts the call; callers arriving while it is in
+    flight await the same result, or the same exception. A waiter that is cancelled
+    leaves without affecting the others; the call itself is cancelled only once every
+    waiter has gone.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self._stats: Dict[str, int] = {"calls": 0, "coalesced": 0, "abandoned": 0}
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task, f=flight: self._forget(key, f))
+            self._stats["calls"] += 1
+        else:
+            self._stats["coalesced"] += 1
+        flight.waiters += 1
+        try:
+            # shield: cancelling one waiter must not cancel the shared call
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._stats["abandoned"] += 1
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "in_flight": len(self._flights)}
+
+
+llm_flights = SingleFlight()
+
+
+class CoalescingLLMClient(LLMClient):
+    """Wraps an ``LLMClient`` so identical concurrent ``agenerate_text`` calls share one upstream request.
+
+    Requests are identical when provider, model, prompts and generation parameters
+    match (the response cache key) and they go through the same wrapped client, so
+    callers with different API keys never share a call. Streaming is not coalesced.
+    """
+
+    def __init__(self, inner: LLMClient, flights: SingleFlight = llm_flights) -> None:
+        self.inner = inner
+        self.flights = flights
+        self.provider = inner.provider
+        self.model_name = inner.model_name
+
+    def generate_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        **kwargs: Dict[str, Any],
+    ) -> str:
+        return self.inner.generate_text(
+            prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs,
+        )
+
+    async def agenerate_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        **kwargs: Dict[str, Any],
+    ) -> str:
+        key = f"{id(self.inner)}:" + llm_cache_key(self.inner, prompt, system_prompt, temperature, max_tokens, kwargs)
+        return await self.flights.do(
+            key,
+            lambda: self.inner.agenerate_text(
+                prompt,
+                system_prompt=system_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **kwargs,
+            ),
+        )
+
+    async def astream_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        **kwargs: Dict[str, Any],
+    ) -> AsyncIterator[str]:
+        async for piece in self.inner.astream_text(
+            prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs,
+        ):
+            yield piece
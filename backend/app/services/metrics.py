@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import collections
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from ..core.config import settings
+from .sandbox.output import read_log
+from .workers import WorkerPool
+
+
+MODES = ("first", "last", "all")
+MAX_PATTERN_CHARS = 1000
+
+
+@dataclass(frozen=True)
+class MetricQuery:
+    name: str
+    pattern: str
+    mode: str = "first"  # first | last | all
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern: str) -> re.Pattern:
+    """Compiled pattern, cached per process. Raises ``re.error`` when invalid."""
+    return re.compile(pattern)
+
+
+def _value_group(compiled: re.Pattern) -> int:
+    # The first group holds the number; a pattern without groups is the number itself
+    return 1 if compiled.groups else 0
+
+
+def _number(text: Optional[str]) -> Optional[float]:
+    try:
+        return float(text) if text is not None else None
+    except ValueError:
+        return None
+
+
+def _scan_one(compiled: re.Pattern, mode: str, text: str) -> List[float]:
+    group = _value_group(compiled)
+    if mode == "first":
+        for match in compiled.finditer(text):
+            value = _number(match.group(group))
+            if value is not None:
+                return [value]
+        return []
+    values = [v for v in (_number(m.group(group)) for m in compiled.finditer(text)) if v is not None]
+    return values[-1:] if mode == "last" else values
+
+
+def extract_series(text: str, queries: Sequence[MetricQuery]) -> List[List[float]]:
+    """Numeric matches of each query in ``text``, in order of appearance.
+
+    Each pattern is scanned on its own, so a metric's values never depend on the
+    other metrics in the request. (Merging the patterns into one alternation would
+    let one metric's match hide another's, and is no faster than separate scans,
+    which benefit from each pattern's literal prefix.) For ``first`` and ``last``
+    the list has at most one value.
+    """
+    return [_scan_one(compile_pattern(query.pattern), query.mode, text) for query in queries]
+
+
+def summarize(values: Sequence[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    return {
+        "count": len(values),
+        "min": min(values),
+        "max": max(values),
+        "mean": sum(values) / len(values),
+        "final": values[-1],
+    }
+
+
+def distribution(values: Sequence[float]) -> Optional[Dict[str, float]]:
+    """Spread of one metric across runs: summary plus std and quantiles."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    count = len(ordered)
+    mean = sum(ordered) / count
+    std = (sum((v - mean) ** 2 for v in ordered) / count) ** 0.5
+
+    def quantile(q: float) -> float:
+        # Linear interpolation between closest ranks
+        pos = (count - 1) * q
+        low = int(pos)
+        high = min(low + 1, count - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+    return {
+        "count": count,
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": mean,
+        "std": std,
+        "p05": quantile(0.05),
+        "p25": quantile(0.25),
+        "p50": quantile(0.5),
+        "p75": quantile(0.75),
+        "p95": quantile(0.95),
+    }
+
+
+def _read_stdout(log_path: str, max_chars: int) -> Tuple[str, bool]:
+    """stdout of a run's full log, keeping the last ``max_chars`` characters."""
+    parts: Deque[str] = collections.deque()
+    kept = 0
+    truncated = False
+    for record in read_log(log_path):
+        if record.get("stream") != "stdout":
+            continue
+        parts.append(record["text"])
+        kept += len(record["text"])
+        while kept - len(parts[0]) >= max_chars:
+            kept -= len(parts.popleft())
+            truncated = True
+    text = "".join(parts)
+    if len(text) > max_chars:
+        text, truncated = text[-max_chars:], True
+    return text, truncated
+
+
+def extract_run_metrics(
+    log_path: Optional[str],
+    stdout: str,
+    queries: List[MetricQuery],
+    max_chars: int,
+) -> Dict[str, Any]:
+    """Series and summary statistics of each query over a run's stdout.
+
+    Reads the full log when there is one, otherwise ``stdout``; at most the last
+    ``max_chars`` characters are scanned. Runs in a metric worker.
+    """
+    if log_path and os.path.exists(log_path):
+        text, truncated = _read_stdout(log_path, max_chars)
+    else:
+        text, truncated = stdout[-max_chars:], len(stdout) > max_chars
+    results = []
+    for query, values in zip(queries, extract_series(text, queries)):
+        results.append({
+            "name": query.name,
+            "mode": query.mode,
+            "found": bool(values),
+            "value": values[-1] if values else None,
+            "series": values if query.mode == "all" else None,
+            "stats": summarize(values) if query.mode == "all" else None,
+        })
+    return {"metrics": results, "scanned_chars": len(text), "truncated": truncated}
+
+
+def passes(measured: Optional[float], reported: float, direction: str, threshold: float) -> bool:
+    if measured is None:
+        return False
+    if direction == "higher":
+        return measured >= reported - threshold
+    return measured <= reported + threshold
+
+
+# Regexes come from users, and Python's engine cannot interrupt a catastrophic
+# backtrack; running them in killable workers bounds how long one can take
+metric_pool = WorkerPool(
+    "metrics",
+    workers=settings.metric_workers,
+    queue_size=settings.metric_queue_size,
+    timeout_seconds=settings.metric_timeout_seconds,
+)
+
+
+async def evaluate_metrics(
+    log_path: Optional[str], stdout: str, queries: List[MetricQuery], wait: bool = False
+) -> Dict[str, Any]:
+    """Run ``extract_run_metrics`` in the metric pool.
+
+    Raises PoolBusyError when the queue is full (with ``wait``, waits for room
+    instead) and JobTimeoutError when a scan exceeds ``metric_timeout_seconds``
+    (the worker is killed).
+    """
+    return await metric_pool.run(
+        extract_run_metrics, log_path, stdout, queries, settings.metric_max_output_chars, wait=wait
+    )
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import String, cast, func, or_, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlmodel import Session, select
+
+from ..models import Paper
+
+
+# Searchable columns of the full-text index and their bm25 weights: a match in the
+# title counts most, one somewhere in the body least
+SEARCH_COLUMNS = (
+    ("title", 10.0),
+    ("datasets", 6.0),
+    ("abstract", 4.0),
+    ("methodology", 2.0),
+    ("equations", 1.0),
+    ("body", 1.0),
+)
+SNIPPET_TOKENS = 16
+# Highlight markers around matched terms in snippets
+HIGHLIGHT = ("**", "**")
+
+_FTS_DDL = (
+    "CREATE VIRTUAL TABLE paper_fts USING fts5("
+    + ", ".join(name for name, _ in SEARCH_COLUMNS)
+    + ", tokenize = 'porter unicode61 remove_diacritics 2')"
+)
+_TERM_RE = re.compile(r"[^\s\"]+")
+
+
+def _has_search_index(session: Session) -> bool:
+    if session.get_bind().dialect.name != "sqlite":
+        return False
+    found = session.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'paper_fts'"))
+    return found.first() is not None
+
+
+def _search_document(paper: Paper) -> Dict[str, Any]:
+    """The text of ``paper`` for each full-text column."""
+    return {
+        "rowid": paper.id,
+        "title": paper.title or "",
+        "datasets": "\n".join(paper.datasets or []),
+        "abstract": paper.abstract or "",
+        "methodology": paper.methodology or "",
+        "equations": "\n".join(paper.equations or []),
+        "body": "\n\n".join((paper.sections or {}).values()),
+    }
+
+
+def _index_papers(session: Session, papers: List[Paper]) -> None:
+    if not papers:
+        return
+    session.execute(text("DELETE FROM paper_fts WHERE rowid = :rowid"), [{"rowid": p.id} for p in papers])
+    columns = ", ".join(name for name, _ in SEARCH_COLUMNS)
+    values = ", ".join(f":{name}" for name, _ in SEARCH_COLUMNS)
+    session.execute(
+        text(f"INSERT INTO paper_fts (rowid, {columns}) VALUES (:rowid, {values})"),
+        [_search_document(p) for p in papers],
+    )
+
+
+def create_search_index(session: Session, batch_size: int = 500) -> bool:
+    """Create the SQLite FTS5 index over papers if it is missing, filling it from existing rows.
+
+    Returns whether the index is available; it is not on other databases or when
+    SQLite was built without FTS5, and search then falls back to ``LIKE``. Commits.
+    """
+    if session.get_bind().dialect.name != "sqlite":
+        return False
+    if _has_search_index(session):
+        return True
+    try:
+        session.execute(text(_FTS_DDL))
+    except OperationalError:  # no such module: fts5
+        session.rollback()
+        return False
+    last_id = 0
+    while True:
+        batch = session.exec(select(Paper).where(Paper.id > last_id).order_by(Paper.id).limit(batch_size)).all()
+        if not batch:
+            break
+        _index_papers(session, batch)
+        last_id = batch[-1].id
+    session.commit()
+    return True
+
+
+def save_paper(
+    session: Session,
+    content_hash: str,
+    parsed: Dict[str, Any],
+    *,
+    sections: Optional[Dict[str, str]] = None,
+    arxiv_id: Optional[str] = None,
+) -> Paper:
+    """Store a parse result once per PDF content and keep its search entry current.
+
+    ``parsed`` is a ``/papers/parse`` result. Values that are None (a title the
+    PDF parse does not know, sections not kept in the parse cache) never
+    overwrite stored ones, so the same PDF seen again costs one lookup and no
+    write. Commits.
+    """
+    values = {
+        "doc_id": parsed["doc_id"],
+        "title": parsed.get("title"),
+        "abstract": parsed.get("abstract"),
+        "arxiv_id": arxiv_id,
+        "methodology": parsed.get("methodology"),
+        "sections": sections,
+        "datasets": parsed.get("datasets"),
+        "dataset_mentions": parsed.get("dataset_mentions"),
+        "equations": parsed.get("equations"),
+    }
+    paper = session.exec(select(Paper).where(Paper.content_hash == content_hash)).first()
+    if paper is None:
+        paper = Paper(content_hash=content_hash, **values)
+        session.add(paper)
+        try:
+            session.flush()
+        except IntegrityError:
+            # Stored by a concurrent request in the meantime
+            session.rollback()
+            paper = session.exec(select(Paper).where(Paper.content_hash == content_hash)).one()
+        else:
+            _reindex(session, paper)
+            session.commit()
+            return paper
+    changed = False
+    for name, value in values.items():
+        if value is not None and getattr(paper, name) != value:
+            setattr(paper, name, value)
+            changed = True
+    if changed:
+        paper.updated_at = datetime.utcnow()
+        session.add(paper)
+        session.flush()
+        _reindex(session, paper)
+        session.commit()
+    return paper
+
+
+def _reindex(session: Session, paper: Paper) -> None:
+    if _has_search_index(session):
+        _index_papers(session, [paper])
+
+
+def get_paper(session: Session, doc_id: str) -> Optional[Paper]:
+    return session.exec(select(Paper).where(Paper.doc_id == doc_id).order_by(Paper.id)).first()
+
+
+def _phrase(words: str) -> str:
+    # A double-quoted FTS5 string is a phrase of its tokens; operators inside are plain text
+    return '"' + words.replace('"', '""') + '"'
+
+
+def fts_query(query: Optional[str], dataset: Optional[str] = None) -> str:
+    """An FTS5 MATCH expression: every word of ``query``, and ``dataset`` as a phrase
+    in the datasets column. Words match other forms with the same stem."""
+    terms = [_phrase(term) for term in _TERM_RE.findall(query or "")]
+    if dataset and dataset.strip():
+        terms.append(f"datasets : {_phrase(dataset.strip())}")
+    return " AND ".join(terms)
+
+
+def _summary(paper: Paper) -> Dict[str, Any]:
+    return {
+        "id": paper.id,
+        "doc_id": paper.doc_id,
+        "title": paper.title,
+        "arxiv_id": paper.arxiv_id,
+        "datasets": paper.datasets or [],
+        "created_at": paper.created_at.isoformat(),
+    }
+
+
+def search_papers(
+    session: Session,
+    query: Optional[str] = None,
+    *,
+    dataset: Optional[str] = None,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """Stored papers matching every word of ``query`` and, if given, ``dataset``, best first.
+
+    With the FTS5 index, results are ranked by weighted bm25 (``score``, higher is
+    better) and carry a ``snippet`` around the best-matching passage. Without it,
+    a ``LIKE`` scan over title, abstract, methodology and datasets returns the
+    newest matches with no score or snippet.
+    """
+    match = fts_query(query, dataset)
+    if not match:
+        return []
+    if not _has_search_index(session):
+        return _like_search(session, query, dataset, limit)
+    weights = ", ".join(str(weight) for _, weight in SEARCH_COLUMNS)
+    rows = session.execute(
+        text(
+            f"SELECT rowid, bm25(paper_fts, {weights}) AS rank, "
+            "snippet(paper_fts, -1, :open, :close, '…', :tokens) AS snippet "
+            "FROM paper_fts WHERE paper_fts MATCH :match ORDER BY rank LIMIT :limit"
+        ),
+        {"match": match, "open": HIGHLIGHT[0], "close": HIGHLIGHT[1], "tokens": SNIPPET_TOKENS, "limit": limit},
+    ).all()
+    papers = {p.id: p for p in session.exec(select(Paper).where(Paper.id.in_([r.rowid for r in rows]))).all()}
+    return [
+        {**_summary(papers[r.rowid]), "score": -r.rank, "snippet": r.snippet}
+        for r in rows
+        if r.rowid in papers
+    ]
+
+
+def _contains(words: str) -> str:
+    # LIKE pattern for text containing ``words`` literally (escaped with a backslash)
+    return "%" + re.sub(r"([\\%_])", r"\\\1", words.lower()) + "%"
+
+
+def _like_search(session: Session, query: Optional[str], dataset: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    stmt = select(Paper)
+    for term in _TERM_RE.findall(query or ""):
+        pattern = _contains(term)
+        stmt = stmt.where(or_(
+            func.lower(func.coalesce(Paper.title, "")).like(pattern, escape="\\"),
+            func.lower(func.coalesce(Paper.abstract, "")).like(pattern, escape="\\"),
+            func.lower(func.coalesce(Paper.methodology, "")).like(pattern, escape="\\"),
+        ))
+    if dataset and dataset.strip():
+        stmt = stmt.where(func.lower(cast(Paper.datasets, String)).like(_contains(dataset.strip()), escape="\\"))
+    papers = session.exec(stmt.order_by(Paper.created_at.desc(), Paper.id.desc()).limit(limit)).all()
+    return [{**_summary(p), "score": None, "snippet": None} for p in papers]
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import uuid
+from typing import Optional
+
+from ...core.config import settings
+from ..cache import TieredCache
+from .parser import PARSER_VERSION
+
+
+parse_cache = TieredCache(
+    os.path.join(settings.cache_dir, "parse.sqlite"),
+    max_memory_entries=settings.parse_cache_memory_entries,
+)
+
+
+def pdf_digest(pdf_bytes: bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def doc_id_from_digest(digest: str) -> str:
+    """Stable, UUID-shaped document id derived from the content hash."""
+    return str(uuid.UUID(hex=digest[:32]))
+
+
+def pdf_cache_key(digest: str) -> str:
+    return f"pdf:v{PARSER_VERSION}:{digest}"
+
+
+def arxiv_cache_key(arxiv_id: str, version: Optional[str]) -> Optional[str]:
+    # Only versioned ids are immutable; "latest" may change under us.
+    if not version:
+        return None
+    return f"arxiv:v{PARSER_VERSION}:{arxiv_id}{version}"
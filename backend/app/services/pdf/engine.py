@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict
+
+from ...core.config import settings
+from ..workers import WorkerPool
+from .parser import (
+    analyze_paper_text,
+    count_pdf_pages,
+    extract_text_from_pdf_pages,
+    PDFSource,
+    parse_pdf_document,
+    plan_page_shards,
+)
+
+
+# Shards smaller than this cost more in IPC and document re-opening than they save
+_MIN_PAGES_PER_SHARD = 16
+
+
+parse_pool = WorkerPool(
+    "parse",
+    workers=settings.parse_workers,
+    queue_size=settings.parse_queue_size,
+    timeout_seconds=settings.parse_timeout_seconds,
+    max_jobs_per_worker=settings.parse_max_jobs_per_worker,
+)
+
+
+async def extract_text_sharded(source: PDFSource, page_count: int, wait: bool = False) -> str:
+    """Extract page ranges in parallel across the pool and reassemble them in page order."""
+    shards = plan_page_shards(page_count, parse_pool.workers, _MIN_PAGES_PER_SHARD)
+    parts = await asyncio.gather(
+        *(parse_pool.run(extract_text_from_pdf_pages, source, start, stop, wait=wait) for start, stop in shards)
+    )
+    return "\n".join(text for part in parts for text in part)
+
+
+async def parse_pdf(source: PDFSource, wait: bool = False) -> Dict[str, Any]:
+    """Parse a PDF off the event loop.
+
+    Prefer passing a path: workers then open the file themselves instead of
+    receiving a pickled copy of the bytes (once per shard).
+
+    Documents of at least ``parse_shard_min_pages`` pages are split into page ranges
+    extracted by several workers at once. Raises PoolBusyError when the queue is
+    full (unless ``wait``, which waits for room instead) and JobTimeoutError when a
+    job exceeds ``parse_timeout_seconds``.
+    """
+    threshold = settings.parse_shard_min_pages
+    if parse_pool.workers > 1 and threshold > 0:
+        page_count = await parse_pool.run(count_pdf_pages, source, wait=wait)
+        if page_count >= threshold:
+            full_text = await extract_text_sharded(source, page_count, wait=wait)
+            return await parse_pool.run(analyze_paper_text, full_text, wait=wait)
+    return await parse_pool.run(parse_pdf_document, source, wait=wait)
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ...core.config import settings
+from .keywords import KeywordMatcher
+
+
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), "data", "datasets.tsv")
+
+
+@dataclass
+class DatasetMention:
+    name: str
+    count: int
+    first_offset: int
+
+
+class Gazetteer:
+    """Dataset/benchmark names with aliases, matched in one pass via ``KeywordMatcher``."""
+
+    def __init__(self, entries: Iterable[Tuple[str, Iterable[str]]]) -> None:
+        self.names: List[str] = []
+        self.rank: Dict[str, int] = {}  # canonical name -> position in the list
+        phrases: List[Tuple[str, str]] = []
+        for canonical, aliases in entries:
+            self.rank.setdefault(canonical, len(self.names))
+            self.names.append(canonical)
+            phrases.append((canonical, canonical))
+            phrases.extend((alias, canonical) for alias in aliases)
+        self._matcher = KeywordMatcher(phrases)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Gazetteer":
+        """Load a TSV of ``canonical<TAB>alias|alias``; blank lines and ``#`` comments are skipped."""
+        entries: List[Tuple[str, List[str]]] = []
+        with open(path, encoding="utf-8") as fp:
+            for line in fp:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                canonical, _, aliases = line.partition("\t")
+                entries.append((canonical.strip(), [a.strip() for a in aliases.split("|") if a.strip()]))
+        return cls(entries)
+
+    def find(self, text: str) -> List[DatasetMention]:
+        """Return mentions in order of first occurrence.
+
+        Overlapping matches count once, for the longest one: "MS COCO" is one COCO
+        mention, and "Fashion-MNIST" does not also count as MNIST.
+        """
+        matches = sorted(self._matcher.finditer(text.lower()), key=lambda m: (m[1], -m[2]))
+        mentions: Dict[str, DatasetMention] = {}
+        covered_until = 0
+        for name, start, end in matches:
+            if end <= covered_until:
+                continue
+            covered_until = end
+            mention = mentions.get(name)
+            if mention is None:
+                mentions[name] = DatasetMention(name=name, count=1, first_offset=start)
+            else:
+                mention.count += 1
+        return list(mentions.values())
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Process-wide gazetteer, loaded on first use.
+
+    Large gazetteers take a moment to compile, so each parse worker pays this once
+    per process lifetime rather than per document.
+    """
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.from_file(settings.dataset_gazetteer_path or DEFAULT_GAZETTEER_PATH)
+    return _gazetteer
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Tuple
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# What may separate the tokens of a multi-word phrase ("ms coco", "cifar-10", a line wrap)
+_GAP_PATTERN = r"[\s\-_]{1,3}"
+_GAP = object()
+_END = ""  # never a token or character, so safe as the terminal marker in trie nodes
+
+
+def _trie_source(node: Dict[Any, Any]) -> str:
+    alts: List[str] = []
+    for symbol, child in node.items():
+        if symbol == _END:
+            continue
+        head = _GAP_PATTERN if symbol is _GAP else re.escape(symbol)
+        alts.append(head + _trie_source(child))
+    if not alts:
+        return ""
+    body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+    # Greedy optional: prefer the longest phrase, fall back to the shorter one
+    return f"(?:{body})?" if _END in node else body
+
+
+def phrase_pattern(phrases: Iterable[str], *, flexible_gaps: bool = False) -> str:
+    """Regex source matching any of ``phrases``, laid out as a character trie.
+
+    A trie-shaped pattern lets the regex engine (in C) follow one branch per input
+    character instead of trying every phrase at every position, so matching cost
+    does not grow with the vocabulary. With ``flexible_gaps`` phrases are tokenized
+    and any short run of whitespace/hyphens/underscores matches between tokens.
+    """
+    root: Dict[Any, Any] = {}
+    for phrase in phrases:
+        if flexible_gaps:
+            symbols: List[Any] = []
+            for idx, token in enumerate(_TOKEN_RE.findall(phrase.lower())):
+                if idx:
+                    symbols.append(_GAP)
+                symbols.extend(token)
+        else:
+            symbols = list(phrase)
+        if not symbols:
+            continue
+        node = root
+        for symbol in symbols:
+            node = node.setdefault(symbol, {})
+        node[_END] = True
+    source = _trie_source(root)
+    # An empty vocabulary must match nothing rather than everywhere
+    return source or r"(?!)"
+
+
+class KeywordMatcher:
+    """Single-pass whole-word matcher for a phrase vocabulary.
+
+    The vocabulary is compiled once into a trie-shaped regex; ``finditer`` scans the
+    text once no matter how many phrases there are. Matches respect word boundaries
+    and overlapping phrases are all reported ("ms coco" also yields "coco").
+    """
+
+    def __init__(self, phrases: Iterable[Tuple[str, Hashable]]) -> None:
+        self._tokens: Dict[str, Any] = {}
+        keys: List[str] = []
+        self.size = 0
+        for phrase, value in phrases:
+            tokens = _TOKEN_RE.findall(phrase.lower())
+            if not tokens:
+                continue
+            node = self._tokens
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(_END, []).append(value)
+            keys.append(phrase)
+            self.size += 1
+        self._regex = re.compile(
+            r"(?<![a-z0-9])(?:" + phrase_pattern(keys, flexible_gaps=True) + r")(?![a-z0-9])"
+        )
+
+    def _expand(self, matched: str) -> List[Tuple[Hashable, int]]:
+        # The regex returns the longest phrase at a position; shorter phrases that are
+        # token prefixes of it (e.g. "coco" inside "coco 2017") end on its token ends
+        found: List[Tuple[Hashable, int]] = []
+        node: Any = self._tokens
+        for tok in _TOKEN_RE.finditer(matched):
+            node = node.get(tok.group())
+            if node is None:
+                break
+            for value in node.get(_END, ()):
+                found.append((value, tok.end()))
+        return found
+
+    def finditer(self, lowered: str) -> Iterator[Tuple[Hashable, int, int]]:
+        """Yield ``(value, start, end)`` for every phrase occurrence in already-lowercased text."""
+        search = self._regex.search
+        expanded: Dict[str, List[Tuple[Hashable, int]]] = {}
+        pos = 0
+        while True:
+            m = search(lowered, pos)
+            if m is None:
+                return
+            start = m.start()
+            matched = m.group()
+            hits = expanded.get(matched)
+            if hits is None:
+                hits = expanded[matched] = self._expand(matched)
+            for value, offset in hits:
+                yield value, start, start + offset
+            # Resume after the first token so phrases starting inside this one are found too
+            first_token = _TOKEN_RE.match(matched)
+            pos = start + (first_token.end() if first_token else 1)
@@ -2,27 +2,56 @@ from __future__ import annotations
 
 import io
 import re
-from typing import Dict, List, Optional, Tuple
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+from .gazetteer import DatasetMention, get_gazetteer
+from .keywords import phrase_pattern
 
-def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
-    """Extract text from PDF bytes using PyMuPDF if available, otherwise pdfplumber.
 
-    Raises a RuntimeError if no supported backend is available.
+# A PDF given either as raw bytes or as a path on disk. Paths let the backends read
+# the file directly instead of holding another copy of it in memory.
+PDFSource = Union[bytes, str]
+
+# Bump when analysis output changes so cached parse results are not reused
+PARSER_VERSION = 3
+
+
+_NO_BACKEND_ERROR = (
+    "No PDF text extraction backend available. Install PyMuPDF or pdfplumber (see requirements-optional.txt)."
+)
+
+
+def _open_fitz(fitz: Any, source: PDFSource) -> Any:
+    if isinstance(source, str):
+        return fitz.open(source, filetype="pdf")
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def _open_pdfplumber(pdfplumber: Any, source: PDFSource) -> Any:
+    if isinstance(source, str):
+        return pdfplumber.open(source)
+    return pdfplumber.open(io.BytesIO(source))
+
+
+def extract_text_from_pdf_pages(source: PDFSource, start: int = 0, stop: Optional[int] = None) -> List[str]:
+    """Extract the text of pages ``[start, stop)`` using PyMuPDF if available, otherwise pdfplumber.
+
+    Returns one string per page. Raises a RuntimeError if no supported backend is available.
     """
     # Try PyMuPDF (fitz)
     try:
         import fitz  # type: ignore
 
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        doc = _open_fitz(fitz, source)
         try:
             page_texts: List[str] = []
-            for page in doc:
+            for page_no in range(start, doc.page_count if stop is None else min(stop, doc.page_count)):
                 try:
-                    page_texts.append(page.get_text("text"))
+                    page_texts.append(doc[page_no].get_text("text"))
                 except Exception:
                     page_texts.append("")
-            return "\n".join(page_texts)
+            return page_texts
         finally:
             doc.close()
     except ImportError:
@@ -32,20 +61,64 @@ def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
     try:
         import pdfplumber  # type: ignore
 
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            page_texts: List[str] = []
-            for page in pdf.pages:
+        with _open_pdfplumber(pdfplumber, source) as pdf:
+            page_texts = []
+            for page in pdf.pages[start:stop]:
                 try:
                     page_texts.append(page.extract_text() or "")
                 except Exception:
                     page_texts.append("")
-            return "\n".join(page_texts)
+            return page_texts
+    except ImportError:
+        pass
+
+    raise RuntimeError(_NO_BACKEND_ERROR)
+
+
+def count_pdf_pages(source: PDFSource) -> int:
+    try:
+        import fitz  # type: ignore
+
+        doc = _open_fitz(fitz, source)
+        try:
+            return doc.page_count
+        finally:
+            doc.close()
     except ImportError:
         pass
 
-    raise RuntimeError(
-        "No PDF text extraction backend available. Install PyMuPDF or pdfplumber (see requirements-optional.txt)."
-    )
+    try:
+        import pdfplumber  # type: ignore
+
+        with _open_pdfplumber(pdfplumber, source) as pdf:
+            return len(pdf.pages)
+    except ImportError:
+        pass
+
+    raise RuntimeError(_NO_BACKEND_ERROR)
+
+
+def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
+    """Extract text from PDF bytes using PyMuPDF if available, otherwise pdfplumber.
+
+    Raises a RuntimeError if no supported backend is available.
+    """
+    return "\n".join(extract_text_from_pdf_pages(pdf_bytes))
+
+
+def plan_page_shards(page_count: int, shards: int, min_pages_per_shard: int = 1) -> List[Tuple[int, int]]:
+    """Split ``page_count`` pages into at most ``shards`` contiguous ``(start, stop)`` ranges."""
+    if page_count <= 0:
+        return []
+    shards = max(1, min(shards, page_count // max(1, min_pages_per_shard)))
+    size, extra = divmod(page_count, shards)
+    ranges: List[Tuple[int, int]] = []
+    start = 0
+    for idx in range(shards):
+        stop = start + size + (1 if idx < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
 
 
 SECTION_KEYS = [
@@ -64,21 +137,52 @@ SECTION_KEYS = [
 ]
 
 
+_HEADING_WORDS: Dict[str, List[str]] = {}
+for _key in SECTION_KEYS:
+    # "methods" is a heading for both "method" (plural form) and "methods"
+    _HEADING_WORDS.setdefault(_key, []).append(_key)
+    _HEADING_WORDS.setdefault(_key + "s", []).append(_key)
+_HEADING_RE = re.compile(r"\n\s*(" + phrase_pattern(_HEADING_WORDS) + r")(?=\s*\n)")
+_HEADING_ORDER = {key: idx for idx, key in enumerate(SECTION_KEYS)}
+
+
 def _find_heading_spans(text: str) -> List[Tuple[str, int]]:
-    """Return list of (heading_key, start_index) for detected headings."""
+    """Return list of (heading_key, start_index) for detected headings.
+
+    A heading is ``key`` or ``key + "s"`` alone on its own line; the start is the
+    newline opening the blank run before it. One regex scan covers every key.
+    """
     spans: List[Tuple[str, int]] = []
     lowered = text.lower()
+    n = len(lowered)
+    # Where the previous heading of each key ended, including its trailing newlines;
+    # a heading's leading newline cannot be shared with the previous one of its key
+    resume_at: Dict[str, int] = {}
+    for m in _HEADING_RE.finditer(lowered):
+        word_start, word_end = m.span(1)
+        last_newline = word_end
+        while last_newline < n and lowered[last_newline] != "\n":
+            last_newline += 1
+        j = last_newline + 1
+        while j < n and lowered[j].isspace():
+            if lowered[j] == "\n":
+                last_newline = j
+            j += 1
+        for key in _HEADING_WORDS[m.group(1)]:
+            start = max(m.start(), resume_at.get(key, 0))
+            start = lowered.find("\n", start, word_start)
+            if start == -1:
+                continue
+            spans.append((key, start))
+            resume_at[key] = last_newline + 1
+    # also match at the very beginning
     for key in SECTION_KEYS:
-        # heuristics: heading on its own line or followed by newline
-        for m in re.finditer(rf"\n\s*{re.escape(key)}s?\s*\n", lowered):
-            spans.append((key, m.start()))
-        # also match at the very beginning
         if lowered.startswith(key):
             spans.append((key, 0))
     # deduplicate and sort by position
     seen: set[Tuple[str, int]] = set()
     unique_spans: List[Tuple[str, int]] = []
-    for item in sorted(spans, key=lambda x: x[1]):
+    for item in sorted(spans, key=lambda x: (x[1], _HEADING_ORDER[x[0]])):
         if item not in seen:
             seen.add(item)
             unique_spans.append(item)
@@ -102,40 +206,21 @@ def split_into_sections(text: str) -> Dict[str, str]:
     return sections
 
 
-COMMON_DATASETS = [
-    "mnist",
-    "fashion-mnist",
-    "cifar-10",
-    "cifar-100",
-    "imagenet",
-    "coco",
-    "squad",
-    "glue",
-    "wikitext-103",
-    "librispeech",
-    "cityscapes",
-    "kitti",
-    "pascal voc",
-    "ms coco",
-    "places365",
-    "celeba",
-    "yelp",
-    "ag news",
-]
+def detect_dataset_mentions(text: str) -> List[DatasetMention]:
+    """Known datasets mentioned in ``text``, normalized to canonical names, with counts
+    and first-occurrence offsets, in order of first occurrence."""
+    return get_gazetteer().find(text)
+
+
+def dataset_names(mentions: List[DatasetMention]) -> List[str]:
+    """The ``datasets`` field: lowercase names in gazetteer order, as before the gazetteer
+    (canonical case and first-mention order are in ``dataset_mentions``)."""
+    rank = get_gazetteer().rank
+    return [m.name.lower() for m in sorted(mentions, key=lambda m: rank.get(m.name, len(rank)))]
 
 
 def detect_datasets(text: str) -> List[str]:
-    lowered = text.lower()
-    found: List[str] = []
-    for name in COMMON_DATASETS:
-        if name in lowered:
-            found.append(name)
-    # unique, keep order
-    unique: List[str] = []
-    for n in found:
-        if n not in unique:
-            unique.append(n)
-    return unique
+    return dataset_names(detect_dataset_mentions(text))
 
 
 LATEX_INLINE = re.compile(r"\$(.+?)\$", re.DOTALL)
@@ -181,3 +266,21 @@ def guess_methodology(sections: Dict[str, str], full_text: str) -> Optional[str]
     return None
 
 
+def analyze_paper_text(full_text: str) -> Dict[str, Any]:
+    """Run the section/abstract/methodology/dataset/equation passes over extracted text."""
+    sections = split_into_sections(full_text)
+    mentions = detect_dataset_mentions(full_text)
+    return {
+        "abstract": guess_abstract(sections, full_text),
+        "methodology": guess_methodology(sections, full_text) or "",
+        "datasets": dataset_names(mentions),
+        "dataset_mentions": [asdict(m) for m in mentions],
+        "equations": extract_equations(full_text, max_equations=5),
+        # Stored with the paper for search; not part of the parse response
+        "sections": sections,
+    }
+
+
+def parse_pdf_document(source: PDFSource) -> Dict[str, Any]:
+    """Extract and analyze a PDF in one call; the unit of work run by the parse engine."""
+    return analyze_paper_text("\n".join(extract_text_from_pdf_pages(source)))
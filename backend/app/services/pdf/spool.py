@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional, Tuple
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+
+# Multipart framing (boundaries, part headers, small form fields) allowed on top of the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class InvalidUploadError(ValueError):
+    """The request body is not a multipart form with the expected file field."""
+
+
+@dataclass
+class SpooledPDF:
+    path: str
+    sha256: str
+    size: int
+
+    def remove(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _new_spool_file(directory: Optional[str]):
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return tempfile.NamedTemporaryFile("wb", suffix=".pdf", dir=directory or None, delete=False)
+
+
+class _FilePart:
+    """Callbacks for ``MultipartParser`` that collect the bytes of one file field."""
+
+    def __init__(self, field: str) -> None:
+        self.field = field
+        self.filename: Optional[str] = None
+        self.found = False
+        self.pending: List[bytes] = []  # data of the file field parsed from the current chunk
+        self._in_field = False
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition: bytes = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field_data,
+            "on_header_value": self._header_value_data,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self) -> None:
+        self._disposition = b""
+        self._header_field = self._header_value = b""
+
+    def _header_field_data(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _header_value_data(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        self._in_field = name == self.field and not self.found
+        if self._in_field:
+            self.found = True
+            filename = options.get(b"filename")
+            self.filename = filename.decode("utf-8", "replace") if filename is not None else None
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self.pending.append(data[start:end])
+
+    def _part_end(self) -> None:
+        self._in_field = False
+
+
+async def spool_multipart(
+    content_type: str,
+    body: AsyncIterator[bytes],
+    max_bytes: int,
+    directory: Optional[str] = None,
+    field: str = "file",
+    suffix: Optional[str] = ".pdf",
+) -> Tuple[Optional[str], SpooledPDF]:
+    """Stream the ``field`` file of a multipart request body to a temp file, hashing as it arrives.
+
+    ``body`` is the raw request stream (``request.stream()``), so nothing is
+    buffered by the framework first: one chunk is in memory at a time, the file
+    is written once, and reading stops as soon as the body exceeds ``max_bytes``
+    (plus a little multipart framing) or the file does. A filename without
+    ``suffix`` is rejected once the part headers arrive. Returns the filename
+    and the spooled file, which the caller must ``remove()``.
+    """
+    ctype, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if ctype != b"multipart/form-data" or not boundary:
+        raise InvalidUploadError("Expected a multipart/form-data upload")
+    part = _FilePart(field)
+    parser = MultipartParser(boundary, part.callbacks())
+    digest = hashlib.sha256()
+    size = received = 0
+    fp = _new_spool_file(directory)
+    try:
+        with fp:
+            async for chunk in body:
+                received += len(chunk)
+                if received > max_bytes + MULTIPART_OVERHEAD_BYTES:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                parser.write(chunk)
+                if part.found and suffix and not (part.filename or "").lower().endswith(suffix):
+                    raise InvalidUploadError(f"Only {suffix} files are supported")
+                if not part.pending:
+                    continue
+                data = b"".join(part.pending)
+                part.pending.clear()
+                size += len(data)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                digest.update(data)
+                await asyncio.to_thread(fp.write, data)
+            parser.finalize()
+            if not part.found:
+                raise InvalidUploadError(f"Missing file field {field!r}")
+    except BaseException:
+        os.unlink(fp.name)
+        raise
+    return part.filename, SpooledPDF(path=fp.name, sha256=digest.hexdigest(), size=size)
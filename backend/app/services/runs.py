@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import argparse
+import base64
+import binascii
+import hashlib
+import json
+import os
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, text, tuple_
+from sqlmodel import Session, select
+
+from ..models import Blob, Job, Run
+
+
+# Characters of stdout kept inline on the run row for listings
+LISTING_PREVIEW_CHARS = 1000
+# Return code recorded for a run killed at its time limit
+TIMEOUT_RETURNCODE = -9
+
+
+def put_blobs(session: Session, contents: List[str]) -> List[str]:
+    """Store each text once under its SHA-256 and return the hashes, in order.
+
+    One query finds which hashes already exist; the rest are inserted right away,
+    skipping any a concurrent writer stored in the meantime. The caller commits.
+    """
+    raws = [content.encode("utf-8") for content in contents]
+    digests = [hashlib.sha256(raw).hexdigest() for raw in raws]
+    known = set(session.exec(select(Blob.hash).where(Blob.hash.in_(set(digests)))).all())
+    rows: Dict[str, Dict[str, Any]] = {}
+    for raw, digest in zip(raws, digests):
+        if digest not in known and digest not in rows:
+            rows[digest] = {"hash": digest, "data": zlib.compress(raw, 6), "size": len(raw), "created_at": datetime.utcnow()}
+    if rows:
+        session.execute(_insert_ignore(session), list(rows.values()))
+    return digests
+
+
+def _insert_ignore(session: Session) -> Any:
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(Blob).on_conflict_do_nothing(index_elements=["hash"])
+
+
+def put_blob(session: Session, content: str) -> str:
+    return put_blobs(session, [content])[0]
+
+
+def get_blob(session: Session, digest: Optional[str]) -> Optional[str]:
+    if digest is None:
+        return None
+    blob = session.get(Blob, digest)
+    return zlib.decompress(blob.data).decode("utf-8") if blob is not None else None
+
+
+def get_blobs(session: Session, digests: Iterable[str]) -> Dict[str, str]:
+    """Several blobs in one query, by hash."""
+    wanted = {digest for digest in digests if digest}
+    if not wanted:
+        return {}
+    blobs = session.exec(select(Blob).where(Blob.hash.in_(wanted))).all()
+    return {blob.hash: zlib.decompress(blob.data).decode("utf-8") for blob in blobs}
+
+
+def new_run(
+    session: Session,
+    *,
+    code: str,
+    stdout: str,
+    stderr: str,
+    returncode: int,
+    doc_id: Optional[str] = None,
+    log_path: Optional[str] = None,
+    exec_key: Optional[str] = None,
+) -> Run:
+    """Add a run whose code and output live in the blob store; the caller commits."""
+    code_hash, stdout_hash, stderr_hash = put_blobs(session, [code, stdout, stderr])
+    run = Run(
+        doc_id=doc_id,
+        stdout=stdout[:LISTING_PREVIEW_CHARS],
+        stderr=stderr[:LISTING_PREVIEW_CHARS],
+        returncode=returncode,
+        code_hash=code_hash,
+        stdout_hash=stdout_hash,
+        stderr_hash=stderr_hash,
+        log_path=log_path,
+        exec_key=exec_key,
+    )
+    session.add(run)
+    return run
+
+
+def prune_run_logs(
+    session: Session,
+    directory: str,
+    max_age_seconds: float,
+    max_bytes: int,
+    keep: Iterable[str] = (),
+) -> int:
+    """Delete job logs in ``directory`` older than ``max_age_seconds``, then the oldest
+    until the rest fit ``max_bytes`` (0 disables either limit); paths in ``keep`` stay.
+
+    Runs whose log is deleted get ``log_path`` None and keep the head and tail of
+    their output in the blob store. Returns the number deleted. Commits.
+    """
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith(".ndjson.gz")]
+    except FileNotFoundError:
+        return 0
+    kept = {os.path.abspath(path) for path in keep}
+    logs = []
+    total = 0
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        total += st.st_size
+        if os.path.abspath(path) not in kept:
+            logs.append((st.st_mtime, st.st_size, path))
+    logs.sort()
+    cutoff = time.time() - max_age_seconds
+    deleted: List[str] = []
+    for mtime, size, path in logs:
+        if not (max_age_seconds > 0 and mtime < cutoff) and not (max_bytes > 0 and total > max_bytes):
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        deleted.append(path)
+    for start in range(0, len(deleted), 500):
+        session.execute(
+            text("UPDATE run SET log_path = NULL WHERE log_path IN :paths").bindparams(
+                bindparam("paths", expanding=True)
+            ),
+            {"paths": deleted[start:start + 500]},
+        )
+    session.commit()
+    return len(deleted)
+
+
+def execution_key(code: str, config: Dict[str, Any]) -> str:
+    """SHA-256 of the code and the executor config it runs under."""
+    raw = json.dumps({"code": hashlib.sha256(code.encode("utf-8")).hexdigest(), "config": config}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def find_cached_run(session: Session, exec_key: str, max_age_seconds: float) -> Optional[Run]:
+    """The latest completed run with ``exec_key`` created in the last ``max_age_seconds``."""
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    return session.exec(
+        select(Run)
+        .where(Run.exec_key == exec_key, Run.created_at >= cutoff)
+        .order_by(Run.created_at.desc())
+        .limit(1)
+    ).first()
+
+
+def load_run_code(session: Session, run: Run) -> str:
+    return get_blob(session, run.code_hash) if run.code_hash else run.code
+
+
+def load_run_output(session: Session, run: Run) -> Tuple[str, str]:
+    """Full stored stdout/stderr (head+tail previews for long runs), for new and legacy rows."""
+    stdout = get_blob(session, run.stdout_hash) if run.stdout_hash else run.stdout
+    stderr = get_blob(session, run.stderr_hash) if run.stderr_hash else run.stderr
+    return stdout or "", stderr or ""
+
+
+def load_job_code(session: Session, job: Job) -> str:
+    return get_blob(session, job.code_hash) if job.code_hash else job.code
+
+
+def encode_cursor(created_at: datetime, run_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), run_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Position encoded by ``encode_cursor``. Raises ValueError when malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, run_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(run_id)
+    except (TypeError, ValueError, binascii.Error) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def list_runs(
+    session: Session,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    doc_id: Optional[str] = None,
+    status: Optional[str] = None,
+    returncode: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of runs, newest first, and the cursor of the next page (None on the last).
+
+    Keyset pagination on ``(created_at, id)``: a page starts right after the cursor
+    position, so fetching page 1000 costs the same as page 1. The page's ids are
+    picked from the ``(…, created_at, id)`` indexes alone; only those rows are read.
+    ``status`` is ``ok`` (exit code 0), ``timeout`` or ``failed``.
+    """
+    page = select(Run.id)
+    if doc_id is not None:
+        page = page.where(Run.doc_id == doc_id)
+    if status == "ok":
+        page = page.where(Run.returncode == 0)
+    elif status == "timeout":
+        page = page.where(Run.returncode == TIMEOUT_RETURNCODE)
+    elif status == "failed":
+        page = page.where(Run.returncode.not_in([0, TIMEOUT_RETURNCODE]))
+    if returncode is not None:
+        page = page.where(Run.returncode == returncode)
+    if created_after is not None:
+        page = page.where(Run.created_at >= created_after)
+    if created_before is not None:
+        page = page.where(Run.created_at < created_before)
+    if cursor is not None:
+        page = page.where(tuple_(Run.created_at, Run.id) < tuple_(*decode_cursor(cursor)))
+    newest_first = (Run.created_at.desc(), Run.id.desc())
+    # One extra row tells whether there is a next page
+    page = page.order_by(*newest_first).limit(limit + 1)
+
+    rows = session.exec(
+        select(Run.id, Run.created_at, Run.returncode, func.substr(Run.stdout, 1, LISTING_PREVIEW_CHARS))
+        .where(Run.id.in_(page.scalar_subquery()))
+        .order_by(*newest_first)
+    ).all()
+    items = [
+        {"id": run_id, "created_at": created_at.isoformat(), "returncode": returncode, "stdout": stdout}
+        for run_id, created_at, returncode, stdout in rows[:limit]
+    ]
+    next_cursor = encode_cursor(rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+    return items, next_cursor
+
+
+def migrate_legacy_runs(session: Session, batch_size: int = 500) -> int:
+    """Move inline code/output of pre-blob runs (and queued jobs) into the blob store.
+
+    Works in committed batches, so it can be interrupted and re-run. Returns the
+    number of runs migrated. Space is only returned to the filesystem by a VACUUM.
+    """
+    migrated = 0
+    while True:
+        runs = session.exec(select(Run).where(Run.code_hash.is_(None)).limit(batch_size)).all()
+        if not runs:
+            break
+        hashes = put_blobs(session, [text for run in runs for text in (run.code, run.stdout, run.stderr)])
+        for i, run in enumerate(runs):
+            run.code_hash, run.stdout_hash, run.stderr_hash = hashes[3 * i:3 * i + 3]
+            run.code = ""
+            run.stdout = run.stdout[:LISTING_PREVIEW_CHARS]
+            run.stderr = run.stderr[:LISTING_PREVIEW_CHARS]
+            session.add(run)
+        session.commit()
+        migrated += len(runs)
+    jobs = session.exec(select(Job).where(Job.code_hash.is_(None), Job.code != "")).all()
+    for job, digest in zip(jobs, put_blobs(session, [job.code for job in jobs])):
+        job.code_hash = digest
+        job.code = ""
+        session.add(job)
+    session.commit()
+    return migrated
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Move legacy inline run code/output into the blob store.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--vacuum", action="store_true", help="rewrite the database file to reclaim freed space")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    from ..db import engine, get_session, init_db
+
+    init_db()
+    with get_session() as session:
+        count = migrate_legacy_runs(session, batch_size=args.batch_size)
+    print(f"migrated {count} runs")
+    if args.vacuum:
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+        print("vacuumed")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,16 @@ from __future__ import annotations
 from .base import RunResult, SandboxExecutor
 from .local import LocalExecutor
 from .docker import DockerExecutor
+from .pool import WarmContainerPool, WarmPool, WarmProcessPool
 
 __all__ = [
 	"RunResult",
 	"SandboxExecutor",
 	"LocalExecutor",
 	"DockerExecutor",
+	"WarmPool",
+	"WarmProcessPool",
+	"WarmContainerPool",
 ]
 
 
@@ -1,18 +1,25 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Protocol
+from typing import TYPE_CHECKING, Optional, Protocol
+
+if TYPE_CHECKING:
+    from .output import OutputCapture
 
 
 @dataclass
 class RunResult:
+    # Head and tail of each stream when the output was longer than the capture keeps
     stdout: str
     stderr: str
     returncode: int
+    log_path: Optional[str] = None  # full gzip NDJSON log, if the capture wrote one
 
 
 class SandboxExecutor(Protocol):
-    def run_code(self, code: str, timeout_seconds: int = 60) -> RunResult:  # pragma: no cover - protocol
+    def run_code(
+        self, code: str, timeout_seconds: int = 60, output: Optional["OutputCapture"] = None
+    ) -> RunResult:  # pragma: no cover - protocol
         ...
 
 
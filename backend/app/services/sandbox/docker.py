@@ -1,41 +1,80 @@
 from __future__ import annotations
 
 import os
+import shlex
 import subprocess
 import tempfile
+from typing import Optional
 from textwrap import dedent
 from .base import RunResult
+from .output import OutputCapture, stream_process
+from .pool import WarmContainerPool
 
 
 class DockerExecutor:
-    def __init__(self, image: str = "python:3.11-slim", memory: str = "512m", cpus: str = "0.5") -> None:
+    def __init__(
+        self,
+        image: str = "python:3.11-slim",
+        memory: str = "512m",
+        cpus: str = "0.5",
+        docker: str = "docker",
+        pool: Optional[WarmContainerPool] = None,
+    ) -> None:
         self.image = image
         self.memory = memory
         self.cpus = cpus
+        self.docker = shlex.split(docker)
+        # Pre-started containers (one job each); without a pool every run is `docker run --rm`
+        self.pool = pool
 
-    def run_code(self, code: str, timeout_seconds: int = 60) -> RunResult:
+    def run_code(self, code: str, timeout_seconds: int = 60, output: Optional[OutputCapture] = None) -> RunResult:
+        """Run ``code`` in a container, streaming its output into ``output`` (a bounded one by default)."""
+        capture = output or OutputCapture()
         with tempfile.TemporaryDirectory() as tmp:
             code_path = os.path.join(tmp, "main.py")
             with open(code_path, "w", encoding="utf-8") as f:
                 f.write(code)
+            if self.pool is not None:
+                return self._run_in_pool(code_path, timeout_seconds, capture)
 
             cmd = [
-                "docker", "run", "--rm",
+                *self.docker, "run", "--rm",
                 "--network", "none",
                 "--memory", self.memory,
                 "--cpus", self.cpus,
                 "-v", f"{code_path}:/app/main.py:ro",
                 "-w", "/app",
+                "-e", "PYTHONUNBUFFERED=1",
                 self.image,
                 "python", "main.py",
             ]
 
-            proc = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout_seconds,
-            )
-            return RunResult(stdout=proc.stdout, stderr=proc.stderr, returncode=proc.returncode)
+            proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            return self._result(stream_process(proc, capture, timeout_seconds), capture)
 
+    @staticmethod
+    def _result(returncode: int, capture: OutputCapture) -> RunResult:
+        return RunResult(
+            stdout=capture.preview("stdout"),
+            stderr=capture.preview("stderr"),
+            returncode=returncode,
+            log_path=capture.log_path,
+        )
 
+    def _run_in_pool(self, code_path: str, timeout_seconds: int, capture: OutputCapture) -> RunResult:
+        assert self.pool is not None
+        container = self.pool.checkout()
+        try:
+            copied = self.pool.docker_cmd("cp", code_path, f"{container}:/app/main.py")
+            if copied.returncode != 0:
+                raise RuntimeError(f"docker cp failed: {copied.stderr.strip()}")
+            # A timeout leaves the job running inside the container; removing it stops the job
+            proc = subprocess.Popen(
+                [*self.docker, "exec", "-w", "/app", "-e", "PYTHONUNBUFFERED=1", container, "python", "main.py"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            return self._result(stream_process(proc, capture, timeout_seconds), capture)
+        finally:
+            self.pool.release(container)
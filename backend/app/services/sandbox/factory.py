@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import platform
+import sys
+from typing import Any, Dict
+
+from ...core.config import settings
+from .base import SandboxExecutor
+from .docker import DockerExecutor
+from .local import LocalExecutor
+from .pool import WarmContainerPool, WarmProcessPool
+
+
+local_pool = WarmProcessPool(
+    size=settings.local_pool_size,
+    preload=[m.strip() for m in settings.local_pool_preload.split(",")],
+    spawn_interval=settings.local_pool_spawn_interval,
+)
+
+docker_pool = WarmContainerPool(
+    image=settings.docker_image,
+    memory=settings.docker_memory,
+    cpus=settings.docker_cpus,
+    size=settings.docker_pool_size,
+    max_containers=settings.docker_pool_max_containers,
+    spawn_interval=settings.docker_pool_spawn_interval,
+    docker=settings.docker_binary,
+)
+
+
+def create_executor() -> SandboxExecutor:
+    """Executor for ``settings.sandbox_mode``, drawing on the shared warm pool when one is configured."""
+    if settings.sandbox_mode == "docker":
+        return DockerExecutor(
+            image=settings.docker_image,
+            memory=settings.docker_memory,
+            cpus=settings.docker_cpus,
+            docker=settings.docker_binary,
+            pool=docker_pool if docker_pool.size > 0 else None,
+        )
+    return LocalExecutor(pool=local_pool if local_pool.size > 0 else None)
+
+
+def executor_config() -> Dict[str, Any]:
+    """What, besides the code, determines the result of a run by ``create_executor``.
+
+    Warm pools are left out: a pooled run behaves like a cold one.
+    """
+    if settings.sandbox_mode == "docker":
+        return {
+            "mode": "docker",
+            "image": settings.docker_image,
+            "memory": settings.docker_memory,
+            "cpus": settings.docker_cpus,
+        }
+    return {"mode": "local", "python": sys.executable, "version": platform.python_version()}
@@ -1,22 +1,45 @@
 from __future__ import annotations
 
+import os
 import subprocess
 import sys
 import tempfile
+from typing import Optional
 from .base import RunResult
+from .output import UNBUFFERED_ENV, OutputCapture, stream_process
+from .pool import WarmProcessPool
 
 
 class LocalExecutor:
-    def run_code(self, code: str, timeout_seconds: int = 60) -> RunResult:
+    def __init__(self, pool: Optional[WarmProcessPool] = None) -> None:
+        # Warm interpreters with heavy imports done; falls back to a cold start when empty
+        self.pool = pool
+
+    def run_code(self, code: str, timeout_seconds: int = 60, output: Optional[OutputCapture] = None) -> RunResult:
+        """Run ``code`` as a script, streaming its output into ``output`` (a bounded one by default)."""
+        capture = output or OutputCapture()
         with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as fp:
             fp.write(code)
             fp.flush()
-            proc = subprocess.run(
-                [sys.executable, fp.name],
-                capture_output=True,
-                text=True,
-                timeout=timeout_seconds,
+        try:
+            proc = self.pool.acquire() if self.pool is not None else None
+            if proc is None:
+                proc = subprocess.Popen(
+                    [sys.executable, fp.name],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    env={**os.environ, **UNBUFFERED_ENV},
+                )
+                job_input = None
+            else:
+                job_input = (fp.name + "\n").encode("utf-8")
+            returncode = stream_process(proc, capture, timeout_seconds, stdin=job_input)
+            return RunResult(
+                stdout=capture.preview("stdout"),
+                stderr=capture.preview("stderr"),
+                returncode=returncode,
+                log_path=capture.log_path,
             )
-        return RunResult(stdout=proc.stdout, stderr=proc.stderr, returncode=proc.returncode)
-
-
+        finally:
+            os.unlink(fp.name)
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import codecs
+import collections
+import gzip
+import json
+import os
+import select
+import subprocess
+import threading
+from typing import IO, Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+# Bytes read from a pipe per chunk; one chunk becomes one streamed event
+_READ_SIZE = 4096
+# Unbuffered children emit one print as several writes; bytes arriving within this
+# window are sent as one event
+_COALESCE_SECONDS = 0.01
+# Events a live subscriber may fall behind by before it is dropped
+_SUBSCRIBER_BACKLOG = 1000
+STREAMS = ("stdout", "stderr")
+# Child Pythons write straight to the pipe, so prints show up live rather than per 8 KiB block
+UNBUFFERED_ENV = {"PYTHONUNBUFFERED": "1"}
+
+
+class _BoundedText:
+    """Keeps the first ``head`` and the last ``tail`` characters of a growing text."""
+
+    def __init__(self, head: int, tail: int) -> None:
+        self.head_limit = head
+        self.tail_limit = tail
+        self.head = ""
+        self.tail: Deque[str] = collections.deque()
+        self.tail_size = 0
+        self.total = 0
+
+    def append(self, text: str) -> None:
+        self.total += len(text)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += text[:room]
+            text = text[room:]
+        if not text:
+            return
+        self.tail.append(text)
+        self.tail_size += len(text)
+        while self.tail and self.tail_size - len(self.tail[0]) >= self.tail_limit:
+            self.tail_size -= len(self.tail.popleft())
+
+    @property
+    def truncated(self) -> int:
+        kept = len(self.head) + min(self.tail_size, self.tail_limit)
+        return self.total - kept
+
+    def render(self) -> str:
+        tail = "".join(self.tail)[-self.tail_limit:] if self.tail_limit else ""
+        if self.truncated > 0:
+            return f"{self.head}\n... [{self.truncated} characters truncated] ...\n{tail}"
+        return self.head + tail
+
+
+class OutputCapture:
+    """Collects a run's stdout/stderr as it is produced, with bounded memory.
+
+    Memory holds only the head and tail of each stream (the preview stored on the
+    ``Run``); with ``log_path`` the complete interleaved output is written to a
+    gzip NDJSON file of ``{"stream", "text"}`` records. Async subscribers get each
+    chunk as it arrives. ``write`` may be called from any thread.
+    """
+
+    def __init__(self, log_path: Optional[str] = None, head_chars: int = 32 * 1024, tail_chars: int = 32 * 1024) -> None:
+        self.log_path = log_path
+        self._buffers = {name: _BoundedText(head_chars, tail_chars) for name in STREAMS}
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._log: Optional[IO[str]] = None
+        self.closed = False
+        if log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            self._log = gzip.open(log_path, "wt", encoding="utf-8")
+
+    def write(self, stream: str, text: str) -> None:
+        if not text:
+            return
+        event = {"stream": stream, "text": text}
+        with self._lock:
+            self._buffers[stream].append(text)
+            if self._log is not None:
+                self._log.write(json.dumps(event) + "\n")
+            for loop, queue in list(self._subscribers):
+                loop.call_soon_threadsafe(self._offer, loop, queue, event)
+
+    def _offer(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue, event: Optional[Dict[str, str]]) -> None:
+        if queue.qsize() >= _SUBSCRIBER_BACKLOG and event is not None:
+            # Too slow to keep up: end its stream; the full log stays available
+            with self._lock:
+                if (loop, queue) in self._subscribers:
+                    self._subscribers.remove((loop, queue))
+            queue.put_nowait({"stream": "meta", "text": "[stream lagged; fetch the full log]"})
+            queue.put_nowait(None)
+            return
+        queue.put_nowait(event)
+
+    def preview(self, stream: str) -> str:
+        with self._lock:
+            return self._buffers[stream].render()
+
+    def sizes(self) -> Dict[str, int]:
+        with self._lock:
+            return {name: buf.total for name, buf in self._buffers.items()}
+
+    def subscribe(self) -> Tuple[List[Dict[str, str]], Optional[asyncio.Queue]]:
+        """Snapshot of the retained output plus a queue of later chunks (None ends it).
+
+        Call from the event loop. Once the capture is closed the queue is None.
+        """
+        with self._lock:
+            snapshot = [{"stream": name, "text": self._buffers[name].render()} for name in STREAMS]
+            snapshot = [event for event in snapshot if event["text"]]
+            if self.closed:
+                return snapshot, None
+            queue: asyncio.Queue = asyncio.Queue()
+            self._subscribers.append((asyncio.get_running_loop(), queue))
+            return snapshot, queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = [(loop, q) for loop, q in self._subscribers if q is not queue]
+
+    def close(self) -> None:
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            subscribers, self._subscribers = self._subscribers, []
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+
+def read_log(path: str) -> Iterator[Dict[str, str]]:
+    """Records of a finished run's full log, in the order they were produced."""
+    with gzip.open(path, "rt", encoding="utf-8") as fp:
+        for line in fp:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _more_soon(pipe: IO[bytes]) -> bool:
+    if os.name == "nt":  # select() only takes sockets there
+        return False
+    readable, _, _ = select.select([pipe], [], [], _COALESCE_SECONDS)
+    return bool(readable)
+
+
+def _pump(pipe: IO[bytes], stream: str, capture: OutputCapture) -> None:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    try:
+        eof = False
+        while not eof:
+            chunk = pipe.read1(_READ_SIZE)
+            if not chunk:
+                break
+            while len(chunk) < _READ_SIZE and _more_soon(pipe):
+                more = pipe.read1(_READ_SIZE - len(chunk))
+                if not more:
+                    eof = True
+                    break
+                chunk += more
+            capture.write(stream, decoder.decode(chunk))
+        capture.write(stream, decoder.decode(b"", final=True))
+    finally:
+        pipe.close()
+
+
+def stream_process(proc: subprocess.Popen, capture: OutputCapture, timeout: float, stdin: Optional[bytes] = None) -> int:
+    """Feed ``stdin``, stream a binary-mode process's output into ``capture`` and wait.
+
+    On timeout the process is killed and ``subprocess.TimeoutExpired`` is raised,
+    with the output produced so far still in ``capture``.
+    """
+    readers = [
+        threading.Thread(target=_pump, args=(getattr(proc, name), name, capture), daemon=True)
+        for name in STREAMS
+    ]
+    for reader in readers:
+        reader.start()
+    if proc.stdin is not None:
+        try:
+            if stdin:
+                proc.stdin.write(stdin)
+            proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+    try:
+        returncode = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        for reader in readers:
+            reader.join(timeout=5)
+    return returncode
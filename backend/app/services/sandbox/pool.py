@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import collections
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Deque, Dict, Generic, List, Optional, TypeVar
+
+from ..errors import PoolBusyError
+from .output import UNBUFFERED_ENV
+
+
+T = TypeVar("T")
+
+
+class WarmPool(Generic[T]):
+    """Keeps up to ``size`` pre-started sandboxes ready; each is handed out once.
+
+    A background thread replenishes the pool, starting at most one sandbox per
+    ``spawn_interval`` seconds so a burst of jobs cannot turn into a burst of
+    expensive startups. ``acquire`` never waits: when nothing warm is available it
+    returns None and the caller starts a sandbox the slow way. Subclasses define how
+    a sandbox is created, health-checked and destroyed.
+    """
+
+    def __init__(self, name: str, size: int = 0, spawn_interval: float = 0.5) -> None:
+        self.name = name
+        self.size = size
+        self.spawn_interval = spawn_interval
+        self._ready: Deque[T] = collections.deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "started": 0, "unhealthy": 0, "start_errors": 0}
+
+    # -- subclass hooks -------------------------------------------------
+    def _create(self) -> T:
+        raise NotImplementedError
+
+    def _healthy(self, item: T) -> bool:
+        return True
+
+    def _destroy(self, item: T) -> None:
+        pass
+
+    def _can_create(self) -> bool:
+        return True
+
+    # -------------------------------------------------------------------
+    def start(self) -> None:
+        if self.size <= 0 or self._thread is not None:
+            return
+        self._closed.clear()
+        self._thread = threading.Thread(target=self._replenish, name=f"{self.name}-pool", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            items = list(self._ready)
+            self._ready.clear()
+        for item in items:
+            self._destroy(item)
+
+    def acquire(self) -> Optional[T]:
+        """Take a warm sandbox for one job, or None if none is ready."""
+        while True:
+            with self._lock:
+                item = self._ready.popleft() if self._ready else None
+            if item is None:
+                with self._lock:
+                    self._stats["misses"] += 1
+                self._wake.set()
+                return None
+            if self._healthy(item):
+                with self._lock:
+                    self._stats["hits"] += 1
+                self._wake.set()
+                return item
+            with self._lock:
+                self._stats["unhealthy"] += 1
+            self._destroy(item)
+
+    def _replenish(self) -> None:
+        while not self._closed.is_set():
+            with self._lock:
+                missing = self.size - len(self._ready)
+            if missing <= 0 or not self._can_create():
+                self._wake.wait(timeout=max(self.spawn_interval, 1.0))
+                self._wake.clear()
+                continue
+            started = time.monotonic()
+            try:
+                item = self._create()
+            except Exception:  # noqa: BLE001 - keep replenishing; jobs fall back to cold starts
+                with self._lock:
+                    self._stats["start_errors"] += 1
+                item = None
+            if item is not None:
+                if self._closed.is_set():
+                    self._destroy(item)
+                    break
+                with self._lock:
+                    self._ready.append(item)
+                    self._stats["started"] += 1
+            # Rate-limit startups, and back off after a failure
+            self._closed.wait(timeout=max(0.0, self.spawn_interval - (time.monotonic() - started)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "size": self.size, "ready": len(self._ready)}
+
+
+# Runs inside each warm worker. Preloads modules with stdout/stderr silenced (so
+# import noise never leaks into a job's output), then waits for one script path on
+# stdin and runs it as __main__, printing a traceback free of bootstrap frames.
+_BOOTSTRAP = r"""
+import os, runpy, sys, traceback
+_saved = os.dup(1), os.dup(2)
+_null = os.open(os.devnull, os.O_WRONLY)
+os.dup2(_null, 1); os.dup2(_null, 2)
+for _name in filter(None, sys.argv[1].split(",")):
+    try:
+        __import__(_name)
+    except Exception:
+        pass
+sys.stdout.flush(); sys.stderr.flush()
+os.dup2(_saved[0], 1); os.dup2(_saved[1], 2)
+os.close(_null); os.close(_saved[0]); os.close(_saved[1])
+_path = sys.stdin.readline().strip()
+if not _path:
+    sys.exit(0)
+sys.argv = [_path]
+sys.path[0] = os.path.dirname(_path)
+try:
+    runpy.run_path(_path, run_name="__main__")
+except SystemExit:
+    raise
+except BaseException:
+    _type, _value, _tb = sys.exc_info()
+    while _tb is not None and _tb.tb_frame.f_code.co_filename != _path:
+        _tb = _tb.tb_next
+    traceback.print_exception(_type, _value, _tb)
+    sys.exit(1)
+"""
+
+
+class WarmProcessPool(WarmPool[subprocess.Popen]):
+    """Interpreters that have already imported ``preload`` modules, waiting for one script.
+
+    Each process runs exactly one job and exits, so jobs stay as isolated from each
+    other as a fresh ``python main.py``; only the interpreter startup and the heavy
+    imports are paid ahead of time.
+    """
+
+    def __init__(self, size: int = 0, preload: Optional[List[str]] = None, spawn_interval: float = 0.5) -> None:
+        super().__init__("local", size=size, spawn_interval=spawn_interval)
+        self.preload = [m for m in (preload or []) if m]
+
+    def _create(self) -> subprocess.Popen:
+        return subprocess.Popen(
+            [sys.executable, "-c", _BOOTSTRAP, ",".join(self.preload)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env={**os.environ, **UNBUFFERED_ENV},
+        )
+
+    def _healthy(self, proc: subprocess.Popen) -> bool:
+        return proc.poll() is None
+
+    def _destroy(self, proc: subprocess.Popen) -> None:
+        proc.kill()
+        proc.communicate()
+
+
+class WarmContainerPool(WarmPool[str]):
+    """Idle, network-isolated, resource-limited containers waiting for one job each.
+
+    Containers run ``sleep infinity`` from ``image``; a job is copied in and run with
+    ``docker exec``, after which the container is removed. ``max_containers`` caps
+    warm plus in-use containers. ``docker`` is the CLI command (split like a shell
+    word list), so a stand-in can replace the real binary.
+    """
+
+    LABEL = "metascribe.pool"
+
+    def __init__(
+        self,
+        image: str,
+        memory: str,
+        cpus: str,
+        size: int = 0,
+        max_containers: int = 8,
+        spawn_interval: float = 1.0,
+        docker: str = "docker",
+        command_timeout: float = 60,
+    ) -> None:
+        super().__init__("docker", size=size, spawn_interval=spawn_interval)
+        self.image = image
+        self.memory = memory
+        self.cpus = cpus
+        self.max_containers = max_containers
+        self.docker = shlex.split(docker)
+        self.command_timeout = command_timeout
+        self._live = 0
+
+    def docker_cmd(self, *args: str, timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [*self.docker, *args],
+            capture_output=True,
+            text=True,
+            timeout=timeout or self.command_timeout,
+        )
+
+    def start(self) -> None:
+        if self.size > 0 and self._thread is None:
+            # Containers left behind by a previous process that did not shut down cleanly
+            stale = self.docker_cmd("ps", "-aq", "--filter", f"label={self.LABEL}={self.name}")
+            ids = stale.stdout.split()
+            if stale.returncode == 0 and ids:
+                self.docker_cmd("rm", "-f", *ids)
+        super().start()
+
+    def _can_create(self) -> bool:
+        with self._lock:
+            return self._live < self.max_containers
+
+    def _create(self) -> str:
+        with self._lock:
+            if self._live >= self.max_containers:
+                raise PoolBusyError(f"{self.name} pool is at its limit of {self.max_containers} containers")
+            self._live += 1
+        try:
+            proc = self.docker_cmd(
+                "run", "-d",
+                "--network", "none",
+                "--memory", self.memory,
+                "--cpus", self.cpus,
+                "--label", f"{self.LABEL}={self.name}",
+                "-w", "/app",
+                self.image,
+                "sleep", "infinity",
+            )
+            container = proc.stdout.strip()
+            if proc.returncode != 0 or not container:
+                raise RuntimeError(f"docker run failed: {proc.stderr.strip()}")
+            return container
+        except BaseException:
+            with self._lock:
+                self._live -= 1
+            raise
+
+    def _healthy(self, container: str) -> bool:
+        try:
+            proc = self.docker_cmd("inspect", "-f", "{{.State.Running}}", container, timeout=10)
+        except subprocess.TimeoutExpired:
+            return False
+        return proc.returncode == 0 and proc.stdout.strip() == "true"
+
+    def _destroy(self, container: str) -> None:
+        try:
+            self.docker_cmd("rm", "-f", container)
+        except subprocess.TimeoutExpired:
+            pass
+        finally:
+            with self._lock:
+                self._live -= 1
+        self._wake.set()
+
+    def checkout(self) -> str:
+        """A container for one job: warm if available, else started now (subject to the cap)."""
+        container = self.acquire()
+        if container is None:
+            container = self._create()
+        return container
+
+    def release(self, container: str) -> None:
+        """Remove a used container without holding up the caller."""
+        threading.Thread(target=self._destroy, args=(container,), daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            stats.update(live=self._live, max_containers=self.max_containers)
+        return stats
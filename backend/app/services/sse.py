@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+# Disable proxy buffering (nginx) so events reach the client as they are produced
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data)}\n\n"
+
+
+async def sse_text_events(pieces: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Turn a text stream into server-sent events.
+
+    Each piece becomes a ``data: {"text": ...}`` event; the stream ends with a
+    ``done`` event, or an ``error`` event if the provider fails mid-stream (the
+    HTTP status is already sent by then).
+    """
+    chars = 0
+    try:
+        async for piece in pieces:
+            chars += len(piece)
+            yield sse_event({"text": piece})
+    except Exception as exc:  # noqa: BLE001 - reported to the client in-band
+        yield sse_event({"detail": f"{type(exc).__name__}: {exc}"}, event="error")
+        return
+    yield sse_event({"chars": chars}, event="done")
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import multiprocessing
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from .errors import PoolBusyError
+
+
+class JobTimeoutError(RuntimeError):
+    """Raised when a job exceeds its time limit; the worker running it is killed."""
+
+
+def _worker_main(conn: Connection) -> None:
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        if msg is None:
+            break
+        fn, args = msg
+        try:
+            reply = (True, fn(*args))
+        except BaseException as exc:  # noqa: BLE001 - forwarded to the caller
+            reply = (False, exc)
+        try:
+            conn.send(reply)
+        except Exception as exc:  # unpicklable result or exception
+            conn.send((False, RuntimeError(f"{type(exc).__name__}: {exc}")))
+
+
+class _Worker:
+    def __init__(self, ctx: Any) -> None:
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self) -> None:
+        self.process.terminate()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """Fixed-size pool of single-job worker processes awaited from asyncio.
+
+    Unlike ``concurrent.futures.ProcessPoolExecutor`` each worker runs one job at a
+    time over its own pipe, so a job that exceeds its timeout can be killed without
+    taking down the other workers. Workers are recycled after ``max_jobs_per_worker``
+    jobs to cap memory growth from native libraries. With ``workers=0`` jobs run in
+    the default thread pool instead (no isolation, no hard timeout).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        workers: int = 2,
+        queue_size: int = 8,
+        timeout_seconds: float = 120,
+        max_jobs_per_worker: int = 50,
+        start_method: str = "spawn",
+    ) -> None:
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout_seconds = timeout_seconds
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._ctx = multiprocessing.get_context(start_method)
+        self._idle: Optional[asyncio.Queue] = None
+        self._all: List[_Worker] = []
+        self._replacing: Set[asyncio.Task] = set()
+        self._pending = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()  # callers waiting for queue room
+        self._stats: Dict[str, float] = {
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "waited": 0,
+            "timeouts": 0,
+            "recycled": 0,
+            "spawn_errors": 0,
+            "busy_seconds": 0.0,
+        }
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._ctx)
+        self._all.append(worker)
+        return worker
+
+    def _retire(self, worker: _Worker, *, kill: bool) -> None:
+        if worker in self._all:
+            self._all.remove(worker)
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+
+    async def _replace(self, worker: _Worker, *, kill: bool) -> None:
+        # Stopping a process and spawning one both block for a while; neither runs on the loop
+        await asyncio.to_thread(self._retire, worker, kill=kill)
+        fresh = await asyncio.to_thread(self._spawn)
+        if self._idle is None:  # closed meanwhile
+            await asyncio.to_thread(self._retire, fresh, kill=False)
+        else:
+            self._idle.put_nowait(fresh)
+
+    def _replace_in_background(self, worker: _Worker, *, kill: bool) -> None:
+        if worker in self._all:
+            self._all.remove(worker)
+        task = asyncio.get_running_loop().create_task(self._replace(worker, kill=kill))
+        self._replacing.add(task)
+        task.add_done_callback(self._replaced)
+
+    def _replaced(self, task: asyncio.Task) -> None:
+        self._replacing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # The pool runs one worker short; later jobs still get the others
+            self._stats["spawn_errors"] += 1
+
+    async def start(self) -> None:
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        for worker in await asyncio.gather(*(asyncio.to_thread(self._spawn) for _ in range(self.workers))):
+            self._idle.put_nowait(worker)
+
+    async def close(self) -> None:
+        self._idle = None
+        if self._replacing:
+            await asyncio.gather(*self._replacing, return_exceptions=True)
+        workers = list(self._all)
+        await asyncio.gather(*(asyncio.to_thread(self._retire, worker, kill=False) for worker in workers))
+
+    async def run(
+        self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, wait: bool = False
+    ) -> Any:
+        """Run ``fn(*args)`` in a worker. ``fn`` and its arguments must be picklable.
+
+        When the queue is full this raises PoolBusyError, or with ``wait`` waits for
+        room (background work such as batches, which would rather be late than fail).
+        """
+        while self._pending >= self.workers + self.queue_size:
+            if not wait:
+                self._stats["rejected"] += 1
+                raise PoolBusyError(f"{self.name} pool queue is full")
+            self._stats["waited"] += 1
+            await self._wait_for_room()
+        self._pending += 1
+        try:
+            if self.workers <= 0:
+                return await self._run_inline(fn, args)
+            await self.start()
+            return await self._run_in_worker(fn, args, timeout or self.timeout_seconds)
+        finally:
+            self._pending -= 1
+            self._wake_waiter()
+
+    async def _wait_for_room(self) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Woken just as it was cancelled: pass the turn on
+                self._wake_waiter()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _wake_waiter(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def _run_inline(self, fn: Callable[..., Any], args: tuple) -> Any:
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(fn, *args)
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self._stats["busy_seconds"] += time.perf_counter() - started
+        self._stats["completed"] += 1
+        return result
+
+    async def _run_in_worker(self, fn: Callable[..., Any], args: tuple, timeout: float) -> Any:
+        assert self._idle is not None
+        worker: _Worker = await self._idle.get()
+        started = time.perf_counter()
+        healthy = False
+        try:
+            # A large argument fills the pipe buffer, so sending can block too
+            await asyncio.to_thread(worker.conn.send, (fn, args))
+            ready = await asyncio.to_thread(worker.conn.poll, timeout)
+            if not ready:
+                self._stats["timeouts"] += 1
+                raise JobTimeoutError(f"{self.name} job exceeded {timeout:.0f}s")
+            ok, payload = worker.conn.recv()
+            healthy = True
+        except (EOFError, OSError) as exc:
+            self._stats["failed"] += 1
+            raise RuntimeError(f"{self.name} worker died: {exc}") from exc
+        finally:
+            self._stats["busy_seconds"] += time.perf_counter() - started
+            worker.jobs += 1
+            if not healthy:
+                # timed out, crashed or the caller was cancelled mid-job
+                self._replace_in_background(worker, kill=True)
+            elif worker.jobs >= self.max_jobs_per_worker:
+                self._stats["recycled"] += 1
+                self._replace_in_background(worker, kill=False)
+            elif self._idle is not None:
+                self._idle.put_nowait(worker)
+        if not ok:
+            self._stats["failed"] += 1
+            raise payload
+        self._stats["completed"] += 1
+        return payload
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "workers": self.workers,
+            "alive": sum(1 for w in self._all if w.process.is_alive()),
+            "pending": self._pending,
+            "queued": max(0, self._pending - self.workers),
+            "queue_size": self.queue_size,
+            "waiting": len(self._waiters),
+        }
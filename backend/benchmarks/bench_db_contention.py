@@ -0,0 +1,132 @@
+"""Concurrent writers and readers on SQLite: the old default engine vs ``make_engine``.
+
+Writer threads each repeat what a finishing job does (read the job row, store the
+run and its blobs, update the job) while reader threads list the latest runs.
+The old setup (default journal, deferred transactions) is compared with the
+configured one (WAL, busy timeout, write sessions that take the lock up front).
+Reported: committed and failed ("database is locked") writes, write throughput,
+and read latency under write load.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_db_contention
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, create_engine
+
+from backend.app.db import make_engine
+from backend.app.models import Job
+from backend.app.services.runs import list_runs, new_run
+
+WRITERS = 8
+READERS = 4
+WRITES_PER_THREAD = 100
+OUTPUT = "epoch 1 | loss 0.5000\n" * 40
+
+
+def run(path: str, open_session: Callable[[], Session], engine) -> Dict[str, float]:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        jobs = [Job(code="print(1)", user_id=f"u{i}") for i in range(WRITERS * WRITES_PER_THREAD)]
+        session.add_all(jobs)
+        session.commit()
+        job_ids = [job.id for job in jobs]
+
+    committed = failed = 0
+    lock = threading.Lock()
+    reads: List[float] = []
+    writing = threading.Event()
+    writing.set()
+
+    def writer(index: int) -> None:
+        nonlocal committed, failed
+        for n in range(WRITES_PER_THREAD):
+            job_id = job_ids[index * WRITES_PER_THREAD + n]
+            try:
+                with open_session() as session:
+                    job = session.get(Job, job_id)
+                    run_row = new_run(session, code=f"print({index})", stdout=OUTPUT + str(n), stderr="", returncode=0)
+                    session.flush()
+                    job.run_id = run_row.id
+                    job.status = "done"
+                    job.finished_at = datetime.utcnow()
+                    session.add(job)
+                    session.commit()
+                ok = True
+            except OperationalError:  # "database is locked"
+                ok = False
+            with lock:
+                if ok:
+                    committed += 1
+                else:
+                    failed += 1
+
+    def reader() -> None:
+        while writing.is_set():
+            started = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    list_runs(session, 50)
+            except OperationalError:
+                continue
+            with lock:
+                reads.append((time.perf_counter() - started) * 1000)
+
+    writers = [threading.Thread(target=writer, args=(i,)) for i in range(WRITERS)]
+    readers = [threading.Thread(target=reader) for _ in range(READERS)]
+    started = time.perf_counter()
+    for thread in writers + readers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    writing.clear()
+    for thread in readers:
+        thread.join()
+    engine.dispose()
+    reads.sort()
+    return {
+        "committed": committed,
+        "failed": failed,
+        "writes_per_s": committed / elapsed,
+        "read_p50": statistics.median(reads) if reads else float("nan"),
+        "read_p95": reads[int(len(reads) * 0.95)] if reads else float("nan"),
+    }
+
+
+def main() -> None:
+    workdir = tempfile.mkdtemp(prefix="metascribe-bench-")
+    try:
+        old_path = os.path.join(workdir, "old.db")
+        old_engine = create_engine(f"sqlite:///{old_path}")
+        old = run(old_path, lambda: Session(old_engine), old_engine)
+
+        new_path = os.path.join(workdir, "new.db")
+        new_engine = make_engine(f"sqlite:///{new_path}")
+        new = run(new_path, lambda: Session(new_engine), new_engine)
+
+        total = WRITERS * WRITES_PER_THREAD
+        print(f"{WRITERS} writers x {WRITES_PER_THREAD} read-modify-write transactions, {READERS} readers")
+        for label, result in (("default", old), ("configured", new)):
+            print(
+                f"{label:>10}: {result['committed']:4.0f}/{total} committed, {result['failed']:4.0f} locked, "
+                f"{result['writes_per_s']:6.0f} writes/s, "
+                f"list latency p50 {result['read_p50']:6.2f} ms p95 {result['read_p95']:6.2f} ms"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Per-run latency of ``DockerExecutor`` with ``docker run --rm`` vs the warm container pool.
+
+Uses the real ``docker`` CLI when ``DOCKER_BINARY`` is set (e.g. ``docker``);
+otherwise the stand-in in ``fake_docker.py``, whose simulated start delay plays
+the part of container create/start.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_docker_pool
+"""
+from __future__ import annotations
+
+import os
+import shlex
+import statistics
+import sys
+import time
+
+from backend.app.services.sandbox.docker import DockerExecutor
+from backend.app.services.sandbox.pool import WarmContainerPool
+
+RUNS = 10
+PAUSE_SECONDS = 0.5
+IMAGE = os.environ.get("DOCKER_IMAGE", "python:3.11-slim")
+DOCKER = os.environ.get("DOCKER_BINARY") or " ".join(
+    shlex.quote(p) for p in (sys.executable, os.path.join(os.path.dirname(__file__), "fake_docker.py"))
+)
+JOB = "print({'accuracy': 0.9})\n"
+
+
+def measure(executor: DockerExecutor) -> list:
+    samples = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        result = executor.run_code(JOB, timeout_seconds=60)
+        samples.append((time.perf_counter() - started) * 1000)
+        assert result.returncode == 0, result.stderr
+        time.sleep(PAUSE_SECONDS)
+    return samples
+
+
+def main() -> None:
+    print(f"docker: {DOCKER}")
+    cold = measure(DockerExecutor(image=IMAGE, docker=DOCKER))
+    print(f"docker run --rm: median {statistics.median(cold):7.1f} ms  max {max(cold):7.1f} ms")
+
+    pool = WarmContainerPool(IMAGE, "512m", "0.5", size=2, max_containers=4, spawn_interval=0.2, docker=DOCKER)
+    pool.start()
+    time.sleep(3)  # let the pool fill
+    try:
+        warm = measure(DockerExecutor(image=IMAGE, docker=DOCKER, pool=pool))
+        stats = pool.stats()
+    finally:
+        pool.close()
+    print(
+        f"  warm pool:     median {statistics.median(warm):7.1f} ms  max {max(warm):7.1f} ms  "
+        f"(hits {stats['hits']}, misses {stats['misses']}, live after close {pool.stats()['live']})"
+    )
+
+
+if __name__ == "__main__":
+    main()
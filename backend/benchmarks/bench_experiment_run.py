@@ -0,0 +1,62 @@
+"""End-to-end ``POST /experiment/run`` latency with and without the warm local pool.
+
+The job imports the same modules the pool preloads, standing in for
+``import torch`` in a generated experiment. Runs happen one at a time with a
+pause between them, so the pool has time to replenish (as with a real user).
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_experiment_run
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import tempfile
+import time
+
+PRELOAD = ["asyncio", "email.mime.multipart", "http.client", "xml.etree.ElementTree", "sqlite3", "decimal", "json"]
+RUNS = 15
+PAUSE_SECONDS = 0.3
+
+JOB = "\n".join(f"import {name}" for name in PRELOAD) + "\nprint({'accuracy': 0.9})\n"
+
+
+def measure(client) -> list:
+    samples = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        resp = client.post("/experiment/run", json={"code": JOB})
+        samples.append((time.perf_counter() - started) * 1000)
+        assert resp.status_code == 200 and resp.json()["returncode"] == 0, resp.text
+        time.sleep(PAUSE_SECONDS)
+    return samples
+
+
+def main() -> None:
+    # Keep the run history and caches of this benchmark out of the working tree
+    os.chdir(tempfile.mkdtemp(prefix="metascribe-bench-"))
+    os.environ["PARSE_WORKERS"] = "0"
+
+    from fastapi.testclient import TestClient
+
+    from backend.app.main import app
+    from backend.app.services.sandbox import factory
+    from backend.app.services.sandbox.pool import WarmProcessPool
+
+    for label, size in (("cold", 0), ("warm pool", 2)):
+        factory.local_pool = WarmProcessPool(size=size, preload=PRELOAD, spawn_interval=0.1)
+        with TestClient(app) as client:
+            factory.local_pool.start()
+            time.sleep(1.0)  # let the pool fill
+            samples = measure(client)
+            stats = factory.local_pool.stats()
+            factory.local_pool.close()
+        print(
+            f"{label:>9}: median {statistics.median(samples):7.1f} ms  "
+            f"max {max(samples):7.1f} ms  (pool hits {stats['hits']}, misses {stats['misses']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Client-side overhead of preparing one Gemini call, per request, before and after the registry.
+
+"before" repeats what every request used to do: configure the SDK globally, build
+a fresh ``GenerativeModel`` and resolve a new service client (a new gRPC channel,
+hence a new TLS handshake on the real network). "after" is ``create_llm_client``
+hitting the registry, taking the client's own service client and building the
+request. No network calls are made.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_llm_clients
+"""
+from __future__ import annotations
+
+import statistics
+import time
+
+import google.generativeai as genai
+from google.generativeai import client as genai_client
+
+from backend.app.services.llm.factory import create_llm_client, registry_stats
+
+CALLS = 200
+KEYS = ["bench-key-a", "bench-key-b", "bench-key-c"]
+
+
+def before(api_key: str) -> None:
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel("gemini-1.5-flash")
+    # What generate_content does on the first call of every fresh model
+    model._client = genai_client.get_default_generative_client()
+
+
+def after(api_key: str) -> None:
+    client = create_llm_client("gemini", gemini_api_key=api_key, cache=False)
+    gemini = client.inner  # under the single-flight wrapper
+    gemini._client()
+    gemini._request("prompt", "system", 0.2, 1024)
+
+
+def measure(fn) -> list:
+    fn(KEYS[0])  # warm imports
+    samples = []
+    for i in range(CALLS):
+        started = time.perf_counter()
+        fn(KEYS[i % len(KEYS)])
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main() -> None:
+    for label, fn in (("before", before), ("after", after)):
+        samples = measure(fn)
+        print(
+            f"{label:>6}: median {statistics.median(samples):7.3f} ms  "
+            f"p95 {sorted(samples)[int(len(samples) * 0.95)]:7.3f} ms  over {CALLS} calls"
+        )
+    print(f"registry: {registry_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Paper search over stored papers: the FTS5 index vs a LIKE scan.
+
+Stores ``--papers`` synthetic papers (default 20,000; each with an abstract,
+methodology, two datasets and ~4 KB of section text; words are drawn from
+a 20,000-word synthetic vocabulary with a few topic words mixed in), then times ``search_papers`` for a few queries with the full-text
+index and with the ``LIKE`` fallback used when there is no index.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_paper_search
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, text
+from sqlmodel import Session, SQLModel
+
+from backend.app.db import make_engine
+from backend.app.models import Paper
+from backend.app.services.papers import create_search_index, search_papers
+
+REPEAT = 10
+VOCABULARY = [f"w{n}" for n in range(20_000)]
+TOPIC_WORDS = (
+    "network layer training loss gradient attention convolution residual embedding token "
+    "sequence graph node policy reward agent sampling diffusion noise latent encoder decoder "
+    "transformer recurrent batch normalization dropout optimizer learning rate benchmark "
+    "accuracy baseline ablation dataset feature representation contrastive supervised"
+).split()
+DATASETS = ["CIFAR-10", "ImageNet", "MNIST", "COCO", "SQuAD", "WMT14", "GLUE", "Penn Treebank"]
+QUERIES = (
+    ("contrastive encoder", None),
+    ("diffusion", "COCO"),
+    ("policy reward agent", None),
+    (None, "Penn Treebank"),
+)
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    # Roughly one word in fifty is a topic word, so each query word is in a minority of papers
+    return " ".join(
+        rng.choice(TOPIC_WORDS) if rng.random() < 0.02 else rng.choice(VOCABULARY) for _ in range(words)
+    ) + "."
+
+
+def fill(engine, count: int) -> None:
+    rng = random.Random(0)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for offset in range(0, count, 2000):
+            conn.execute(insert(Paper), [
+                {
+                    "doc_id": f"doc-{i}",
+                    "content_hash": f"{i:064x}",
+                    "title": sentence(rng, 6),
+                    "abstract": " ".join(sentence(rng, 20) for _ in range(5)),
+                    "methodology": " ".join(sentence(rng, 20) for _ in range(10)),
+                    "datasets": rng.sample(DATASETS, 2),
+                    "equations": [],
+                    "sections": {f"section{n}": " ".join(sentence(rng, 20) for _ in range(6)) for n in range(5)},
+                    "created_at": datetime.utcnow(),
+                }
+                for i in range(offset, min(offset + 2000, count))
+            ])
+
+
+def median_ms(fn) -> float:
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=20_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="metascribe-bench-")
+    try:
+        engine = make_engine(f"sqlite:///{os.path.join(workdir, 'papers.db')}")
+        started = time.perf_counter()
+        fill(engine, args.papers)
+        print(f"{args.papers} papers inserted in {time.perf_counter() - started:.1f} s")
+
+        with Session(engine) as session:
+            timings = {}
+            for label in ("like", "fts5"):
+                if label == "fts5":
+                    started = time.perf_counter()
+                    create_search_index(session)
+                    print(f"full-text index built in {time.perf_counter() - started:.1f} s")
+                for query, dataset in QUERIES:
+                    hits = search_papers(session, query, dataset=dataset, limit=20)
+                    ms = median_ms(lambda: search_papers(session, query, dataset=dataset, limit=20))
+                    timings.setdefault((query, dataset), {})[label] = (ms, len(hits))
+
+            print(f"\n{'query':<22} {'dataset':<14} {'LIKE ms':>9} {'FTS5 ms':>9}  results")
+            for (query, dataset), result in timings.items():
+                print(
+                    f"{query or '-':<22} {dataset or '-':<14} {result['like'][0]:9.2f} {result['fts5'][0]:9.2f}"
+                    f"  {result['fts5'][1]}"
+                )
+            with engine.connect() as conn:
+                size = conn.execute(text("SELECT page_count * page_size FROM pragma_page_count(), pragma_page_size()")).scalar()
+            print(f"\ndatabase size with index: {size / 2**20:.0f} MiB")
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
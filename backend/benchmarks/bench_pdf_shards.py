@@ -0,0 +1,59 @@
+"""Serial vs page-sharded PDF text extraction by page count.
+
+Run from the repository root (requires PyMuPDF to synthesize the PDFs):
+
+    python -m backend.benchmarks.bench_pdf_shards
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+
+from backend.app.services.pdf.engine import extract_text_sharded, parse_pool
+from backend.app.services.pdf.parser import extract_text_from_pdf_bytes
+
+PAGE_COUNTS = [16, 64, 200, 800]
+LINES_PER_PAGE = 45
+
+
+def make_pdf(pages: int) -> bytes:
+    import fitz  # type: ignore
+
+    doc = fitz.open()
+    for page_no in range(pages):
+        page = doc.new_page()
+        body = "\n".join(
+            f"Page {page_no} line {line}: we train the model on CIFAR-10 with SGD and report accuracy."
+            for line in range(LINES_PER_PAGE)
+        )
+        page.insert_text((36, 36), body, fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+async def main() -> None:
+    await parse_pool.start()
+    try:
+        # Warm the workers so process start-up and imports are not billed to the first row
+        warm = make_pdf(parse_pool.workers)
+        await extract_text_sharded(warm, parse_pool.workers)
+        print(f"workers={parse_pool.workers} cpus={os.cpu_count()}")
+        print(f"{'pages':>6} {'serial_s':>9} {'sharded_s':>10} {'speedup':>8}")
+        for pages in PAGE_COUNTS:
+            pdf_bytes = make_pdf(pages)
+            t0 = time.perf_counter()
+            serial = extract_text_from_pdf_bytes(pdf_bytes)
+            serial_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            sharded = await extract_text_sharded(pdf_bytes, pages)
+            sharded_s = time.perf_counter() - t0
+            assert sharded == serial, "sharded text differs from serial extraction"
+            print(f"{pages:>6} {serial_s:>9.3f} {sharded_s:>10.3f} {serial_s / sharded_s:>7.2f}x")
+    finally:
+        await parse_pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""Run history page fetches at a million runs: keyset cursors vs OFFSET.
+
+Fills a SQLite database with ``--runs`` runs (default 1,000,000) spread over 50
+documents, with every 10th run failed, then times fetching one 50-run page at
+increasing depths. The keyset page starts from a cursor (as a client holding the
+previous page's ``X-Next-Cursor`` would); the OFFSET page is the classic
+``ORDER BY … LIMIT 50 OFFSET n``. Also prints SQLite's plans for the page-id queries.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_run_pages
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, text
+from sqlmodel import Session, SQLModel, select
+
+from backend.app.db import make_engine
+from backend.app.models import Run
+from backend.app.services.runs import LISTING_PREVIEW_CHARS, encode_cursor, list_runs
+
+PAGE = 50
+REPEAT = 20
+DOCS = 50
+
+
+def fill(engine, count: int) -> None:
+    SQLModel.metadata.create_all(engine)
+    started = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        for offset in range(0, count, 20000):
+            conn.execute(insert(Run), [
+                {
+                    "doc_id": f"doc-{i % DOCS}",
+                    "stdout": f"epoch 10 | loss {i % 997 / 1000:.3f}\n{{'accuracy': 0.9}}\n",
+                    "stderr": "",
+                    "returncode": 1 if i % 10 == 0 else 0,
+                    "created_at": started + timedelta(seconds=i),
+                }
+                for i in range(offset, min(offset + 20000, count))
+            ])
+
+
+def offset_page(session: Session, depth: int, **filters) -> list:
+    stmt = select(Run.id, Run.created_at, Run.returncode, func.substr(Run.stdout, 1, LISTING_PREVIEW_CHARS))
+    if "doc_id" in filters:
+        stmt = stmt.where(Run.doc_id == filters["doc_id"])
+    return session.exec(stmt.order_by(Run.created_at.desc(), Run.id.desc()).offset(depth).limit(PAGE)).all()
+
+
+def cursor_at(session: Session, depth: int, **filters):
+    """The cursor a client would hold after paging down to ``depth`` rows."""
+    if depth == 0:
+        return None
+    stmt = select(Run.created_at, Run.id)
+    if "doc_id" in filters:
+        stmt = stmt.where(Run.doc_id == filters["doc_id"])
+    created_at, run_id = session.exec(
+        stmt.order_by(Run.created_at.desc(), Run.id.desc()).offset(depth - 1).limit(1)
+    ).one()
+    return encode_cursor(created_at, run_id)
+
+
+def median_ms(fn) -> float:
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="metascribe-bench-")
+    try:
+        engine = make_engine(f"sqlite:///{os.path.join(workdir, 'runs.db')}")
+        started = time.perf_counter()
+        fill(engine, args.runs)
+        print(f"{args.runs} runs inserted in {time.perf_counter() - started:.0f} s")
+
+        with Session(engine) as session:
+            with engine.connect() as conn:
+                conn.execute(text("ANALYZE"))
+            depths = [d for d in (0, 1_000, 10_000, 100_000, args.runs - PAGE) if d <= args.runs - PAGE]
+            for label, filters, total in (
+                ("all runs", {}, args.runs),
+                ("doc_id=doc-7", {"doc_id": "doc-7"}, args.runs // DOCS),
+            ):
+                print(f"\n{label}: page of {PAGE}, median of {REPEAT} fetches")
+                print(f"{'depth':>10}  {'cursor ms':>10}  {'offset ms':>10}")
+                for depth in depths:
+                    if depth > total - PAGE:
+                        continue
+                    cursor = cursor_at(session, depth, **filters)
+                    keyset = median_ms(lambda: list_runs(session, PAGE, cursor=cursor, **filters))
+                    offset = median_ms(lambda: offset_page(session, depth, **filters))
+                    print(f"{depth:>10}  {keyset:10.2f}  {offset:10.2f}")
+
+            print("\nplans of the page-id queries:")
+            for where in ([], [Run.doc_id == "doc-7"], [Run.returncode == 0]):
+                page_ids = (
+                    select(Run.id)
+                    .where(*where)
+                    .order_by(Run.created_at.desc(), Run.id.desc())
+                    .limit(PAGE + 1)
+                    .compile(engine, compile_kwargs={"literal_binds": True})
+                )
+                with engine.connect() as conn:
+                    plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {page_ids}"))]
+                print(f"  {' AND '.join(str(w.compile(compile_kwargs={'literal_binds': True})) for w in where) or '(none)':<22} {'; '.join(plan)}")
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
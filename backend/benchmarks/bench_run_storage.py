@@ -0,0 +1,132 @@
+"""Database size and ``/eval/runs`` listing latency: inline run text vs the blob store.
+
+Builds a database of legacy runs (code, stdout and stderr inline; the code drawn
+from a few variants, as with re-runs of generated experiments), migrates a copy
+with ``migrate_legacy_runs``, vacuums both and compares file size and the latency
+of listing the 50 latest runs the old way (whole rows, sliced in Python) and
+with ``list_runs``.
+
+Run from the repository root (``--runs`` defaults to 100000):
+
+    python -m backend.benchmarks.bench_run_storage
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from backend.app.models import Run
+from backend.app.services.runs import list_runs, migrate_legacy_runs
+
+CODE_VARIANTS = 20
+LISTINGS = 50
+
+
+def make_code(variant: int) -> str:
+    body = "\n".join(f"    layer_{i} = nn.Linear({64 * (i + 1)}, {64 * (i + 2)})" for i in range(20))
+    return (
+        f"import torch\nimport torch.nn as nn\n\n# variant {variant}\nclass Model(nn.Module):\n"
+        f"  def __init__(self):\n{body}\n\nEPOCHS = {variant + 5}\nfor epoch in range(EPOCHS):\n"
+        "    train_one_epoch()\nprint({'accuracy': evaluate()})\n"
+    )
+
+
+def make_stdout(rng: random.Random) -> str:
+    lines = [
+        f"epoch {e:3d} | loss {rng.uniform(0.1, 2.5):.4f} | val_loss {rng.uniform(0.1, 2.5):.4f} | lr {1e-3 * 0.95 ** e:.6f}"
+        for e in range(rng.randint(15, 30))
+    ]
+    return "\n".join(lines) + f"\n{{'accuracy': {rng.uniform(0.6, 0.99):.4f}}}\n"
+
+
+def build_legacy(path: str, count: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(0)
+    codes = [make_code(v) for v in range(CODE_VARIANTS)]
+    started = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        for offset in range(0, count, 5000):
+            rows = [
+                {
+                    "code": rng.choice(codes),
+                    "stdout": make_stdout(rng),
+                    "stderr": "UserWarning: TF32 is disabled\n" if i % 10 == 0 else "",
+                    "returncode": 0,
+                    "created_at": started + timedelta(seconds=i),
+                }
+                for i in range(offset, min(offset + 5000, count))
+            ]
+            conn.execute(insert(Run), rows)
+    engine.dispose()
+
+
+def vacuum(path: str) -> int:
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    engine.dispose()
+    return os.path.getsize(path)
+
+
+def legacy_listing(session: Session) -> list:
+    runs = session.exec(select(Run).order_by(Run.created_at.desc()).limit(50)).all()
+    return [
+        {"id": r.id, "created_at": r.created_at.isoformat(), "returncode": r.returncode, "stdout": r.stdout[:1000]}
+        for r in runs
+    ]
+
+
+def time_listing(path: str, listing) -> float:
+    engine = create_engine(f"sqlite:///{path}")
+    samples = []
+    for _ in range(LISTINGS):
+        # A fresh session per request, as in the endpoint
+        with Session(engine) as session:
+            started = time.perf_counter()
+            listing(session)
+            samples.append((time.perf_counter() - started) * 1000)
+    engine.dispose()
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=100_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="metascribe-bench-")
+    legacy, blobs = os.path.join(workdir, "legacy.db"), os.path.join(workdir, "blobs.db")
+    try:
+        build_legacy(legacy, args.runs)
+        shutil.copy(legacy, blobs)
+
+        engine = create_engine(f"sqlite:///{blobs}")
+        started = time.perf_counter()
+        with Session(engine) as session:
+            migrated = migrate_legacy_runs(session)
+        migrate_seconds = time.perf_counter() - started
+        engine.dispose()
+
+        legacy_size, blob_size = vacuum(legacy), vacuum(blobs)
+        legacy_ms = time_listing(legacy, legacy_listing)
+        blob_ms = time_listing(blobs, lambda session: list_runs(session, 50))
+
+        print(f"{args.runs} runs, {CODE_VARIANTS} code variants; migrated {migrated} in {migrate_seconds:.1f} s")
+        print(f"  inline: {legacy_size / 2**20:8.1f} MiB   list 50 latest: median {legacy_ms:6.2f} ms")
+        print(f"   blobs: {blob_size / 2**20:8.1f} MiB   list 50 latest: median {blob_ms:6.2f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Minimal stand-in for the ``docker`` CLI, for exercising the sandbox on machines without Docker.
+
+Implements just the subcommands ``DockerExecutor`` and ``WarmContainerPool`` use
+(``run``, ``exec``, ``cp``, ``inspect``, ``rm``, ``ps``). A "container" is a
+directory under ``$FAKE_DOCKER_STATE``; commands run with the host Python, so
+there is no real isolation. ``$FAKE_DOCKER_START_DELAY`` (seconds, default 0.5)
+simulates container create/start cost.
+
+    DOCKER_BINARY="python backend/benchmarks/fake_docker.py" SANDBOX_MODE=docker ...
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+STATE = os.environ.get("FAKE_DOCKER_STATE", os.path.join(tempfile.gettempdir(), "fake-docker"))
+START_DELAY = float(os.environ.get("FAKE_DOCKER_START_DELAY", "0.5"))
+# Flags that take a value, so their argument is not mistaken for the image
+VALUE_FLAGS = {"--network", "--memory", "--cpus", "--label", "--filter", "-w", "-v", "-e", "--name"}
+
+
+def _parse(args: List[str]) -> tuple:
+    flags: Dict[str, List[str]] = {}
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        flag = args[i]
+        if flag in VALUE_FLAGS:
+            flags.setdefault(flag, []).append(args[i + 1])
+            i += 2
+        else:
+            flags.setdefault(flag, []).append("")
+            i += 1
+    return flags, args[i:]
+
+
+def _container_dir(container: str) -> str:
+    return os.path.join(STATE, container)
+
+
+def _python(argv: List[str]) -> List[str]:
+    return [sys.executable if argv[0] == "python" else argv[0], *argv[1:]]
+
+
+def cmd_run(args: List[str]) -> int:
+    flags, rest = _parse(args)
+    command = rest[1:]
+    time.sleep(START_DELAY)
+    if "-d" in flags:
+        container = uuid.uuid4().hex[:12]
+        os.makedirs(os.path.join(_container_dir(container), "app"))
+        with open(os.path.join(_container_dir(container), "meta.json"), "w") as fp:
+            json.dump({"labels": flags.get("--label", []), "command": command}, fp)
+        print(container)
+        return 0
+    with tempfile.TemporaryDirectory() as root:
+        workdir = os.path.join(root, "app")
+        os.makedirs(workdir)
+        for mount in flags.get("-v", []):
+            host, target = mount.split(":")[:2]
+            shutil.copy(host, os.path.join(root, target.lstrip("/")))
+        return subprocess.call(_python(command), cwd=workdir)
+
+
+def cmd_exec(args: List[str]) -> int:
+    _, rest = _parse(args)
+    container, command = rest[0], rest[1:]
+    if not os.path.isdir(_container_dir(container)):
+        print(f"Error: No such container: {container}", file=sys.stderr)
+        return 1
+    return subprocess.call(_python(command), cwd=os.path.join(_container_dir(container), "app"))
+
+
+def cmd_cp(args: List[str]) -> int:
+    source, target = args
+    container, path = target.split(":", 1)
+    if not os.path.isdir(_container_dir(container)):
+        print(f"Error: No such container: {container}", file=sys.stderr)
+        return 1
+    shutil.copy(source, os.path.join(_container_dir(container), path.lstrip("/")))
+    return 0
+
+
+def cmd_inspect(args: List[str]) -> int:
+    container = args[-1]
+    if not os.path.isdir(_container_dir(container)):
+        print(f"Error: No such object: {container}", file=sys.stderr)
+        return 1
+    print("true")
+    return 0
+
+
+def cmd_rm(args: List[str]) -> int:
+    _, containers = _parse(args)
+    for container in containers:
+        shutil.rmtree(_container_dir(container), ignore_errors=True)
+    return 0
+
+
+def cmd_ps(args: List[str]) -> int:
+    flags, _ = _parse(args)
+    wanted = [f.split("=", 1)[1] for f in flags.get("--filter", []) if f.startswith("label=")]
+    for container in sorted(os.listdir(STATE)) if os.path.isdir(STATE) else []:
+        try:
+            with open(os.path.join(_container_dir(container), "meta.json")) as fp:
+                labels = json.load(fp)["labels"]
+        except (OSError, ValueError):
+            continue
+        if all(label in labels for label in wanted):
+            print(container)
+    return 0
+
+
+COMMANDS = {"run": cmd_run, "exec": cmd_exec, "cp": cmd_cp, "inspect": cmd_inspect, "rm": cmd_rm, "ps": cmd_ps}
+
+
+def main() -> int:
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(f"fake docker: unsupported command {sys.argv[1:2]}", file=sys.stderr)
+        return 1
+    return COMMANDS[sys.argv[1]](sys.argv[2:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
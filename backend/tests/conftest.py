@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+# Tests import the app as ``backend.app``; keep its database and caches out of the working tree
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+_scratch = tempfile.mkdtemp(prefix="metascribe-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_scratch, 'test.db')}")
+os.environ.setdefault("CACHE_DIR", os.path.join(_scratch, "cache"))
+os.environ.setdefault("RUN_LOG_DIR", os.path.join(_scratch, "run_logs"))
+os.environ.setdefault("PARSE_WORKERS", "0")
+os.environ.setdefault("METRIC_WORKERS", "0")
@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import os
+import time
+
+import httpx
+import pytest
+
+from backend.app.core.config import settings
+from backend.app.services import arxiv, http
+
+
+ATOM = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>http://arxiv.org/abs/{id}</id>
+    <title>Paper {id}</title>
+    <summary>Abstract of {id}</summary>
+  </entry>
+</feed>"""
+
+
+class StandInArxiv:
+    """In-process stand-in for the arXiv PDF and export API servers, with ETag support."""
+
+    def __init__(self) -> None:
+        self.pdfs = {}
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.url.path, request.headers.get("if-none-match")))
+        if request.url.path == "/api/query":
+            ids = request.url.params["id_list"].split(",")
+            return httpx.Response(200, text="".join(ATOM.format(id=i) for i in ids))
+        key = request.url.path.rsplit("/", 1)[-1][: -len(".pdf")]
+        body = self.pdfs[key]
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(200, content=body, headers={"ETag": etag})
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    stand_in = StandInArxiv()
+    monkeypatch.setattr(settings, "arxiv_pdf_url", "http://arxiv.test/pdf/{id}.pdf")
+    monkeypatch.setattr(settings, "arxiv_api_url", "http://arxiv.test/api/query")
+    monkeypatch.setattr(arxiv, "arxiv_cache", arxiv.ArxivDiskCache(str(tmp_path), revalidate_seconds=0))
+    monkeypatch.setattr(http, "_client", httpx.AsyncClient(transport=httpx.MockTransport(stand_in.handler)))
+    return stand_in
+
+
+def test_versioned_id_is_downloaded_once(server):
+    server.pdfs["2101.00001v2"] = b"%PDF v2"
+
+    async def fetch_twice():
+        first = await arxiv.fetch_arxiv_document("2101.00001v2")
+        second = await arxiv.fetch_arxiv_document("https://arxiv.org/abs/2101.00001v2")
+        return first, second
+
+    first, second = asyncio.run(fetch_twice())
+    assert first.pdf_path == second.pdf_path
+    assert first.sha256 == hashlib.sha256(b"%PDF v2").hexdigest()
+    assert first.meta["title"] == "Paper 2101.00001v2"
+    assert [path for path, _ in server.requests].count("/pdf/2101.00001v2.pdf") == 1
+    assert arxiv.arxiv_cache._locks == {}
+
+
+def test_new_content_gets_a_new_path_and_old_file_is_kept(server):
+    server.pdfs["2101.00002"] = b"%PDF first"
+    first = asyncio.run(arxiv.fetch_arxiv_document("2101.00002"))
+    # Unchanged: revalidated with a conditional GET that returns 304
+    again = asyncio.run(arxiv.fetch_arxiv_document("2101.00002"))
+    assert again.pdf_path == first.pdf_path
+    pdf_requests = [etag for path, etag in server.requests if path == "/pdf/2101.00002.pdf"]
+    assert pdf_requests[0] is None and pdf_requests[1] is not None
+
+    server.pdfs["2101.00002"] = b"%PDF second"
+    second = asyncio.run(arxiv.fetch_arxiv_document("2101.00002"))
+    assert second.pdf_path != first.pdf_path
+    assert open(first.pdf_path, "rb").read() == b"%PDF first"
+    assert open(second.pdf_path, "rb").read() == b"%PDF second"
+    assert hashlib.sha256(open(second.pdf_path, "rb").read()).hexdigest() == second.sha256
+
+
+def test_concurrent_fetches_share_one_download(server):
+    server.pdfs["2101.00003v1"] = b"%PDF"
+
+    async def fetch_many():
+        return await asyncio.gather(*(arxiv.fetch_arxiv_document("2101.00003v1") for _ in range(5)))
+
+    docs = asyncio.run(fetch_many())
+    assert len({d.pdf_path for d in docs}) == 1
+    assert [path for path, _ in server.requests].count("/pdf/2101.00003v1.pdf") == 1
+    assert arxiv.arxiv_cache._locks == {}
+
+
+def test_eviction_removes_least_recently_used_pdfs(tmp_path):
+    cache = arxiv.ArxivDiskCache(str(tmp_path), revalidate_seconds=0, max_bytes=25, grace_seconds=60)
+    os.makedirs(tmp_path / "pdf")
+    now = time.time()
+    for age, name in ((300, "old"), (200, "middle"), (100, "recent"), (0, "in-use")):
+        path = cache.pdf_path(name)
+        with open(path, "wb") as fp:
+            fp.write(b"x" * 10)
+        os.utime(path, (now - age, now - age))
+    stale_tmp = os.path.join(tmp_path, "pdf", "crashed.pdf.tmp")
+    with open(stale_tmp, "wb") as fp:
+        fp.write(b"x")
+    os.utime(stale_tmp, (now - 1000, now - 1000))
+
+    assert cache.evict() == 3
+    assert sorted(os.listdir(tmp_path / "pdf")) == ["in-use.pdf", "recent.pdf"]
+
+
+def test_pinned_pdf_survives_eviction_until_released(tmp_path):
+    cache = arxiv.ArxivDiskCache(str(tmp_path), revalidate_seconds=0, max_bytes=15, grace_seconds=60)
+    os.makedirs(tmp_path / "pdf")
+    now = time.time()
+    for age, name in ((300, "queued"), (200, "old")):
+        path = cache.pdf_path(name)
+        with open(path, "wb") as fp:
+            fp.write(b"x" * 10)
+        os.utime(path, (now - age, now - age))
+
+    # A paper waiting in the parse queue long past the grace period
+    with cache.pin(cache.pdf_path("queued")), cache.pin(cache.pdf_path("queued")):
+        assert cache.evict() == 1
+        assert os.listdir(tmp_path / "pdf") == ["queued.pdf"]
+    assert cache._pinned == {}
+    with open(cache.pdf_path("more"), "wb") as fp:
+        fp.write(b"x" * 10)
+    assert cache.evict() == 1
+    assert os.listdir(tmp_path / "pdf") == ["more.pdf"]
+
+
+def test_atom_feed_keeps_versions_apart():
+    feed = """<feed xmlns="http://www.w3.org/2005/Atom">
+      <entry><id>http://arxiv.org/abs/2101.00004v2</id><title>Second</title><summary>b</summary></entry>
+      <entry><id>http://arxiv.org/abs/2101.00004v1</id><title>First</title><summary>a</summary></entry>
+    </feed>"""
+    entries = arxiv.parse_atom_feed(feed)
+    assert entries["2101.00004v1"]["title"] == "First"
+    assert entries["2101.00004v2"]["title"] == "Second"
+    assert entries["2101.00004"]["title"] == "Second"
@@ -0,0 +1,80 @@
+import os
+import shlex
+import sys
+import time
+
+import pytest
+
+from backend.app.services.errors import PoolBusyError
+from backend.app.services.sandbox.docker import DockerExecutor
+from backend.app.services.sandbox.pool import WarmContainerPool
+
+# The docker CLI stand-in; containers are directories under $FAKE_DOCKER_STATE
+FAKE_DOCKER = " ".join(
+    shlex.quote(p)
+    for p in (sys.executable, os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fake_docker.py"))
+)
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_DOCKER_STATE", str(tmp_path))
+    monkeypatch.setenv("FAKE_DOCKER_START_DELAY", "0")
+    return tmp_path
+
+
+def make_pool(**kwargs) -> WarmContainerPool:
+    options = dict(size=1, max_containers=2, spawn_interval=0.05, docker=FAKE_DOCKER, command_timeout=30)
+    options.update(kwargs)
+    return WarmContainerPool("python:3.11-slim", "512m", "0.5", **options)
+
+
+def wait_for(condition, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_run_uses_a_warm_container_and_removes_it(state):
+    pool = make_pool()
+    pool.start()
+    try:
+        wait_for(lambda: pool.stats()["ready"] == 1)
+        result = DockerExecutor(docker=FAKE_DOCKER, pool=pool).run_code("print('hello from the pool')", 30)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "hello from the pool"
+        assert pool.stats()["hits"] == 1
+        # The used container is removed and a fresh one takes its place
+        wait_for(lambda: pool.stats()["started"] == 2 and pool.stats()["live"] == 1)
+    finally:
+        pool.close()
+    assert pool.stats()["live"] == 0
+    assert os.listdir(state) == []
+
+
+def test_checkout_past_the_limit_is_busy(state):
+    pool = make_pool(size=0, max_containers=2)
+    first, second = pool.checkout(), pool.checkout()
+    with pytest.raises(PoolBusyError):
+        pool.checkout()
+    pool.release(first)
+    wait_for(lambda: pool.stats()["live"] == 1)
+    third = pool.checkout()
+    for container in (second, third):
+        pool.release(container)
+    wait_for(lambda: pool.stats()["live"] == 0)
+
+
+def test_start_removes_containers_left_by_a_previous_process(state):
+    stale = make_pool(size=0)
+    left_behind = stale.checkout()
+    assert os.listdir(state) == [left_behind]
+
+    pool = make_pool()
+    pool.start()
+    try:
+        wait_for(lambda: pool.stats()["ready"] == 1)
+        assert left_behind not in os.listdir(state)
+    finally:
+        pool.close()
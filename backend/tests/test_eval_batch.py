@@ -0,0 +1,39 @@
+from fastapi.testclient import TestClient
+
+from backend.app.db import get_session, init_db
+from backend.app.main import create_app
+from backend.app.models import Evaluation
+from backend.app.services.runs import new_run
+from backend.app.services.sandbox.output import OutputCapture
+
+METRIC = {"name": "acc", "pattern": r"acc=([\d.]+)", "mode": "last", "reported": 0.9}
+
+
+def test_a_run_with_a_corrupt_log_fails_alone(tmp_path):
+    init_db()
+    capture = OutputCapture(log_path=str(tmp_path / "good.ndjson.gz"))
+    capture.write("stdout", "acc=0.5\nacc=0.9\n")
+    capture.close()
+    corrupt = tmp_path / "corrupt.ndjson.gz"
+    corrupt.write_bytes(open(capture.log_path, "rb").read()[:-12])
+    with get_session() as session:
+        runs = [
+            new_run(session, code="good", stdout="acc=0.1", stderr="", returncode=0, log_path=capture.log_path),
+            new_run(session, code="corrupt", stdout="", stderr="", returncode=0, log_path=str(corrupt)),
+            new_run(session, code="no log", stdout="acc=0.95", stderr="", returncode=0),
+        ]
+        session.commit()
+        ids = [run.id for run in runs]
+
+    with TestClient(create_app()) as client:
+        response = client.post("/eval/evaluate/batch", json={"run_ids": ids, "metrics": [METRIC]})
+    assert response.status_code == 200
+    body = response.json()
+    table = {row["run_id"]: row for row in body["table"]}
+    assert table[ids[0]]["metrics"]["acc"]["measured"] == 0.9
+    assert table[ids[1]]["error"].startswith("EOFError")
+    assert table[ids[2]]["metrics"]["acc"]["measured"] == 0.95
+    assert (body["evaluated"], body["errors"]) == (2, 1)
+    with get_session() as session:
+        saved = session.query(Evaluation).filter(Evaluation.run_id.in_(ids)).all()
+    assert sorted(e.run_id for e in saved) == [ids[0], ids[2]]
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+
+import google.generativeai as genai
+import pytest
+from google.ai import generativelanguage as glm
+
+from backend.app.services.llm import gemini
+
+
+class FakeService:
+    """Stands in for the generative service clients; records how each was made and used."""
+
+    made = []
+
+    def __init__(self, *, client_options):
+        self.key = client_options["api_key"]
+        self.loop = None
+        FakeService.made.append(self)
+
+    @staticmethod
+    def reply(request, text):
+        return glm.GenerateContentResponse(
+            candidates=[glm.Candidate(content=glm.Content(parts=[glm.Part(text=text)]))]
+        )
+
+    def generate_content(self, request):
+        time.sleep(0.01)
+        return self.reply(request, f"{self.key}:{request.contents[0].parts[-1].text}")
+
+
+class FakeAsyncService(FakeService):
+    async def generate_content(self, request):
+        self.loop = self.loop or asyncio.get_running_loop()
+        assert self.loop is asyncio.get_running_loop(), "async client used on another event loop"
+        await asyncio.sleep(0.01)
+        return self.reply(request, f"{self.key}:{request.contents[0].parts[-1].text}")
+
+    async def stream_generate_content(self, request):
+        async def chunks():
+            for word in ("a", "b"):
+                await asyncio.sleep(0)
+                yield self.reply(request, f"{self.key}:{word}")
+
+        return chunks()
+
+
+@pytest.fixture(autouse=True)
+def services(monkeypatch):
+    FakeService.made = []
+    monkeypatch.setattr(glm, "GenerativeServiceClient", FakeService)
+    monkeypatch.setattr(glm, "GenerativeServiceAsyncClient", FakeAsyncService)
+
+    def global_configure(**kwargs):
+        raise AssertionError("genai.configure must not be used")
+
+    monkeypatch.setattr(genai, "configure", global_configure)
+
+
+def test_request_carries_model_prompts_and_config():
+    client = gemini.GeminiClient(api_key="key-a", model="gemini-1.5-flash")
+    request = client._request("prompt", "system", 0.3, 64)
+    assert request.model == "models/gemini-1.5-flash"
+    assert [part.text for part in request.contents[0].parts] == ["system", "prompt"]
+    assert request.generation_config.max_output_tokens == 64
+
+
+def test_service_client_is_made_once_per_client():
+    client = gemini.GeminiClient(api_key="key-a")
+    assert client.generate_text("one") == "key-a:one"
+    assert client.generate_text("two") == "key-a:two"
+    assert [s.key for s in FakeService.made] == ["key-a"]
+
+
+def test_concurrent_clients_with_different_keys_each_use_their_own():
+    clients = [gemini.GeminiClient(api_key=f"key-{n % 3}") for n in range(12)]
+    results = [None] * len(clients)
+
+    def call(n):
+        results[n] = clients[n].generate_text(str(n))
+
+    threads = [threading.Thread(target=call, args=(n,)) for n in range(len(clients))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [f"key-{n % 3}:{n}" for n in range(len(clients))]
+
+
+def test_async_client_is_reused_within_a_loop_and_replaced_on_a_new_one():
+    client = gemini.GeminiClient(api_key="key-a")
+
+    async def calls():
+        return [await client.agenerate_text("x"), await client.agenerate_text("y")]
+
+    assert asyncio.run(calls()) == ["key-a:x", "key-a:y"]
+    assert asyncio.run(client.agenerate_text("z")) == "key-a:z"
+    assert len(FakeService.made) == 2
+
+
+def test_cancelled_call_leaves_other_keys_unaffected():
+    a = gemini.GeminiClient(api_key="key-a")
+    b = gemini.GeminiClient(api_key="key-b")
+
+    async def scenario():
+        pending = asyncio.ensure_future(b.agenerate_text("cancelled"))
+        await asyncio.sleep(0)
+        pending.cancel()
+        results = await asyncio.wait_for(
+            asyncio.gather(a.agenerate_text("1"), b.agenerate_text("2"), a.agenerate_text("3")), timeout=5
+        )
+        streamed = [text async for text in b.astream_text("s")]
+        return results, streamed
+
+    results, streamed = asyncio.run(scenario())
+    assert results == ["key-a:1", "key-b:2", "key-a:3"]
+    assert streamed == ["key-b:a", "key-b:b"]
@@ -0,0 +1,75 @@
+import random
+import re
+
+import pytest
+
+from backend.app.services.metrics import MetricQuery, extract_series
+
+
+def standalone(text, query):
+    """What a finditer of the query's own pattern yields."""
+    compiled = re.compile(query.pattern)
+    group = 1 if compiled.groups else 0
+    values = []
+    for match in compiled.finditer(text):
+        try:
+            values.append(float(match.group(group)))
+        except (TypeError, ValueError):
+            continue
+    if query.mode == "first":
+        return values[:1]
+    if query.mode == "last":
+        return values[-1:]
+    return values
+
+
+# Patterns whose matches overlap each other's in many ways
+PATTERNS = [
+    r"loss[=:]\s*([-\d.]+)",
+    r"([-\d.]+)",
+    r"val_loss=([\d.]+)",
+    r"=([\d.]+)",
+    r"acc(?:uracy)?\s*[=:]\s*([\d.]+)%?",
+    r"(\d+)\s*/\s*\d+",
+    r"step (\d+).*?loss=([\d.]+)",
+    r"\d\d",
+    r"x?(\d)*",
+    r"(?P<v>\d+)e",
+    r"(\d)\1",
+    r"(?i)LOSS=(\d+)",
+    r"(?<=a)(\d)",
+]
+
+
+def test_named_metrics_match_their_own_scans():
+    text = "step 1 loss=0.9 val_loss=1.2 acc=71%\nstep 2 loss: 0.7 val_loss=1.1 accuracy = 74.5\n3/10 done"
+    modes = ("first", "last", "all")
+    for shift in range(len(modes)):
+        queries = [MetricQuery(f"m{i}", pattern, modes[(i + shift) % 3]) for i, pattern in enumerate(PATTERNS)]
+        for query, values in zip(queries, extract_series(text, queries)):
+            assert values == standalone(text, query), query
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_every_query_matches_a_single_pattern_scan(seed):
+    rng = random.Random(seed)
+    text = "".join(rng.choice("0123456789 .=:/aex\nloss=val_acc%step ") for _ in range(rng.randint(0, 400)))
+    queries = [
+        MetricQuery(f"m{i}", pattern, rng.choice(("first", "last", "all")))
+        for i, pattern in enumerate(rng.sample(PATTERNS, rng.randint(1, len(PATTERNS))))
+    ]
+    for query, values in zip(queries, extract_series(text, queries)):
+        assert values == standalone(text, query), query
+
+
+def test_a_query_does_not_depend_on_the_others_in_the_request():
+    text = "epoch 3 loss=0.25 lr=0.001"
+    alone = extract_series(text, [MetricQuery("loss", r"loss=([\d.]+)", "all")])
+    with_others = extract_series(text, [
+        MetricQuery("number", r"(\d+(?:\.\d+)?)", "all"),
+        MetricQuery("loss", r"loss=([\d.]+)", "all"),
+        MetricQuery("assignment", r"\w+=([\d.]+)", "all"),
+    ])
+    assert with_others[1] == alone[0] == [0.25]
+    assert with_others[0] == [3.0, 0.25, 0.001]
+    assert with_others[2] == [0.25, 0.001]
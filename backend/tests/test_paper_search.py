@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel
+
+from backend.app.db import make_engine
+from backend.app.services.papers import create_search_index, fts_query, save_paper, search_papers
+
+
+PAPERS = [
+    ("a" * 64, {
+        "doc_id": "doc-a",
+        "title": "Residual networks for image recognition",
+        "abstract": "Deep residual learning eases the training of very deep networks.",
+        "methodology": "We stack residual blocks with batch normalization.",
+        "datasets": ["imagenet", "cifar-10"],
+        "equations": ["y = F(x) + x"],
+    }),
+    ("b" * 64, {
+        "doc_id": "doc-b",
+        "title": "Attention is all you need",
+        "abstract": "A transformer based solely on attention, trained on WMT14.",
+        "methodology": "Multi-head attention with positional encodings. NEAR-duplicate \"sentences\" are removed.",
+        "datasets": ["wmt14"],
+        "equations": [],
+    }),
+]
+
+
+@pytest.fixture(params=["fts5", "like"])
+def session(request, tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'papers.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        if request.param == "fts5":
+            assert create_search_index(session)
+        for content_hash, parsed in PAPERS:
+            save_paper(session, content_hash, parsed, sections={"Results": "Top-1 error of 3.57% on ImageNet."})
+        yield session
+    engine.dispose()
+
+
+def doc_ids(results):
+    return [r["doc_id"] for r in results]
+
+
+def test_fts_query_quotes_every_term():
+    assert fts_query("residual networks") == '"residual" AND "networks"'
+    assert fts_query('say "hi" OR NOT x*') == '"say" AND "hi" AND "OR" AND "NOT" AND "x*"'
+    assert fts_query("title:foo", "CIFAR-10") == '"title:foo" AND datasets : "CIFAR-10"'
+    assert fts_query('a"b') == '"a" AND "b"'
+    assert fts_query("  ", "  ") == ""
+
+
+@pytest.mark.parametrize("query", [
+    'NEAR(a b)', 'attention AND', 'OR', '"unbalanced', 'title:attention', '-attention', 'attention*', '(attention',
+    "^attention", "a + b", "{title} : x",
+])
+def test_operator_characters_are_searched_as_text(session, query):
+    # Never an FTS5 syntax error, whatever the user typed
+    search_papers(session, query)
+
+
+def test_terms_are_anded_and_ranked(session):
+    assert doc_ids(search_papers(session, "attention transformer")) == ["doc-b"]
+    assert doc_ids(search_papers(session, "residual")) == ["doc-a"]
+    assert search_papers(session, "residual attention") == []
+
+
+def test_dataset_filter_matches_only_the_datasets(session):
+    assert doc_ids(search_papers(session, None, dataset="WMT14")) == ["doc-b"]
+    assert doc_ids(search_papers(session, "training", dataset="imagenet")) == ["doc-a"]
+    assert search_papers(session, "attention", dataset="imagenet") == []
+
+
+def test_quotes_in_queries_match_the_words(session):
+    assert doc_ids(search_papers(session, '"attention"')) == ["doc-b"]
+    assert doc_ids(search_papers(session, 'NEAR-duplicate')) == ["doc-b"]
+
+
+def test_fallback_is_used_without_the_index(session):
+    has_index = session.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'paper_fts'")).first() is not None
+    results = search_papers(session, "Residual")
+    assert doc_ids(results) == ["doc-a"]
+    if has_index:
+        assert results[0]["score"] > 0 and "**" in results[0]["snippet"]
+    else:
+        assert results[0]["score"] is None and results[0]["snippet"] is None
+
+
+@pytest.mark.parametrize("query", ["%", "_", "re%ual", "n_tworks"])
+def test_wildcard_characters_are_literal(session, query):
+    assert search_papers(session, query) == []
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+from backend.app.services.cache import TieredCache
+
+
+def test_async_access_keeps_sqlite_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    TieredCache(path).set("warm", {"n": 1})
+    cache = TieredCache(path, max_memory_entries=1)
+    statements = []
+
+    async def scenario():
+        loop_thread = threading.get_ident()
+        cache._connect().set_trace_callback(lambda sql: statements.append(threading.get_ident() == loop_thread))
+        disk_hit = await cache.aget("warm")
+        await cache.aset("new", [1, 2])
+        memory_hit = await cache.aget("new")
+        return disk_hit, memory_hit, await cache.aget("missing")
+
+    assert asyncio.run(scenario()) == ({"n": 1}, [1, 2], None)
+    assert statements and not any(statements)
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_reads_do_not_write_and_access_times_follow_the_next_write(tmp_path):
+    cache = TieredCache(str(tmp_path / "cache.sqlite"), max_memory_entries=1)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    conn = cache._connect()
+    conn.execute("UPDATE entries SET accessed_at = 0")
+    conn.commit()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    for _ in range(5):
+        assert cache.get("a") == "A"
+        assert cache.get("b") == "B"
+    assert not [sql for sql in statements if not sql.startswith("SELECT")]
+
+    cache.set("c", "C")
+    after = dict(conn.execute("SELECT key, accessed_at FROM entries"))
+    assert after["a"] > 0 and after["b"] > 0
+    cache.close()